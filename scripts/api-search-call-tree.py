@@ -1,21 +1,23 @@
 from pathlib import Path
 
 from strongarm.macho import MachoAnalyzer, MachoParser
-from strongarm.objc import CodeSearch, CodeSearchTermCallDestination
 
 binary = MachoParser(Path("./tests/bin/StrongarmTarget")).get_arm64_slice()
 assert binary is not None
 analyzer = MachoAnalyzer(binary)
 
+nslog = analyzer.callable_symbol_for_symbol_name("_NSLog")
+assert nslog is not None
+
 # we do not specify a class, because this is an NSURLSessionDelegate method and we don't
 # know which class will implement it
 desired_selector = "URLSession:didReceiveChallenge:completionHandler:"
-implementations = analyzer.get_imps_for_sel(desired_selector)
-for imp_function in implementations:
-    log_search = CodeSearch([CodeSearchTermCallDestination(binary, invokes_symbol="_NSLog")])
-    for search_result in imp_function.search_call_graph(log_search):
-        function_containing_log_call = search_result.found_function
+for imp_address in analyzer.get_method_imp_addresses(desired_selector):
+    for call_site in analyzer.search_call_tree(imp_address, nslog.address):
+        path = analyzer.call_graph.shortest_path(imp_address, call_site.caller_func_start_address)
+        assert path is not None
         print(
             f"Found a reachable code branch which calls NSLog originating from source function"
-            f" {hex(function_containing_log_call.start_address)} at {hex(search_result.found_instruction.address)}"
+            f" {hex(call_site.caller_func_start_address)} at {hex(call_site.caller_addr)}"
+            f" (call chain: {' -> '.join(hex(x) for x in path)})"
         )
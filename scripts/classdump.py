@@ -5,7 +5,7 @@ import argparse
 import pathlib
 import re
 
-from strongarm.macho import CPU_TYPE, MachoAnalyzer, MachoParser
+from strongarm.macho import MachoAnalyzer, MachoParser
 
 
 def _prototype_from_selector(sel: str) -> str:
@@ -44,8 +44,7 @@ def main() -> None:
     parser = MachoParser(pathlib.Path(args.binary_path))
 
     # Find a binary slice, preferring arm64 if available
-    arm64_slices = [x for x in parser.slices if x.cpu_type == CPU_TYPE.ARM64]
-    binary = arm64_slices[0] if len(arm64_slices) else parser.slices[0]
+    binary = parser.get_arm64_slice() or parser.slices[0]
     analyzer = MachoAnalyzer.get_analyzer(binary)
 
     for objc_class in [*analyzer.objc_classes(), *analyzer.objc_categories()]:
@@ -0,0 +1,41 @@
+"""Extract the images embedded in a dyld_shared_cache into standalone Mach-Os"""
+
+import argparse
+import logging
+from pathlib import Path
+
+from strongarm.macho import extract_dyld_shared_cache
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+
+    arg_parser = argparse.ArgumentParser(description="dyld_shared_cache image extractor")
+    arg_parser.add_argument(
+        "dyld_shared_cache_path", type=str, help="Path to the dyld_shared_cache whose images should be extracted"
+    )
+    arg_parser.add_argument(
+        "output_directory", type=str, help="Directory to extract the images to, beneath their install paths"
+    )
+    arg_parser.add_argument("--workers", type=int, default=None, help="Number of processes to extract images across")
+    arg_parser.add_argument(
+        "--image", action="append", default=None, help="Install path of an image to extract. Can be repeated"
+    )
+    args = arg_parser.parse_args()
+
+    image_paths = [Path(image) for image in args.image] if args.image else None
+    failed_images = []
+    for image_path, output_path in extract_dyld_shared_cache(
+        Path(args.dyld_shared_cache_path), Path(args.output_directory), args.workers, image_paths
+    ):
+        if output_path is None:
+            failed_images.append(image_path)
+        else:
+            logging.info(f"Extracted {image_path}")
+
+    if failed_images:
+        logging.error(f"Failed to extract {len(failed_images)} images")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,6 @@ from capstone import CsInsn
 from capstone.arm64 import ARM64_OP_IMM, ARM64_OP_MEM, ARM64_OP_REG, Arm64Op
 
 from strongarm.macho import (
-    CPU_TYPE,
     MachoAnalyzer,
     MachoBinary,
     MachoParser,
@@ -58,20 +57,15 @@ class StringFormatter:
 
 
 def pick_macho_slice(parser: MachoParser) -> MachoBinary:
-    """Retrieve a MachoBinary slice from a MachoParser, with a preference for an arm64 slice."""
-    binary_slices = parser.slices
-
+    """Retrieve a MachoBinary slice from a MachoParser, with a preference for an arm64 slice.
+    Only the returned slice is parsed.
+    """
     # Sanity checks (an empty list is falsey)
-    if not binary_slices:
+    if not parser.slices:
         raise ValueError(f"Could not parse {parser.path.name} as a Mach-O or FAT")
 
-    parsed_binary = binary_slices[0]
-    # Return 64 bit slice if there is one
-    for binary_slice in binary_slices:
-        parsed_binary = binary_slice
-        if parsed_binary.cpu_type == CPU_TYPE.ARM64:
-            break
-    return parsed_binary
+    # Return 64 bit slice if there is one, otherwise the last slice
+    return parser.get_arm64_slice() or parser.slices[-1]
 
 
 class _StringPalette:
@@ -173,11 +167,11 @@ def annotate_instruction(function_analyzer: ObjcFunctionAnalyzer, sel_args: List
 
                 # Figure out argument count passed to selector
                 arg_count = wrapped_branch_instr.selector.name.count(":")
-                for i in range(arg_count):
-                    # x0 is self, x1 is the SEL, real args start at x2
-                    register = f"x{i + 2}"
-                    method_arg = function_analyzer.get_register_contents_at_instruction(register, wrapped_branch_instr)
-
+                # x0 is self, x1 is the SEL, real args start at x2
+                method_args = function_analyzer.get_register_contents_at_instructions(
+                    [(f"x{i + 2}", wrapped_branch_instr) for i in range(arg_count)]
+                )
+                for method_arg in method_args:
                     method_arg_string = ", "
                     if method_arg.type == RegisterContentsType.IMMEDIATE:
                         method_arg_string += hex(method_arg.value)
@@ -190,11 +184,11 @@ def annotate_instruction(function_analyzer: ObjcFunctionAnalyzer, sel_args: List
         else:
             annotation += StringPalette.ANNOTATION(f"({hex(instr.address)})(")
             arg_count = 4
-            for i in range(arg_count):
-                # x0 is self, x1 is the SEL, real args start at x2
-                register = f"x{i}"
-                method_arg = function_analyzer.get_register_contents_at_instruction(register, wrapped_instr)
-
+            registers = [f"x{i}" for i in range(arg_count)]
+            method_args = function_analyzer.get_register_contents_at_instructions(
+                [(register, wrapped_instr) for register in registers]
+            )
+            for register, method_arg in zip(registers, method_args):
                 method_arg_string = f"{register}: "
                 if method_arg.type == RegisterContentsType.IMMEDIATE:
                     method_arg_string += hex(method_arg.value)
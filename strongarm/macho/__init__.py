@@ -20,9 +20,20 @@ from .arch_independent_structs import (
     ObjcProtocolListStruct,
     ObjcProtocolRawStruct,
 )
+from .call_graph import CallGraph
+from .control_flow_graph import CFGEdgeKind, ControlFlowGraph, NaturalLoop
+from .disassembly_cache import DisassemblyCache
 from .dyld_info_parser import BindOpcode, DyldBoundSymbol, DyldInfoParser
-from .dyld_shared_cache import DyldSharedCacheBinary, DyldSharedCacheParser
-from .macho_analyzer import CallerXRef, MachoAnalyzer, ObjcMsgSendXref
+from .dyld_shared_cache import DyldSharedCacheBinary, DyldSharedCacheImage, DyldSharedCacheParser
+from .dyld_shared_cache_extractor import extract_dyld_shared_cache, extract_embedded_image
+from .dyld_shared_cache_symbol_index import DyldSharedCacheSymbolIndex, SymbolicatedAddress
+from .dyld_shared_cache_symbol_map import (
+    exported_symbols_for_image,
+    iter_dyld_shared_cache_symbols,
+    write_dyld_shared_cache_symbol_map,
+)
+from .macho_analyzer import AnalyzerStage, CallerXRef, DataXRef, MachoAnalyzer, ObjcMsgSendXref
+from .macho_archive import ZipMemberMachoSource, iter_archive_macho_binaries
 from .macho_binary import (
     BinaryEncryptedError,
     InvalidAddressError,
@@ -42,6 +53,8 @@ from .macho_definitions import (
     DyldSharedCacheHeader,
     DyldSharedCacheImageInfo,
     DyldSharedFileMapping,
+    DyldSubcacheEntry,
+    DyldSubcacheEntryV1,
     DylibCommand,
     DylibStruct,
     LcStrUnion,
@@ -84,7 +97,8 @@ from .macho_definitions import (
 )
 from .macho_imp_stubs import MachoImpStub, MachoImpStubsParser
 from .macho_load_commands import MachoLoadCommands
-from .macho_parse import ArchitectureNotSupportedError, MachoParser
+from .macho_parse import ArchitectureNotSupportedError, MachoParser, MachoSliceInfo, MachoSlices
+from .macho_source import BufferMachoSource, FileObjectMachoSource, MachoSource, PathMachoSource
 from .macho_string_table_helper import MachoStringTableEntry, MachoStringTableHelper
 from .objc_runtime_data_parser import (
     ObjcCategory,
@@ -116,14 +130,31 @@ __all__ = [
     "ObjcMethodStruct",
     "ObjcProtocolListStruct",
     "ObjcProtocolRawStruct",
+    "CallGraph",
+    "CFGEdgeKind",
+    "ControlFlowGraph",
+    "NaturalLoop",
+    "DisassemblyCache",
     "BindOpcode",
     "DyldBoundSymbol",
     "DyldInfoParser",
     "DyldSharedCacheBinary",
+    "DyldSharedCacheImage",
     "DyldSharedCacheParser",
+    "extract_dyld_shared_cache",
+    "extract_embedded_image",
+    "DyldSharedCacheSymbolIndex",
+    "SymbolicatedAddress",
+    "exported_symbols_for_image",
+    "iter_dyld_shared_cache_symbols",
+    "write_dyld_shared_cache_symbol_map",
+    "AnalyzerStage",
     "CallerXRef",
+    "DataXRef",
     "MachoAnalyzer",
     "ObjcMsgSendXref",
+    "ZipMemberMachoSource",
+    "iter_archive_macho_binaries",
     "BinaryEncryptedError",
     "InvalidAddressError",
     "LoadCommandMissingError",
@@ -140,6 +171,8 @@ __all__ = [
     "DyldSharedCacheHeader",
     "DyldSharedCacheImageInfo",
     "DyldSharedFileMapping",
+    "DyldSubcacheEntry",
+    "DyldSubcacheEntryV1",
     "DylibCommand",
     "DylibStruct",
     "LcStrUnion",
@@ -183,6 +216,12 @@ __all__ = [
     "MachoStringTableHelper",
     "ArchitectureNotSupportedError",
     "MachoParser",
+    "MachoSliceInfo",
+    "MachoSlices",
+    "BufferMachoSource",
+    "FileObjectMachoSource",
+    "MachoSource",
+    "PathMachoSource",
     "MachoLoadCommands",
     "MachoImpStub",
     "MachoImpStubsParser",
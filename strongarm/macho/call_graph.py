@@ -0,0 +1,180 @@
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from strongarm.macho.macho_definitions import VirtualMemoryPointer
+
+
+class CallGraph:
+    """The functions within a binary, and the calls between them.
+
+    Each node is a function entry point, or the destination of a call (such as an imported symbol's stub). An edge
+    from A to B means that code within the function at A branches to B.
+
+    The graph is stored as compressed sparse rows in both directions: the successors of node i are
+    targets[offsets[i]:offsets[i + 1]]. Nodes are identified by their index into the sorted array of addresses.
+    This keeps the graph compact enough to hold for binaries with hundreds of thousands of functions, and lets
+    traversals run over flat integer arrays.
+
+    The sets of functions reachable from recently queried sources are memoized.
+    """
+
+    DEFAULT_REACHABILITY_CACHE_SIZE = 64
+
+    def __init__(
+        self,
+        edges: Iterable[Tuple[VirtualMemoryPointer, VirtualMemoryPointer]],
+        entry_points: Iterable[VirtualMemoryPointer] = (),
+        reachability_cache_size: int = DEFAULT_REACHABILITY_CACHE_SIZE,
+    ) -> None:
+        """Build the graph from (caller entry point, destination address) pairs.
+        entry_points provides functions which should be present in the graph even if they make or receive no calls.
+        """
+        int_edges = [(int(source), int(destination)) for source, destination in edges]
+        addresses = set(int(x) for x in entry_points)
+        addresses.update(source for source, _ in int_edges)
+        addresses.update(destination for _, destination in int_edges)
+
+        self._addresses = array("Q", sorted(addresses))
+        addresses_to_indexes = {address: index for index, address in enumerate(self._addresses)}
+        # Pack each edge into a single integer, (source index << 32) | target index, as these sort far faster than
+        # tuples. Sorting the packed edges groups them by source, with each node's targets in address order
+        packed_edges = {
+            addresses_to_indexes[source] << 32 | addresses_to_indexes[destination] for source, destination in int_edges
+        }
+        self._successor_offsets, self._successors = self._build_adjacency(len(self._addresses), packed_edges)
+        self._predecessor_offsets, self._predecessors = self._build_adjacency(
+            len(self._addresses), {(edge & 0xFFFFFFFF) << 32 | edge >> 32 for edge in packed_edges}
+        )
+
+        self.reachability_cache_size = reachability_cache_size
+        self._reachable_sets: "OrderedDict[int, bytearray]" = OrderedDict()
+
+    @staticmethod
+    def _build_adjacency(node_count: int, packed_edges: Set[int]) -> Tuple[array, array]:
+        """Build the CSR offsets and targets arrays from a set of packed (source << 32 | target) edges."""
+        sorted_edges = sorted(packed_edges)
+        offsets = array("I", (bisect_left(sorted_edges, node << 32) for node in range(node_count + 1)))
+        targets = array("I", (edge & 0xFFFFFFFF for edge in sorted_edges))
+        return offsets, targets
+
+    def _index_of(self, address: int) -> int:
+        index = bisect_left(self._addresses, address)
+        if index == len(self._addresses) or self._addresses[index] != address:
+            raise KeyError(f"{hex(address)} is not a node in the call graph")
+        return index
+
+    def _reachable(self, source: int) -> bytearray:
+        """Return a bytearray marking every node reachable from the node with the provided index."""
+        reachable = self._reachable_sets.get(source)
+        if reachable is not None:
+            self._reachable_sets.move_to_end(source)
+            return reachable
+
+        offsets = self._successor_offsets
+        successors = self._successors
+        reachable = bytearray(len(self._addresses))
+        reachable[source] = 1
+        stack = [source]
+        while stack:
+            node = stack.pop()
+            for successor in successors[offsets[node] : offsets[node + 1]]:
+                if not reachable[successor]:
+                    reachable[successor] = 1
+                    stack.append(successor)
+
+        self._reachable_sets[source] = reachable
+        if len(self._reachable_sets) > self.reachability_cache_size:
+            self._reachable_sets.popitem(last=False)
+        return reachable
+
+    def _breadth_first_search(
+        self, source: int, offsets: array, targets: array, max_hops: Optional[int], stop_at: Optional[int] = None
+    ) -> Tuple[Dict[int, int], Dict[int, int]]:
+        """Visit the nodes within max_hops of the source in breadth-first order.
+        Returns a map of each visited node to the node it was first reached from, and a map of each visited node to
+        its distance from the source.
+        """
+        parents = {source: source}
+        hops = {source: 0}
+        frontier = deque([source])
+        while frontier:
+            node = frontier.popleft()
+            if node == stop_at:
+                break
+            if max_hops is not None and hops[node] >= max_hops:
+                continue
+            for target in targets[offsets[node] : offsets[node + 1]]:
+                if target not in parents:
+                    parents[target] = node
+                    hops[target] = hops[node] + 1
+                    frontier.append(target)
+        return parents, hops
+
+    def __contains__(self, address: int) -> bool:
+        index = bisect_left(self._addresses, address)
+        return index < len(self._addresses) and self._addresses[index] == address
+
+    def __len__(self) -> int:
+        return len(self._addresses)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._successors)
+
+    def callees(self, address: VirtualMemoryPointer) -> List[VirtualMemoryPointer]:
+        """Return the addresses branched to by the function at the provided address."""
+        index = self._index_of(address)
+        offsets = self._successor_offsets
+        return [VirtualMemoryPointer(self._addresses[x]) for x in self._successors[offsets[index] : offsets[index + 1]]]
+
+    def callers(self, address: VirtualMemoryPointer) -> List[VirtualMemoryPointer]:
+        """Return the entry points of the functions which branch to the provided address."""
+        index = self._index_of(address)
+        offsets = self._predecessor_offsets
+        return [
+            VirtualMemoryPointer(self._addresses[x]) for x in self._predecessors[offsets[index] : offsets[index + 1]]
+        ]
+
+    def is_reachable(self, source: VirtualMemoryPointer, destination: VirtualMemoryPointer) -> bool:
+        """Return whether a chain of calls leads from the function at source to destination.
+        A function is always reachable from itself.
+        """
+        if source not in self or destination not in self:
+            return False
+        return bool(self._reachable(self._index_of(source))[self._index_of(destination)])
+
+    def reachable_from(self, source: VirtualMemoryPointer) -> Set[VirtualMemoryPointer]:
+        """Return every address reachable through a chain of calls from the function at source, including itself."""
+        reachable = self._reachable(self._index_of(source))
+        return {VirtualMemoryPointer(self._addresses[i]) for i, is_reachable in enumerate(reachable) if is_reachable}
+
+    def shortest_path(
+        self, source: VirtualMemoryPointer, destination: VirtualMemoryPointer
+    ) -> Optional[List[VirtualMemoryPointer]]:
+        """Return the shortest chain of calls from the function at source to destination, including both ends.
+        Returns None if destination isn't reachable from source.
+        """
+        if not self.is_reachable(source, destination):
+            return None
+
+        source_index = self._index_of(source)
+        destination_index = self._index_of(destination)
+        parents, _ = self._breadth_first_search(
+            source_index, self._successor_offsets, self._successors, max_hops=None, stop_at=destination_index
+        )
+        path = [destination_index]
+        while path[-1] != source_index:
+            path.append(parents[path[-1]])
+        return [VirtualMemoryPointer(self._addresses[x]) for x in reversed(path)]
+
+    def callers_within(self, address: VirtualMemoryPointer, max_hops: int) -> Dict[VirtualMemoryPointer, int]:
+        """Return the entry point of every function which reaches the provided address in at most max_hops calls,
+        mapped to the number of calls in the shortest such chain. Direct callers are 1 hop away.
+        """
+        index = self._index_of(address)
+        _, hops = self._breadth_first_search(index, self._predecessor_offsets, self._predecessors, max_hops)
+        return {
+            VirtualMemoryPointer(self._addresses[node]): hop_count for node, hop_count in hops.items() if node != index
+        }
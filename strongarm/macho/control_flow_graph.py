@@ -0,0 +1,304 @@
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple, Union, cast
+
+from strongarm.macho.macho_definitions import VirtualMemoryPointer
+
+
+class CFGEdgeKind(IntEnum):
+    """How control flows from the end of one basic block to the start of another."""
+
+    # Execution continues into the next basic block
+    FALL_THROUGH = 0
+    # The taken path of a b.cond, cbz, cbnz, tbz or tbnz
+    CONDITIONAL = 1
+    # The target of a b
+    UNCONDITIONAL = 2
+    # A possible target of an indirect branch, such as a jump table's br. These targets aren't resolved, so every
+    # block which isn't reached by any other edge is assumed to be a target
+    INDIRECT = 3
+
+
+def _sign_extend(value: int, bits: int) -> int:
+    sign_bit = 1 << (bits - 1)
+    return (value & (sign_bit - 1)) - (value & sign_bit)
+
+
+def _classify_block_terminator(instruction: int, address: int) -> Tuple[Optional[int], bool, bool]:
+    """Decode the final instruction of a basic block.
+    Returns the address of its branch target (or None if it has no direct target), whether it can fall through to
+    the following instruction, and whether it's an indirect branch within the function (i.e. a br).
+    """
+    # b <imm26>
+    if instruction & 0xFC000000 == 0x14000000:
+        return address + _sign_extend(instruction & 0x3FFFFFF, 26) * 4, False, False
+    # b.<cond> <imm19>. The AL and NV conditions are always taken
+    if instruction & 0xFF000010 == 0x54000000:
+        target = address + _sign_extend((instruction >> 5) & 0x7FFFF, 19) * 4
+        return target, instruction & 0xF < 0xE, False
+    # cbz/cbnz <Rt>, <imm19>
+    if instruction & 0x7E000000 == 0x34000000:
+        return address + _sign_extend((instruction >> 5) & 0x7FFFF, 19) * 4, True, False
+    # tbz/tbnz <Rt>, #<bit>, <imm14>
+    if instruction & 0x7E000000 == 0x36000000:
+        return address + _sign_extend((instruction >> 5) & 0x3FFF, 14) * 4, True, False
+    # Branches to a register: br, blr, ret, eret, and their pointer-authenticated forms
+    if instruction & 0xFE000000 == 0xD6000000:
+        opcode = (instruction >> 21) & 0x7
+        # blr returns to the following instruction, and br jumps somewhere unknown
+        return None, opcode == 1, opcode == 0
+    return None, True, False
+
+
+def compute_cfg_edges(
+    bytecode: Union[bytes, bytearray], entry_point: int, basic_blocks: Sequence[Tuple[int, int]]
+) -> "array[int]":
+    """Compute the control-flow edges between the basic blocks of a function.
+
+    Args:
+        bytecode: The function's code, starting at entry_point
+        entry_point: The address of the function
+        basic_blocks: The function's right-exclusive (start_address, end_address) basic blocks, sorted by address
+
+    Returns:
+        A flat array of (source block index, destination block index, CFGEdgeKind) triples. Branches to addresses
+        outside the function, such as tail calls, produce no edges.
+    """
+    block_indexes = {start: index for index, (start, _) in enumerate(basic_blocks)}
+    edges = array("I")
+    has_predecessor = [False] * len(basic_blocks)
+    indirect_branch_blocks = []
+    for index, (_, end_address) in enumerate(basic_blocks):
+        terminator_address = end_address - 4
+        offset = terminator_address - entry_point
+        instruction = int.from_bytes(bytecode[offset : offset + 4], "little")
+        target, falls_through, is_indirect = _classify_block_terminator(instruction, terminator_address)
+
+        if target is not None and target in block_indexes:
+            kind = CFGEdgeKind.CONDITIONAL if falls_through else CFGEdgeKind.UNCONDITIONAL
+            edges.extend((index, block_indexes[target], kind))
+            has_predecessor[block_indexes[target]] = True
+        if falls_through and index + 1 < len(basic_blocks) and basic_blocks[index + 1][0] == end_address:
+            edges.extend((index, index + 1, CFGEdgeKind.FALL_THROUGH))
+            has_predecessor[index + 1] = True
+        if is_indirect:
+            indirect_branch_blocks.append(index)
+
+    for index in indirect_branch_blocks:
+        for target_index in range(1, len(basic_blocks)):
+            if not has_predecessor[target_index] and target_index != index:
+                edges.extend((index, target_index, CFGEdgeKind.INDIRECT))
+    return edges
+
+
+@dataclass(frozen=True)
+class NaturalLoop:
+    """A loop within a function's control-flow graph.
+    The header dominates every block in the body, and the body includes the header.
+    """
+
+    header: VirtualMemoryPointer
+    body: FrozenSet[VirtualMemoryPointer]
+    # The blocks which branch back to the header
+    latches: FrozenSet[VirtualMemoryPointer]
+
+
+class ControlFlowGraph:
+    """The basic blocks of a function and the control-flow edges between them.
+
+    The edges are computed alongside the basic blocks, when the binary's function boundaries are found. Dominators and
+    loops are computed from them the first time they're requested. Blocks are identified by their start address.
+    """
+
+    def __init__(
+        self,
+        entry_point: VirtualMemoryPointer,
+        basic_blocks: List[Tuple[VirtualMemoryPointer, VirtualMemoryPointer]],
+        edges: "array[int]",
+    ) -> None:
+        self.entry_point = entry_point
+        self.basic_blocks = basic_blocks
+        self._block_starts = [start for start, _ in basic_blocks]
+
+        self._successors: List[List[Tuple[int, CFGEdgeKind]]] = [[] for _ in basic_blocks]
+        self._predecessors: List[List[int]] = [[] for _ in basic_blocks]
+        for i in range(0, len(edges), 3):
+            source, destination, kind = edges[i : i + 3]
+            self._successors[source].append((destination, CFGEdgeKind(kind)))
+            self._predecessors[destination].append(source)
+
+        self._immediate_dominators: Optional[List[Optional[int]]] = None
+        self._loops: Optional[List[NaturalLoop]] = None
+
+    def _index_of(self, block_start: VirtualMemoryPointer) -> int:
+        index = bisect_right(self._block_starts, block_start) - 1
+        if index < 0 or self._block_starts[index] != block_start:
+            raise KeyError(f"{hex(block_start)} is not the start of a basic block in {hex(self.entry_point)}")
+        return index
+
+    def block_containing(self, address: VirtualMemoryPointer) -> Optional[VirtualMemoryPointer]:
+        """Return the start address of the basic block containing the provided address."""
+        index = bisect_right(self._block_starts, address) - 1
+        if index < 0 or address >= self.basic_blocks[index][1]:
+            return None
+        return self._block_starts[index]
+
+    @property
+    def edges(self) -> List[Tuple[VirtualMemoryPointer, VirtualMemoryPointer, CFGEdgeKind]]:
+        """Return every (source block, destination block, kind) edge in the graph."""
+        return [
+            (self._block_starts[source], self._block_starts[destination], kind)
+            for source, successors in enumerate(self._successors)
+            for destination, kind in successors
+        ]
+
+    def successors(self, block_start: VirtualMemoryPointer) -> List[Tuple[VirtualMemoryPointer, CFGEdgeKind]]:
+        """Return the blocks which control can flow to from the end of the provided block, and how."""
+        return [(self._block_starts[x], kind) for x, kind in self._successors[self._index_of(block_start)]]
+
+    def predecessors(self, block_start: VirtualMemoryPointer) -> List[VirtualMemoryPointer]:
+        """Return the blocks which control can flow from into the provided block."""
+        return [self._block_starts[x] for x in self._predecessors[self._index_of(block_start)]]
+
+    def _reverse_postorder(self) -> List[int]:
+        visited = [False] * len(self.basic_blocks)
+        postorder: List[int] = []
+        visited[0] = True
+        # Iterative DFS, keeping each node's position in its successor list
+        stack = [(0, 0)]
+        while stack:
+            node, successor_index = stack[-1]
+            if successor_index < len(self._successors[node]):
+                stack[-1] = (node, successor_index + 1)
+                successor, _ = self._successors[node][successor_index]
+                if not visited[successor]:
+                    visited[successor] = True
+                    stack.append((successor, 0))
+            else:
+                stack.pop()
+                postorder.append(node)
+        return list(reversed(postorder))
+
+    def _compute_immediate_dominators(self) -> List[Optional[int]]:
+        """Compute the immediate dominator of each block reachable from the entry block.
+        This is the iterative algorithm from Cooper, Harvey & Kennedy's "A Simple, Fast Dominance Algorithm".
+        """
+        if self._immediate_dominators is not None:
+            return self._immediate_dominators
+
+        immediate_dominators: List[Optional[int]] = [None] * len(self.basic_blocks)
+        if not self.basic_blocks:
+            self._immediate_dominators = immediate_dominators
+            return immediate_dominators
+
+        reverse_postorder = self._reverse_postorder()
+        postorder_numbers = {node: len(reverse_postorder) - i for i, node in enumerate(reverse_postorder)}
+
+        def intersect(a: int, b: int) -> int:
+            while a != b:
+                while postorder_numbers[a] < postorder_numbers[b]:
+                    a = cast(int, immediate_dominators[a])
+                while postorder_numbers[b] < postorder_numbers[a]:
+                    b = cast(int, immediate_dominators[b])
+            return a
+
+        immediate_dominators[0] = 0
+        changed = True
+        while changed:
+            changed = False
+            for node in reverse_postorder[1:]:
+                new_immediate_dominator: Optional[int] = None
+                for predecessor in self._predecessors[node]:
+                    if immediate_dominators[predecessor] is None:
+                        continue
+                    if new_immediate_dominator is None:
+                        new_immediate_dominator = predecessor
+                    else:
+                        new_immediate_dominator = intersect(predecessor, new_immediate_dominator)
+                if immediate_dominators[node] != new_immediate_dominator:
+                    immediate_dominators[node] = new_immediate_dominator
+                    changed = True
+
+        self._immediate_dominators = immediate_dominators
+        return immediate_dominators
+
+    def immediate_dominator(self, block_start: VirtualMemoryPointer) -> Optional[VirtualMemoryPointer]:
+        """Return the closest block which every path from the entry block to the provided block passes through.
+        Returns None for the entry block, and for blocks which aren't reachable from it.
+        """
+        index = self._index_of(block_start)
+        immediate_dominator = self._compute_immediate_dominators()[index]
+        if immediate_dominator is None or index == 0:
+            return None
+        return self._block_starts[immediate_dominator]
+
+    def dominators(self, block_start: VirtualMemoryPointer) -> List[VirtualMemoryPointer]:
+        """Return every block which dominates the provided block, from the block itself up to the entry block.
+        Returns an empty list for blocks which aren't reachable from the entry block.
+        """
+        immediate_dominators = self._compute_immediate_dominators()
+        index = self._index_of(block_start)
+        if immediate_dominators[index] is None:
+            return []
+        dominators = [index]
+        while index != 0:
+            index = cast(int, immediate_dominators[index])
+            dominators.append(index)
+        return [self._block_starts[x] for x in dominators]
+
+    def dominates(self, dominator: VirtualMemoryPointer, block_start: VirtualMemoryPointer) -> bool:
+        """Return whether every path from the entry block to block_start passes through dominator.
+        Every reachable block dominates itself.
+        """
+        return dominator in self.dominators(block_start)
+
+    @property
+    def loops(self) -> List[NaturalLoop]:
+        """Return the natural loops in the function, ordered by the address of their header.
+
+        Each edge to a block which dominates the edge's source is a back edge, and forms a loop with the blocks that
+        can reach the back edge without passing through the header. Back edges to the same header form one loop.
+        """
+        if self._loops is not None:
+            return self._loops
+
+        immediate_dominators = self._compute_immediate_dominators()
+
+        def dominates(a: int, b: int) -> bool:
+            while True:
+                if a == b:
+                    return True
+                if b == 0 or immediate_dominators[b] is None:
+                    return False
+                b = cast(int, immediate_dominators[b])
+
+        headers_to_latches: Dict[int, List[int]] = {}
+        for source, successors in enumerate(self._successors):
+            if immediate_dominators[source] is None:
+                continue
+            for destination, _ in successors:
+                if dominates(destination, source):
+                    headers_to_latches.setdefault(destination, []).append(source)
+
+        loops = []
+        for header, latches in sorted(headers_to_latches.items()):
+            body = {header}
+            worklist = list(latches)
+            while worklist:
+                node = worklist.pop()
+                # Skip blocks which can't be reached from the entry block, such as unresolved jump table targets
+                if node in body or immediate_dominators[node] is None:
+                    continue
+                body.add(node)
+                worklist.extend(self._predecessors[node])
+            loops.append(
+                NaturalLoop(
+                    header=self._block_starts[header],
+                    body=frozenset(self._block_starts[x] for x in body),
+                    latches=frozenset(self._block_starts[x] for x in latches),
+                )
+            )
+        self._loops = loops
+        return loops
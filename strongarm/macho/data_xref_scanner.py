@@ -0,0 +1,97 @@
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, Tuple, Union
+
+# The registers which a called function may clobber: x0-x18 and the link register
+_CALLER_SAVED_REGISTERS = list(range(19)) + [30]
+
+
+def _sign_extend(value: int, bits: int) -> int:
+    sign_bit = 1 << (bits - 1)
+    return (value & (sign_bit - 1)) - (value & sign_bit)
+
+
+def find_data_xrefs(
+    bytecode: Union[bytes, bytearray], entry_point: int, basic_block_starts: Iterable[int]
+) -> Iterator[Tuple[int, int]]:
+    """Find each instruction in a function which completes the materialization of an address.
+
+    These are:
+    * adr
+    * adrp, followed by an add or a load/store with an immediate offset from the page
+    * A literal ldr
+
+    Like the rest of strongarm's dataflow analysis, register contents are tracked within a basic block. Instructions are
+    decoded directly from their encodings. Any instruction which isn't understood invalidates the register it writes.
+
+    Args:
+        bytecode: The function's code, starting at entry_point
+        entry_point: The address of the function
+        basic_block_starts: The start address of each basic block in the function
+
+    Returns:
+        An iterator of (instruction address, materialized address) pairs.
+    """
+    words = array("I")
+    words.frombytes(bytes(bytecode[: len(bytecode) & ~3]))
+    if sys.byteorder == "big":
+        words.byteswap()
+
+    block_starts = set(basic_block_starts)
+    # The known address held by each general-purpose register
+    registers: Dict[int, int] = {}
+    for index, instruction in enumerate(words):
+        address = entry_point + index * 4
+        if address in block_starts:
+            registers.clear()
+
+        rd = instruction & 0x1F
+        # adrp <Xd>, <label>
+        if instruction & 0x9F000000 == 0x90000000:
+            immediate = ((instruction >> 3) & 0x1FFFFC) | ((instruction >> 29) & 0x3)
+            registers[rd] = (address & ~0xFFF) + (_sign_extend(immediate, 21) << 12)
+        # adr <Xd>, <label>
+        elif instruction & 0x9F000000 == 0x10000000:
+            immediate = ((instruction >> 3) & 0x1FFFFC) | ((instruction >> 29) & 0x3)
+            target = address + _sign_extend(immediate, 21)
+            registers[rd] = target
+            yield address, target
+        # add <Xd>, <Xn>, #<imm>{, lsl #12}
+        elif instruction & 0xFF800000 == 0x91000000:
+            rn = (instruction >> 5) & 0x1F
+            if rn in registers:
+                shift = 12 if instruction & (1 << 22) else 0
+                target = registers[rn] + (((instruction >> 10) & 0xFFF) << shift)
+                registers[rd] = target
+                yield address, target
+            else:
+                registers.pop(rd, None)
+        # ldr/str <Rt>, [<Xn>, #<imm>], with an unsigned scaled offset
+        elif instruction & 0x3B000000 == 0x39000000:
+            rn = (instruction >> 5) & 0x1F
+            is_simd = instruction & (1 << 26)
+            opc = (instruction >> 22) & 0x3
+            if rn in registers:
+                scale = instruction >> 30
+                # 128-bit SIMD registers
+                if is_simd and opc >= 2:
+                    scale = 4
+                yield address, registers[rn] + (((instruction >> 10) & 0xFFF) << scale)
+            # Loads into a general-purpose register overwrite it
+            if not is_simd and opc != 0:
+                registers.pop(rd, None)
+        # ldr <Rt>, <label>
+        elif instruction & 0x3B000000 == 0x18000000:
+            yield address, address + _sign_extend((instruction >> 5) & 0x7FFFF, 19) * 4
+            if not instruction & (1 << 26):
+                registers.pop(rd, None)
+        # bl, blr
+        elif instruction & 0xFC000000 == 0x94000000 or instruction & 0xFEFFF000 == 0xD63F0000:
+            for register in _CALLER_SAVED_REGISTERS:
+                registers.pop(register, None)
+        elif registers:
+            registers.pop(rd, None)
+            # Other loads and stores may write back to their base register, or load a second register
+            if instruction & 0x0A000000 == 0x08000000:
+                registers.pop((instruction >> 5) & 0x1F, None)
+                registers.pop((instruction >> 10) & 0x1F, None)
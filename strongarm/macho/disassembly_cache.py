@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from capstone import Cs, CsInsn
+
+from strongarm.macho.macho_binary import MachoBinary
+from strongarm.macho.macho_definitions import VirtualMemoryPointer
+
+
+class DisassemblyCache:
+    """The disassembled instructions of recently used code regions within a binary.
+
+    Every function analyzer, and the callers which disassemble a function directly, share one cache per binary, so a
+    function is only decoded once while it's in use. Capstone's detailed instructions take around 3kB each, so the
+    cache is capped by the total number of instructions it holds. The least recently used regions are evicted first.
+
+    This cache owns the instructions of the function analyzers cached by MachoAnalyzer.get_function_analyzer(). Each
+    analyzer is released by `on_evict` when its region is evicted, so the two caches together retain at most
+    `max_instructions` instructions, around 50MB at the default cap. Instructions handed out to callers stay alive
+    for as long as the callers hold them.
+    """
+
+    DEFAULT_MAX_INSTRUCTIONS = 16384
+
+    def __init__(
+        self,
+        binary: MachoBinary,
+        cs: Cs,
+        max_instructions: int = DEFAULT_MAX_INSTRUCTIONS,
+        on_evict: Optional[Callable[[Tuple[VirtualMemoryPointer, int]], None]] = None,
+    ) -> None:
+        self.binary = binary
+        self.cs = cs
+        self.max_instructions = max_instructions
+        # Called with each (start_address, size) region which is evicted, to release anything built from it
+        self.on_evict = on_evict
+
+        self._regions_to_instructions: "OrderedDict[Tuple[VirtualMemoryPointer, int], List[CsInsn]]" = OrderedDict()
+        self._cached_instruction_count = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cached_instruction_count(self) -> int:
+        return self._cached_instruction_count
+
+    def _evict(self) -> None:
+        while self._cached_instruction_count > self.max_instructions and self._regions_to_instructions:
+            region, instructions = self._regions_to_instructions.popitem(last=False)
+            self._cached_instruction_count -= len(instructions)
+            if self.on_evict:
+                self.on_evict(region)
+
+    def touch(self, start_address: VirtualMemoryPointer, size: int) -> bool:
+        """Mark a region as recently used, without disassembling it. Returns whether the region is cached."""
+        region = (start_address, size)
+        if region not in self._regions_to_instructions:
+            return False
+        self._regions_to_instructions.move_to_end(region)
+        return True
+
+    def disassemble(self, start_address: VirtualMemoryPointer, size: int) -> List[CsInsn]:
+        """Disassemble the code in a region, or return the cached instructions if it was recently disassembled.
+        The returned list belongs to the caller, but the instructions within it are shared.
+        """
+        region = (start_address, size)
+        instructions = self._regions_to_instructions.get(region)
+        if instructions is not None:
+            self.hits += 1
+            self._regions_to_instructions.move_to_end(region)
+            return list(instructions)
+
+        self.misses += 1
+        code = bytes(self.binary.get_content_from_virtual_address(virtual_address=start_address, size=size))
+        instructions = list(self.cs.disasm(code, start_address))
+        # Don't let a region which could never fit flush everything else out of the cache
+        if instructions and len(instructions) <= self.max_instructions:
+            self._regions_to_instructions[region] = instructions
+            self._cached_instruction_count += len(instructions)
+            self._evict()
+        return list(instructions)
+
+    def clear(self) -> None:
+        regions = list(self._regions_to_instructions)
+        self._regions_to_instructions.clear()
+        self._cached_instruction_count = 0
+        if self.on_evict:
+            for region in regions:
+                self.on_evict(region)
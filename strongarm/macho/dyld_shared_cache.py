@@ -1,18 +1,33 @@
+import mmap
+import struct
+from array import array
+from bisect import bisect_right
 from ctypes import Structure, c_uint32, sizeof
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Type, TypeVar
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Type, TypeVar, cast
 
 from strongarm.logger import strongarm_logger
-from strongarm.macho.macho_binary import MachoBinary
+from strongarm.macho.macho_binary import DynamicLibrary, LoadCommandMissingError, MachoBinary
 from strongarm.macho.macho_definitions import (
+    NLIST_NTYPE,
+    NTYPE_VALUES,
     DyldSharedCacheHeader,
     DyldSharedCacheImageInfo,
     DyldSharedFileMapping,
+    DyldSubcacheEntry,
+    DyldSubcacheEntryV1,
     MachArch,
+    MachoDyldInfoCommand,
+    MachoFileType,
+    MachoHeader64,
+    MachoLinkeditDataCommand,
+    MachoLoadCommand,
+    MachoSegmentCommand64,
+    MachoSymtabCommand,
     StaticFilePointer,
     VirtualMemoryPointer,
-    VMProtFlags,
 )
+from strongarm.macho.macho_load_commands import MachoLoadCommands
 
 logger = strongarm_logger.getChild(__file__)
 
@@ -31,16 +46,30 @@ class DyldSharedCacheParser:
 
     _DSC_MAGIC = [MachArch.DYLD_SHARED_CACHE_MAGIC]
 
+    # Newer caches are split across a main file and several subcache files. Every file of the cache is addressed
+    # through one space of static offsets, in which the Nth subcache's contents begin at N << _SUBCACHE_OFFSET_SHIFT.
+    # Offsets within the main file, and so within a cache which isn't split, are unchanged
+    _SUBCACHE_OFFSET_SHIFT = 40
+    _OFFSET_IN_FILE_MASK = (1 << _SUBCACHE_OFFSET_SHIFT) - 1
+
     def __init__(self, path: Path) -> None:
         self.path = path
 
-        # DSC's are split into 3 "mappings", or segments:
+        # DSC's are split into "mappings", or segments. Older caches have exactly 3:
         # Mapping 0 is the executable segment. __TEXT of embedded binaries is placed here
         # Mapping 1 is the writable segment. __DATA/writable data of embedded binaries is placed here
         # Mapping 2 is the readonly segment. __LINKEDIT data (such as symbol tables) is placed here
-        # This attribute stores the parsed mapping structures
+        # Newer caches have more, such as separate mappings for __DATA_CONST and __AUTH, spread across subcaches.
+        # This attribute stores the parsed mapping structures of the main file, followed by those of each subcache
         self.segment_mappings: List[DyldSharedFileMapping] = []
 
+        # The subcache files of a split cache, such as dyld_shared_cache_arm64e.01, in the order the main file lists
+        # them. The Nth subcache is file N + 1 of the cache
+        self.subcache_paths: List[Path] = []
+        # The file holding the unmapped local symbols of a split cache, such as dyld_shared_cache_arm64e.symbols.
+        # strongarm doesn't read local symbols, so this file is never mapped
+        self.symbols_cache_path: Optional[Path] = None
+
         # DSC's store a number of system dylibs.
         # This attribute stores the path of an embedded dylib to the virtual mapping of its __TEXT segment
         # In other words, the value for each path is a tuple of:
@@ -48,24 +77,59 @@ class DyldSharedCacheParser:
         # - The VM pointer to the end-address of the Mach-O's __TEXT segment
         self.embedded_binary_info: Dict[Path, Tuple[VirtualMemoryPointer, VirtualMemoryPointer]] = {}
 
+        # Sorted start addresses of the mappings of every file of the cache, and of each image's __TEXT, so that
+        # lookups can bisect rather than scan. The Nth entry of each array describes the Nth entry of the
+        # corresponding list. _mapping_file_offsets holds the static offset of each mapping's contents
+        self._mapping_starts = array("Q")
+        self._mapping_file_offsets = array("Q")
+        self._sorted_mappings: List[DyldSharedFileMapping] = []
+        self._image_text_starts = array("Q")
+        self._image_text_ends = array("Q")
+        self._sorted_image_paths: List[Path] = []
+
+        # Each file of the cache is mapped once, the first time it's read from. Reads are served as views of the
+        # mapping, so parsing an image's symbol table doesn't reopen the file for each read. Subcaches which are
+        # never read from are never mapped
+        self._cache_file_paths = [self.path]
+        self._cache_file_mmaps: List[Optional[mmap.mmap]] = [None]
+        self._cache_file_contents: List[Optional[memoryview]] = [None]
+
         self._parse()
 
     @property
     def file_magic(self) -> int:
         """Read file magic."""
-        return c_uint32.from_buffer(bytearray(self.get_bytes(StaticFilePointer(0), sizeof(c_uint32)))).value
-
-    def get_bytes(self, offset: StaticFilePointer, size: int) -> bytes:
+        return c_uint32.from_buffer_copy(self.get_bytes(StaticFilePointer(0), sizeof(c_uint32))).value
+
+    def _map_cache_file(self, file_index: int) -> memoryview:
+        path = self._cache_file_paths[file_index]
+        logger.debug(f"Mapping DSC file {path}")
+        with open(str(path), "rb") as cache_file:
+            cache_file_mmap = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+        contents = memoryview(cache_file_mmap)
+        self._cache_file_mmaps[file_index] = cache_file_mmap
+        self._cache_file_contents[file_index] = contents
+        return contents
+
+    def get_bytes(self, offset: StaticFilePointer, size: int) -> memoryview:
         """Read a region of bytes from the input file
         Args:
-            offset: Offset within file to begin reading from
+            offset: Offset within file to begin reading from. For split caches, this is an offset within the global
+                static address space returned by translate_virtual_address_to_static()
             size: Maximum number of bytes to read
         Returns:
-            Byte list representing contents of file at provided address
+            A read-only view of the contents of the file at the provided offset. The view doesn't copy the data
         """
-        with open(str(self.path), "rb") as binary_file:
-            binary_file.seek(offset)
-            return binary_file.read(size)
+        file_index = offset >> self._SUBCACHE_OFFSET_SHIFT
+        contents = self._cache_file_contents[file_index]
+        if contents is None:
+            contents = self._map_cache_file(file_index)
+        offset_in_file = offset & self._OFFSET_IN_FILE_MASK
+        return contents[offset_in_file : offset_in_file + size]
+
+    def _split_file_offset(self, offset: StaticFilePointer) -> Tuple[int, int]:
+        """Return the index of the cache file which contains a static offset, and the offset within that file."""
+        return offset >> self._SUBCACHE_OFFSET_SHIFT, offset & self._OFFSET_IN_FILE_MASK
 
     def read_struct(self, file_offset: StaticFilePointer, struct_type: Type[_StructureT]) -> _StructureT:
         """Given a file offset, return the structure it describes
@@ -75,42 +139,36 @@ class DyldSharedCacheParser:
         Returns:
             struct_type loaded from the pointed address
         """
-        data = bytearray(self.get_bytes(file_offset, sizeof(struct_type)))
-        return struct_type.from_buffer(data)  # type: ignore
+        return struct_type.from_buffer_copy(self.get_bytes(file_offset, sizeof(struct_type)))
+
+    def get_c_string_bytes(self, start_address: StaticFilePointer, limit: Optional[int] = None) -> Optional[bytes]:
+        """Return the bytes from start_address up to, but not including, the next NULL character
+        This method will return None if there's no NULL character before the file offset `limit`
+        """
+        file_index, start_in_file = self._split_file_offset(start_address)
+        if self._cache_file_mmaps[file_index] is None:
+            self._map_cache_file(file_index)
+        cache_file_mmap = cast(mmap.mmap, self._cache_file_mmaps[file_index])
+        file_base = start_address - start_in_file
+        limit_in_file = len(cache_file_mmap) if limit is None else limit - file_base
+        end_in_file = cache_file_mmap.find(b"\x00", start_in_file, limit_in_file)
+        if end_in_file < 0:
+            return None
+        return cache_file_mmap[start_in_file:end_in_file]
 
     def _read_static_c_string(self, start_address: StaticFilePointer) -> Optional[str]:
         """Return a string containing the bytes from start_address up to the next NULL character
         This method will return None if the specified address does not point to a UTF-8 encoded string
         """
-        max_len = 16
-        symbol_name_characters = []
-        found_null_terminator = False
-
-        while not found_null_terminator:
-            name_bytes = self.get_bytes(start_address, max_len)
-            # search for null terminator in this content
-            for ch in name_bytes:
-                if ch == 0x00:
-                    found_null_terminator = True
-                    break
-                symbol_name_characters.append(ch)
-
-            # do we need to keep searching for the end of the symbol name?
-            if not found_null_terminator:
-                # since we read [start_address:start_address + max_len], trim that from search space
-                start_address += max_len
-                # double search space for next iteration
-                max_len *= 2
-            else:
-                # read full string!
-                try:
-                    symbol_name = bytearray(symbol_name_characters).decode("UTF-8")
-                    return symbol_name
-                except UnicodeDecodeError:
-                    # if decoding the string failed, we may have been passed an address which does not actually
-                    # point to a string
-                    return None
-        return None
+        string_bytes = self.get_c_string_bytes(start_address)
+        if string_bytes is None:
+            return None
+        try:
+            return string_bytes.decode("UTF-8")
+        except UnicodeDecodeError:
+            # if decoding the string failed, we may have been passed an address which does not actually
+            # point to a string
+            return None
 
     def _parse(self) -> None:
         # Read the shared-cache header
@@ -124,75 +182,182 @@ class DyldSharedCacheParser:
         logger.debug(f"Memory base: {hex(self.header.dyldBaseAddress)}")
         logger.debug(f"Codesign base: {hex(self.header.codeSignOffset)}")
 
+        self._parse_subcaches()
         self._parse_dsc_mappings()
         self._parse_embedded_binaries()
 
-    def _parse_dsc_mappings(self) -> None:
-        """Populates self.segment_translations based on the mappings reported by the DSC header."""
-        # We expect exactly: an executable mapping, a writable mapping, a readonly mapping
-        # Verify this expectation
-        assert self.header.mappingCount == 3
-        expected_vm_protections = [
-            VMProtFlags.VM_PROT_READ | VMProtFlags.VM_PROT_EXECUTE,
-            VMProtFlags.VM_PROT_READ | VMProtFlags.VM_PROT_WRITE,
-            VMProtFlags.VM_PROT_READ,
+    @staticmethod
+    def _header_has_field(header: DyldSharedCacheHeader, field_name: str) -> bool:
+        """Return whether a DSC header is large enough to contain a field which later versions of dyld added.
+        The mappings follow the header, so the offset of the first mapping is the size of the header.
+        """
+        field = getattr(DyldSharedCacheHeader, field_name)
+        return bool(header.mappingOffset >= field.offset + field.size)
+
+    def _parse_subcaches(self) -> None:
+        """Populates self.subcache_paths and self.symbols_cache_path based on the subcaches reported by the header."""
+        self._subcache_uuids: List[bytes] = []
+        if self._header_has_field(self.header, "subCacheArrayCount"):
+            # dyld added a file suffix to each subcache entry in the same version that added cacheSubType. Before this,
+            # subcaches were named by their index
+            has_file_suffix = self._header_has_field(self.header, "cacheSubType")
+            entry_type = DyldSubcacheEntry if has_file_suffix else DyldSubcacheEntryV1
+            entry_off = self.header.subCacheArrayOffset
+            for subcache_idx in range(self.header.subCacheArrayCount):
+                entry = self.read_struct(StaticFilePointer(entry_off), entry_type)
+                entry_off += sizeof(entry_type)
+
+                suffix = entry.fileSuffix.decode() if has_file_suffix else f".{subcache_idx + 1}"
+                subcache_path = self.path.with_name(f"{self.path.name}{suffix}")
+                logger.debug(f"Subcache [{subcache_idx}]: {subcache_path} @ +{hex(entry.cacheVMOffset)}")
+
+                self.subcache_paths.append(subcache_path)
+                self._subcache_uuids.append(bytes(entry.uuid))
+                self._cache_file_paths.append(subcache_path)
+                self._cache_file_mmaps.append(None)
+                self._cache_file_contents.append(None)
+
+        if self._header_has_field(self.header, "symbolFileUUID") and any(self.header.symbolFileUUID):
+            self.symbols_cache_path = self.path.with_name(f"{self.path.name}.symbols")
+
+    @staticmethod
+    def _read_subcache_header(path: Path) -> Tuple[DyldSharedCacheHeader, List[DyldSharedFileMapping]]:
+        """Read the header and mappings of a subcache file, without mapping the file."""
+        with open(str(path), "rb") as subcache_file:
+            header_bytes = subcache_file.read(sizeof(DyldSharedCacheHeader))
+            header = DyldSharedCacheHeader.from_buffer_copy(header_bytes.ljust(sizeof(DyldSharedCacheHeader), b"\x00"))
+            subcache_file.seek(header.mappingOffset)
+            mappings_bytes = subcache_file.read(sizeof(DyldSharedFileMapping) * header.mappingCount)
+        if len(mappings_bytes) != sizeof(DyldSharedFileMapping) * header.mappingCount:
+            raise ValueError(f"Subcache {path} is truncated")
+        mappings = [
+            DyldSharedFileMapping.from_buffer_copy(mappings_bytes, mapping_idx * sizeof(DyldSharedFileMapping))
+            for mapping_idx in range(header.mappingCount)
         ]
+        return header, mappings
+
+    def _parse_dsc_mappings(self) -> None:
+        """Populates self.segment_mappings based on the mappings reported by the header of each file of the DSC."""
+        # Pairs of (mapping, static offset of the start of the file containing it)
+        mappings_and_file_bases: List[Tuple[DyldSharedFileMapping, int]] = []
 
-        # Parse the DSC mappings
         mapping_off = self.header.mappingOffset
-        for mapping_idx in range(self.header.mappingCount):
+        for _ in range(self.header.mappingCount):
             mapping_struct = self.read_struct(StaticFilePointer(mapping_off), DyldSharedFileMapping)
-            mapping_off += sizeof(DyldSharedCacheImageInfo)
-
+            mapping_off += sizeof(DyldSharedFileMapping)
+            mappings_and_file_bases.append((mapping_struct, 0))
+
+        # Only the headers of the subcaches are read here. Each subcache is mapped once an address within it is read
+        for subcache_idx, (subcache_path, expected_uuid) in enumerate(zip(self.subcache_paths, self._subcache_uuids)):
+            subcache_header, subcache_mappings = self._read_subcache_header(subcache_path)
+            if bytes(subcache_header.uuid) != expected_uuid:
+                raise ValueError(f"Subcache {subcache_path} does not belong to {self.path}")
+            file_base = (subcache_idx + 1) << self._SUBCACHE_OFFSET_SHIFT
+            mappings_and_file_bases.extend((mapping_struct, file_base) for mapping_struct in subcache_mappings)
+
+        for mapping_idx, (mapping_struct, file_base) in enumerate(mappings_and_file_bases):
             virt_addr = VirtualMemoryPointer(mapping_struct.address)
             virt_end = virt_addr + mapping_struct.size
-
-            static_addr = StaticFilePointer(mapping_struct.file_offset)
+            static_addr = StaticFilePointer(file_base + mapping_struct.file_offset)
             prot = mapping_struct.max_prot
-
             logger.debug(f"Mapping [{mapping_idx}]: [{virt_addr} - {virt_end}] @ {static_addr}, prot = {prot}")
-
-            # Verify the permissions of this mapping are as we expect
-            assert prot == expected_vm_protections[mapping_idx], f"{hex(prot)} {expected_vm_protections[mapping_idx]}"
-
             self.segment_mappings.append(mapping_struct)
 
+        # Sorting is stable, so mappings which start at the same address keep the order the files report them in
+        sorted_mappings = sorted(mappings_and_file_bases, key=lambda mapping_and_base: mapping_and_base[0].address)
+        self._sorted_mappings = [mapping for mapping, _ in sorted_mappings]
+        self._mapping_starts = array("Q", (mapping.address for mapping in self._sorted_mappings))
+        self._mapping_file_offsets = array("Q", (base + mapping.file_offset for mapping, base in sorted_mappings))
+
+    def _mapping_index_for_address(self, vm_addr: int) -> Optional[int]:
+        """Return the index within self._sorted_mappings of the mapping which contains an address."""
+        index = bisect_right(self._mapping_starts, vm_addr) - 1
+        if index >= 0:
+            mapping = self._sorted_mappings[index]
+            if vm_addr < mapping.address + mapping.size:
+                return index
+        return None
+
     def _parse_embedded_binaries(self) -> None:
         """Populates self.embedded_binary_info based on the images reported by the DSC header."""
-        # Parse the embedded binaries within the DSC
-        image_off = self.header.imagesOffset
-        for image_idx in range(self.header.imagesCount):
-            image_struct = self.read_struct(StaticFilePointer(image_off), DyldSharedCacheImageInfo)
-            image_off += sizeof(DyldSharedCacheImageInfo)
+        images_offset, images_count = self.header.imagesOffset, self.header.imagesCount
+        # Newer caches zero the original fields, and list their images in fields added after the subcache array
+        if not images_count and self._header_has_field(self.header, "imagesCountNew"):
+            images_offset, images_count = self.header.imagesOffsetNew, self.header.imagesCountNew
+
+        image_structs = [
+            self.read_struct(
+                StaticFilePointer(images_offset + image_idx * sizeof(DyldSharedCacheImageInfo)),
+                DyldSharedCacheImageInfo,
+            )
+            for image_idx in range(images_count)
+        ]
 
+        # Parse the embedded binaries within the DSC
+        for image_idx, image_struct in enumerate(image_structs):
             # Example: /System/Library/Frameworks/CoreFoundation.framework/CoreFoundation
             embedded_binary_path_str = self._read_static_c_string(image_struct.pathFileOffset)
             if not embedded_binary_path_str:
-                file_offset = image_off - sizeof(DyldSharedCacheImageInfo)
+                file_offset = images_offset + image_idx * sizeof(DyldSharedCacheImageInfo)
                 raise ValueError(f"Failed to read an image name for image struct @ {hex(file_offset)}")
             embedded_binary_path = Path(embedded_binary_path_str)
 
             vm_addr = VirtualMemoryPointer(image_struct.address)
-            # To calculate the size of this image, we need to look at the next image's address
-            # Except for the last image, which doesn't have an image after it
-            if image_idx == self.header.imagesCount - 1:
-                mapping_end = VirtualMemoryPointer(self.segment_mappings[0].address + self.segment_mappings[0].size)
-                image_size = mapping_end - vm_addr
+            # An image's __TEXT extends up to the next image, but never past the end of the mapping containing it.
+            # In a split cache, the next image may be in another subcache
+            mapping_idx = self._mapping_index_for_address(vm_addr)
+            mapping = self.segment_mappings[0] if mapping_idx is None else self._sorted_mappings[mapping_idx]
+            mapping_end = VirtualMemoryPointer(mapping.address + mapping.size)
+            # The last image doesn't have an image after it
+            if image_idx == images_count - 1:
+                vm_end = mapping_end
             else:
-                next_image = self.read_struct(StaticFilePointer(image_off), DyldSharedFileMapping)
-                image_size = next_image.address - image_struct.address
+                vm_end = VirtualMemoryPointer(min(image_structs[image_idx + 1].address, mapping_end))
 
-            vm_end = vm_addr + image_size
             self.embedded_binary_info[Path(embedded_binary_path)] = (vm_addr, vm_end)
 
+        self._build_image_index()
+
+    def _build_image_index(self) -> None:
+        """Sort the embedded images by the address of their __TEXT, for image_for_text_address()."""
+        # Sorting is stable, so if several images start at the same address, the first reported by the DSC is kept
+        sorted_images = sorted(self.embedded_binary_info.items(), key=lambda item: item[1][0])
+        for path, (text_vm_start, text_vm_end) in sorted_images:
+            if self._image_text_starts and self._image_text_starts[-1] == text_vm_start:
+                continue
+            self._image_text_starts.append(text_vm_start)
+            self._image_text_ends.append(text_vm_end)
+            self._sorted_image_paths.append(path)
+
     def translate_virtual_address_to_static(self, vm_addr: VirtualMemoryPointer) -> StaticFilePointer:
-        """Given a pointer within the DSC's virtual address mappings, return the file pointer to the same data."""
+        """Given a pointer within the DSC's virtual address mappings, return the file pointer to the same data.
+        For split caches, the file pointer is an offset within the global static address space that get_bytes() reads.
+        """
         # Find the mapping which contains the provided address
-        for mapping in self.segment_mappings:
-            if mapping.address <= vm_addr < mapping.address + mapping.size:
-                offset_into_segment = vm_addr - mapping.address
-                return StaticFilePointer(mapping.file_offset + offset_into_segment)
-        raise ValueError(f"Could not find address within DSC address space: {vm_addr}")
+        index = self._mapping_index_for_address(vm_addr)
+        if index is None:
+            raise ValueError(f"Could not find address within DSC address space: {vm_addr}")
+        offset_into_segment = vm_addr - self._mapping_starts[index]
+        return StaticFilePointer(self._mapping_file_offsets[index] + offset_into_segment)
+
+    def _translate_load_command_offset(
+        self, segments: Iterable[Tuple[int, int, int]], offset: int, size: int
+    ) -> StaticFilePointer:
+        """Translate a file offset from one of an image's load commands to the DSC's static address space.
+        `segments` holds the (vmaddr, fileoff, filesize) of the image's segments, in the order they should be searched.
+
+        In a split cache, a load command's file offset is relative to the subcache which contains the segment it
+        points into. This is often a different file to the image's __TEXT, so the offset is translated through the
+        segment's virtual address. In a cache which isn't split, the offset is already a static offset.
+        """
+        if self.subcache_paths:
+            for vmaddr, fileoff, filesize in segments:
+                if fileoff <= offset and offset + size <= fileoff + filesize:
+                    try:
+                        return self.translate_virtual_address_to_static(VirtualMemoryPointer(vmaddr + offset - fileoff))
+                    except ValueError:
+                        break
+        return StaticFilePointer(offset)
 
     def get_embedded_binary(self, binary_path: Path) -> "DyldSharedCacheBinary":
         """Given a path to a binary embedded in the DSC, retrieve & parse the embedded binary."""
@@ -208,12 +373,17 @@ class DyldSharedCacheParser:
 
         return DyldSharedCacheBinary(self, binary_path, static_addr, image_bytes)
 
+    def get_embedded_image(self, image_path: Path) -> "DyldSharedCacheImage":
+        """Given a path to an image embedded in the DSC, return a view of its load commands and symbols.
+        This is much cheaper than get_embedded_binary(), but the image can't be analyzed further.
+        """
+        return DyldSharedCacheImage(self, image_path)
+
     def image_for_text_address(self, address: VirtualMemoryPointer) -> Path:
         """Given a virtual memory address of __TEXT content, return the embedded image which contains it."""
-        for path, text_region in self.embedded_binary_info.items():
-            text_vm_start, text_vm_end = text_region
-            if text_vm_start <= address < text_vm_end:
-                return path
+        index = bisect_right(self._image_text_starts, address) - 1
+        if index >= 0 and address < self._image_text_ends[index]:
+            return self._sorted_image_paths[index]
         raise ValueError(f"No embedded __TEXT segment contains {address}")
 
 
@@ -234,17 +404,22 @@ class DyldSharedCacheBinary(MachoBinary):
     """
 
     def __init__(
-        self, dsc_parser: "DyldSharedCacheParser", path: Path, file_offset: StaticFilePointer, binary_data: bytes
+        self, dsc_parser: "DyldSharedCacheParser", path: Path, file_offset: StaticFilePointer, binary_data: memoryview
     ) -> None:
         self.dyld_shared_cache_parser = dsc_parser
         self.dyld_shared_cache_file_offset = file_offset
+        # The offset of the image within the cache file that contains it
+        _, self._offset_in_cache_file = dsc_parser._split_file_offset(file_offset)
         super().__init__(path, binary_data)
 
     def file_offset_for_virtual_address(self, virtual_address: VirtualMemoryPointer) -> StaticFilePointer:
         # Translate into the global DSC file
         return self.dyld_shared_cache_parser.translate_virtual_address_to_static(virtual_address)
 
-    def get_bytes(self, offset: StaticFilePointer, size: int, _translate_addr_to_file: bool = True) -> bytearray:
+    def file_offset_in_cache(
+        self, offset: StaticFilePointer, size: int, _translate_addr_to_file: bool = True
+    ) -> StaticFilePointer:
+        """Return the offset within the global DSC file of the data that get_bytes(offset, size) reads."""
         # There are two possibilities: The requested data is "binary-local", meaning it's within the __TEXT buffer
         # backing this object. Or, the requested data is somewhere within the global DSC.
         # It would be clear which is the case from the calling context. For example, if the pointer comes from
@@ -253,15 +428,216 @@ class DyldSharedCacheBinary(MachoBinary):
         # from every get_bytes caller, so try to determine what data is being requested here.
         # If offset+size refers to an address outside the local image, translate and read from the global DSC.
         # Otherwise, don't translate and read directly from the global DSC.
-        if offset + size > self.dyld_shared_cache_file_offset + len(self._cached_binary):
+        # In a split cache, these offsets are relative to the subcache containing the data, rather than to the main
+        # file. See DyldSharedCacheParser._translate_load_command_offset()
+        segments = [(segment.vmaddr, segment.offset, segment.size) for segment in self.segments]
+        if offset + size > self._offset_in_cache_file + len(self._cached_binary):
             logger.debug(f"Reading from addr outside __TEXT: {offset}")
             # This address is outside the binary's buffer. If translation was disabled, an assumption has been violated
             assert _translate_addr_to_file, f"Must translate addr outside __TEXT: {offset}"
+            # Data outside __TEXT is usually in __LINKEDIT, which is the last segment
+            return self.dyld_shared_cache_parser._translate_load_command_offset(reversed(segments), offset, size)
 
         else:
             if _translate_addr_to_file:
                 offset += self.dyld_shared_cache_file_offset
             else:
                 logger.debug(f"Translation explicitly disabled, direct read of {offset}")
+                return self.dyld_shared_cache_parser._translate_load_command_offset(segments, offset, size)
+
+        return offset
+
+    def get_bytes(self, offset: StaticFilePointer, size: int, _translate_addr_to_file: bool = True) -> bytearray:
+        file_offset = self.file_offset_in_cache(offset, size, _translate_addr_to_file)
+        return bytearray(self.dyld_shared_cache_parser.get_bytes(file_offset, size))
+
 
-        return bytearray(self.dyld_shared_cache_parser.get_bytes(offset, size))
+class DyldSharedCacheImage:
+    """A lightweight view of an image embedded in a dyld_shared_cache, for symbolication and dependency listing.
+
+    Only the Mach-O header and load commands are parsed upfront. The symbol table and export trie are read straight
+    from the DSC's mapping when they're requested. Unlike DyldSharedCacheBinary, the image's __TEXT isn't copied,
+    and its fixups and dyld info aren't processed.
+    """
+
+    # struct nlist_64
+    _NLIST_FORMAT = struct.Struct("<IBBHQ")
+
+    # Flags of an export trie entry
+    EXPORT_SYMBOL_FLAGS_REEXPORT = 0x08
+    EXPORT_SYMBOL_FLAGS_STUB_AND_RESOLVER = 0x10
+
+    def __init__(self, dsc_parser: DyldSharedCacheParser, path: Path) -> None:
+        if path not in dsc_parser.embedded_binary_info:
+            raise ValueError(f"DSC does not contain {path}")
+
+        self.dyld_shared_cache_parser = dsc_parser
+        self.path = path
+        text_vm_start, text_vm_end = dsc_parser.embedded_binary_info[path]
+        self.text_size = text_vm_end - text_vm_start
+        self.dyld_shared_cache_file_offset = dsc_parser.translate_virtual_address_to_static(text_vm_start)
+        # The offset of the image within the cache file that contains it
+        _, self._offset_in_cache_file = dsc_parser._split_file_offset(self.dyld_shared_cache_file_offset)
+
+        self.header = dsc_parser.read_struct(self.dyld_shared_cache_file_offset, MachoHeader64)
+        if self.header.magic != MachArch.MH_MAGIC_64:
+            raise ValueError(f"Unsupported magic {hex(self.header.magic)} for DSC image {path}")
+        self.file_type = MachoFileType(self.header.filetype)
+
+        self.segments: List[MachoSegmentCommand64] = []
+        self.linked_dylibs: List[str] = []
+        self.id_dylib: Optional[str] = None
+        self.symtab: Optional[MachoSymtabCommand] = None
+        # The image-relative (offset, size) of the export trie, from LC_DYLD_INFO or LC_DYLD_EXPORTS_TRIE
+        self._export_trie_region: Optional[Tuple[int, int]] = None
+        self._parse_load_commands()
+
+    def _parse_load_commands(self) -> None:
+        dsc_parser = self.dyld_shared_cache_parser
+        offset = self.dyld_shared_cache_file_offset + sizeof(MachoHeader64)
+        for _ in range(self.header.ncmds):
+            load_command = dsc_parser.read_struct(offset, MachoLoadCommand)
+
+            if load_command.cmd == MachoLoadCommands.LC_SEGMENT_64:
+                self.segments.append(dsc_parser.read_struct(offset, MachoSegmentCommand64))
+
+            elif load_command.cmd == MachoLoadCommands.LC_SYMTAB:
+                self.symtab = dsc_parser.read_struct(offset, MachoSymtabCommand)
+
+            elif load_command.cmd in [MachoLoadCommands.LC_DYLD_INFO, MachoLoadCommands.LC_DYLD_INFO_ONLY]:
+                dyld_info = dsc_parser.read_struct(offset, MachoDyldInfoCommand)
+                if dyld_info.export_size:
+                    self._export_trie_region = (dyld_info.export_off, dyld_info.export_size)
+
+            elif load_command.cmd == MachoLoadCommands.LC_DYLD_EXPORTS_TRIE:
+                export_trie = dsc_parser.read_struct(offset, MachoLinkeditDataCommand)
+                self._export_trie_region = (export_trie.dataoff, export_trie.datasize)
+
+            elif load_command.cmd in [
+                MachoLoadCommands.LC_LOAD_DYLIB,
+                MachoLoadCommands.LC_LOAD_WEAK_DYLIB,
+                MachoLoadCommands.LC_ID_DYLIB,
+            ]:
+                # The offset of the dylib's name from the start of the load command follows cmd and cmdsize
+                name_offset = c_uint32.from_buffer_copy(
+                    dsc_parser.get_bytes(StaticFilePointer(offset + sizeof(MachoLoadCommand)), sizeof(c_uint32))
+                ).value
+                name = dsc_parser._read_static_c_string(StaticFilePointer(offset + name_offset))
+                if load_command.cmd == MachoLoadCommands.LC_ID_DYLIB:
+                    self.id_dylib = name
+                else:
+                    self.linked_dylibs.append(name or DynamicLibrary.UNKNOWN_NAME)
+
+            offset += load_command.cmdsize
+
+    def __repr__(self) -> str:
+        return f"<DyldSharedCacheImage {self.path}>"
+
+    def get_virtual_base(self) -> VirtualMemoryPointer:
+        """Return the address of the image's __TEXT segment, which export trie entries are relative to."""
+        for segment in self.segments:
+            if segment.segname == b"__TEXT":
+                return VirtualMemoryPointer(segment.vmaddr)
+        raise LoadCommandMissingError(f"{self.path} has no __TEXT segment")
+
+    def file_offset_in_cache(self, offset: int, size: int) -> StaticFilePointer:
+        """Return the offset within the global DSC file of `size` bytes at an offset from a load command.
+        This follows the same rule as DyldSharedCacheBinary.file_offset_in_cache(): offsets which end within the image
+        are relative to the start of the image, and other offsets are relative to the start of the cache file which
+        contains them.
+        """
+        if offset + size > self._offset_in_cache_file + self.text_size:
+            segments = [(segment.vmaddr, segment.fileoff, segment.filesize) for segment in reversed(self.segments)]
+            return self.dyld_shared_cache_parser._translate_load_command_offset(segments, offset, size)
+        return StaticFilePointer(self.dyld_shared_cache_file_offset + offset)
+
+    def symtab_entries(self) -> Iterator[Tuple[int, int, int, int, int]]:
+        """Yield the (n_strx, n_type, n_sect, n_desc, n_value) fields of each entry in the image's symbol table."""
+        if not self.symtab:
+            return
+        size = self.symtab.nsyms * self._NLIST_FORMAT.size
+        symbols = self.dyld_shared_cache_parser.get_bytes(self.file_offset_in_cache(self.symtab.symoff, size), size)
+        yield from self._NLIST_FORMAT.iter_unpack(symbols)
+
+    def defined_symbols(self) -> List[Tuple[VirtualMemoryPointer, str]]:
+        """Return the address and name of each symbol the image defines in its symbol table.
+
+        These are the symbols, in the same order, that MachoAnalyzer.exported_symbol_names_to_pointers reports for
+        the image. The images in a DSC share one string table of every symbol name in the cache. Rather than decoding
+        all of it, like MachoStringTableHelper does, only the names of the image's own symbols are read.
+        """
+        if not self.symtab:
+            return []
+        dsc_parser = self.dyld_shared_cache_parser
+        string_table_size = self.symtab.strsize
+        string_table_start = self.file_offset_in_cache(self.symtab.stroff, string_table_size)
+        string_table_end = string_table_start + string_table_size
+        string_table = dsc_parser.get_bytes(string_table_start, string_table_size)
+
+        pointers_to_names: Dict[int, str] = {}
+        for string_table_index, symbol_type, _, _, value in self.symtab_entries():
+            if symbol_type & NLIST_NTYPE.N_TYPE != NTYPE_VALUES.N_SECT:
+                continue
+            # Like MachoStringTableHelper, only accept indexes of the first character of a string table entry
+            if string_table_index >= string_table_size or (
+                string_table_index > 0 and string_table[string_table_index - 1]
+            ):
+                continue
+            name_bytes = dsc_parser.get_c_string_bytes(
+                StaticFilePointer(string_table_start + string_table_index), string_table_end
+            )
+            if name_bytes is None:
+                continue
+            try:
+                pointers_to_names[value] = name_bytes.decode("utf-8")
+            except UnicodeDecodeError:
+                pointers_to_names[value] = str(name_bytes)
+
+        names_to_pointers = {name: pointer for pointer, name in pointers_to_names.items()}
+        return [(VirtualMemoryPointer(pointer), name) for name, pointer in names_to_pointers.items()]
+
+    def exported_symbols(self) -> Dict[str, VirtualMemoryPointer]:
+        """Return the address of each symbol in the image's export trie.
+        Symbols which the image re-exports from another dylib aren't included, as they have no address in the image.
+        For stub-and-resolver symbols, the address of the stub is returned.
+        """
+        from .dyld_info_parser import DyldInfoParser
+
+        if not self._export_trie_region:
+            return {}
+        trie_offset, trie_size = self._export_trie_region
+        trie = bytearray(
+            self.dyld_shared_cache_parser.get_bytes(self.file_offset_in_cache(trie_offset, trie_size), trie_size)
+        )
+        virtual_base = self.get_virtual_base()
+
+        exports: Dict[str, VirtualMemoryPointer] = {}
+        # Depth-first walk of (node offset, symbol prefix) pairs
+        nodes = [(0, b"")]
+        visited_nodes = set()
+        while nodes:
+            node_offset, prefix = nodes.pop()
+            # Guard against malformed tries which contain cycles
+            if node_offset in visited_nodes or node_offset >= trie_size:
+                continue
+            visited_nodes.add(node_offset)
+
+            terminal_size, index = DyldInfoParser.read_uleb(trie, node_offset)
+            children_offset = index + terminal_size
+            if terminal_size:
+                flags, index = DyldInfoParser.read_uleb(trie, index)
+                if not flags & self.EXPORT_SYMBOL_FLAGS_REEXPORT:
+                    symbol_offset, _ = DyldInfoParser.read_uleb(trie, index)
+                    exports[prefix.decode("utf-8", errors="replace")] = virtual_base + symbol_offset
+
+            child_count = trie[children_offset]
+            index = children_offset + 1
+            children = []
+            for _ in range(child_count):
+                edge_end = trie.index(0, index)
+                edge = bytes(trie[index:edge_end])
+                child_offset, index = DyldInfoParser.read_uleb(trie, edge_end + 1)
+                children.append((child_offset, prefix + edge))
+            # Visit the children in trie order
+            nodes.extend(reversed(children))
+        return exports
@@ -0,0 +1,336 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from ctypes import Structure, sizeof
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Type, TypeVar, Union, cast
+
+from strongarm.logger import strongarm_logger
+from strongarm.macho.dyld_shared_cache import DyldSharedCacheImage, DyldSharedCacheParser
+from strongarm.macho.macho_definitions import (
+    HEADER_FLAGS,
+    MachoDyldInfoCommand,
+    MachoDysymtabCommand,
+    MachoHeader64,
+    MachoLinkeditDataCommand,
+    MachoLoadCommand,
+    MachoNlist64,
+    MachoSection64Raw,
+    MachoSegmentCommand64,
+    MachoSymtabCommand,
+    StaticFilePointer,
+    VirtualMemoryPointer,
+)
+from strongarm.macho.macho_load_commands import MachoLoadCommands
+
+logger = strongarm_logger.getChild(__file__)
+
+_StructureT = TypeVar("_StructureT", bound=Structure)
+
+# Load commands whose only reference to the file is a linkedit_data_command pointing into __LINKEDIT
+_LINKEDIT_DATA_COMMANDS = [
+    MachoLoadCommands.LC_CODE_SIGNATURE,
+    MachoLoadCommands.LC_SEGMENT_SPLIT_INFO,
+    MachoLoadCommands.LC_FUNCTION_STARTS,
+    MachoLoadCommands.LC_DATA_IN_CODE,
+    MachoLoadCommands.LC_DYLIB_CODE_SIGN_DRS,
+    MachoLoadCommands.LC_LINKER_OPTIMIZATION_HINT,
+    MachoLoadCommands.LC_DYLD_EXPORTS_TRIE,
+    MachoLoadCommands.LC_DYLD_CHAINED_FIXUPS,
+]
+
+# The (offset field, size field) of each table a dyld_info_command points to
+_DYLD_INFO_TABLES = [
+    ("rebase_off", "rebase_size"),
+    ("bind_off", "bind_size"),
+    ("weak_bind_off", "weak_bind_size"),
+    ("lazy_bind_off", "lazy_bind_size"),
+    ("export_off", "export_size"),
+]
+
+# The (offset field, count field, entry size) of each table a dysymtab_command points to
+_DYSYMTAB_TABLES = [
+    ("tocoff", "ntoc", 8),
+    ("modtaboff", "nmodtab", 56),
+    ("extrefsymoff", "nextrefsyms", 4),
+    ("indirectsymoff", "nindirectsyms", 4),
+    ("extreloff", "nextrel", 8),
+    ("locreloff", "nlocrel", 8),
+]
+
+_PAGE_SIZE = 0x4000
+
+
+def _page_align(offset: int) -> int:
+    return (offset + _PAGE_SIZE - 1) & ~(_PAGE_SIZE - 1)
+
+
+def _read_command(load_commands: bytearray, offset: int, struct_type: Type[_StructureT]) -> _StructureT:
+    # Some structures, such as MachoDyldInfoCommand, are declared larger than the load command they describe
+    command_bytes = bytes(load_commands[offset : offset + sizeof(struct_type)])
+    return struct_type.from_buffer_copy(command_bytes.ljust(sizeof(struct_type), b"\x00"))
+
+
+def _write_command(load_commands: bytearray, offset: int, command: Structure, size: int) -> None:
+    load_commands[offset : offset + size] = bytes(command)[:size]
+
+
+class _LinkeditBuilder:
+    """Collects the __LINKEDIT tables of one image into a standalone __LINKEDIT segment.
+    The tables of every image in the DSC are interleaved in the DSC's __LINKEDIT, so only the image's own tables are
+    copied, and the symbol names are copied out of the string table that every image shares.
+    """
+
+    def __init__(self, image: DyldSharedCacheImage, file_offset: int) -> None:
+        self.image = image
+        # The offset of the rebuilt __LINKEDIT within the standalone image
+        self.file_offset = file_offset
+        self.contents = bytearray()
+
+    def add_table(self, offset: int, size: int) -> int:
+        """Copy `size` bytes at a load command's `offset` into __LINKEDIT, returning their offset in the new image."""
+        if not size:
+            return 0
+        dsc_parser = self.image.dyld_shared_cache_parser
+        return self.add_bytes(dsc_parser.get_bytes(self.image.file_offset_in_cache(offset, size), size))
+
+    def add_bytes(self, data: Union[bytes, memoryview]) -> int:
+        # Keep each table pointer-aligned, as ld64 does
+        self.contents += bytes(-len(self.contents) % 8)
+        table_offset = self.file_offset + len(self.contents)
+        self.contents += data
+        return table_offset
+
+    def add_symbol_table(self, symtab: MachoSymtabCommand) -> Tuple[int, int, int]:
+        """Copy the image's symbol table, and the names it references, into __LINKEDIT.
+        Returns the new (symoff, stroff, strsize). The symbols keep their order, so symbol indexes stay valid.
+        """
+        dsc_parser = self.image.dyld_shared_cache_parser
+        symbols_size = symtab.nsyms * sizeof(MachoNlist64)
+        symbols = bytearray(
+            dsc_parser.get_bytes(self.image.file_offset_in_cache(symtab.symoff, symbols_size), symbols_size)
+        )
+        string_table_start = self.image.file_offset_in_cache(symtab.stroff, symtab.strsize)
+        string_table_end = string_table_start + symtab.strsize
+
+        # Like ld64, begin the string table with " ", so that an index of 0 means "no name" and 1 is the empty string
+        string_table = bytearray(b" \x00")
+        names_to_indexes: Dict[bytes, int] = {b"": 1}
+        for symbol_offset in range(0, symbols_size, sizeof(MachoNlist64)):
+            symbol = MachoNlist64.from_buffer(symbols, symbol_offset)
+            if not symbol.n_un.n_strx:
+                continue
+            name = None
+            if symbol.n_un.n_strx < symtab.strsize:
+                name = dsc_parser.get_c_string_bytes(
+                    StaticFilePointer(string_table_start + symbol.n_un.n_strx), string_table_end
+                )
+            if name is None:
+                name = b""
+            name_index = names_to_indexes.get(name)
+            if name_index is None:
+                name_index = names_to_indexes[name] = len(string_table)
+                string_table += name + b"\x00"
+            symbol.n_un.n_strx = name_index
+
+        symoff = self.add_bytes(bytes(symbols))
+        stroff = self.add_bytes(bytes(string_table))
+        return symoff, stroff, len(string_table)
+
+
+def _rewrite_load_commands(
+    image: DyldSharedCacheImage, load_commands: bytearray, segment_file_offsets: Dict[bytes, int], linkedit_offset: int
+) -> bytes:
+    """Rewrite the file offsets in the image's header and load commands to the layout of the standalone image.
+    `load_commands` holds the header followed by the load commands, and is modified in place.
+    Returns the contents of the rebuilt __LINKEDIT.
+    """
+    linkedit = _LinkeditBuilder(image, linkedit_offset)
+    linkedit_segment_offset: Optional[int] = None
+    header = _read_command(load_commands, 0, MachoHeader64)
+    # The image no longer lives in the DSC
+    header.flags &= ~HEADER_FLAGS.DYLIB_IN_CACHE
+    _write_command(load_commands, 0, header, sizeof(MachoHeader64))
+
+    # The symbol table is copied once every other table is in place, as ld64 places it after them
+    symtab_offset: Optional[int] = None
+    offset = sizeof(MachoHeader64)
+    for _ in range(header.ncmds):
+        load_command = _read_command(load_commands, offset, MachoLoadCommand)
+
+        if load_command.cmd == MachoLoadCommands.LC_SEGMENT_64:
+            segment = _read_command(load_commands, offset, MachoSegmentCommand64)
+            if segment.segname == b"__LINKEDIT":
+                # The size of the rebuilt __LINKEDIT is only known once every table has been copied
+                linkedit_segment_offset = offset
+                offset += load_command.cmdsize
+                continue
+            new_fileoff = segment_file_offsets[segment.segname] if segment.filesize else 0
+            section_offset = offset + sizeof(MachoSegmentCommand64)
+            for _ in range(segment.nsects):
+                section = _read_command(load_commands, section_offset, MachoSection64Raw)
+                # Zero-fill sections have no file contents
+                if section.offset:
+                    section.offset = section.offset - segment.fileoff + new_fileoff
+                    _write_command(load_commands, section_offset, section, sizeof(MachoSection64Raw))
+                section_offset += sizeof(MachoSection64Raw)
+            segment.fileoff = new_fileoff
+            _write_command(load_commands, offset, segment, sizeof(MachoSegmentCommand64))
+
+        elif load_command.cmd in [MachoLoadCommands.LC_DYLD_INFO, MachoLoadCommands.LC_DYLD_INFO_ONLY]:
+            dyld_info = _read_command(load_commands, offset, MachoDyldInfoCommand)
+            for offset_field, size_field in _DYLD_INFO_TABLES:
+                table_offset = linkedit.add_table(getattr(dyld_info, offset_field), getattr(dyld_info, size_field))
+                setattr(dyld_info, offset_field, table_offset)
+            _write_command(load_commands, offset, dyld_info, load_command.cmdsize)
+
+        elif load_command.cmd == MachoLoadCommands.LC_DYSYMTAB:
+            dysymtab = _read_command(load_commands, offset, MachoDysymtabCommand)
+            for offset_field, count_field, entry_size in _DYSYMTAB_TABLES:
+                table_size = getattr(dysymtab, count_field) * entry_size
+                setattr(dysymtab, offset_field, linkedit.add_table(getattr(dysymtab, offset_field), table_size))
+            _write_command(load_commands, offset, dysymtab, load_command.cmdsize)
+
+        elif load_command.cmd in _LINKEDIT_DATA_COMMANDS:
+            linkedit_data = _read_command(load_commands, offset, MachoLinkeditDataCommand)
+            linkedit_data.dataoff = linkedit.add_table(linkedit_data.dataoff, linkedit_data.datasize)
+            _write_command(load_commands, offset, linkedit_data, load_command.cmdsize)
+
+        elif load_command.cmd == MachoLoadCommands.LC_SYMTAB:
+            symtab_offset = offset
+
+        offset += load_command.cmdsize
+
+    if symtab_offset is not None:
+        symtab = _read_command(load_commands, symtab_offset, MachoSymtabCommand)
+        symtab.symoff, symtab.stroff, symtab.strsize = linkedit.add_symbol_table(symtab)
+        _write_command(load_commands, symtab_offset, symtab, sizeof(MachoSymtabCommand))
+
+    linkedit.contents += bytes(-len(linkedit.contents) % 8)
+    if linkedit_segment_offset is not None:
+        linkedit_segment = _read_command(load_commands, linkedit_segment_offset, MachoSegmentCommand64)
+        linkedit_segment.fileoff = linkedit_offset
+        linkedit_segment.filesize = len(linkedit.contents)
+        linkedit_segment.vmsize = _page_align(len(linkedit.contents))
+        _write_command(load_commands, linkedit_segment_offset, linkedit_segment, sizeof(MachoSegmentCommand64))
+    return bytes(linkedit.contents)
+
+
+def extract_embedded_image(dyld_shared_cache: DyldSharedCacheParser, image_path: Path, output_path: Path) -> None:
+    """Rebuild an image embedded in the DSC into a standalone Mach-O at `output_path`.
+
+    Each of the image's segments is copied from the DSC's mappings into its own page-aligned range of the output, and
+    the image's tables are gathered out of the DSC's shared __LINKEDIT into a __LINKEDIT of its own. The file offsets
+    in the load commands are rewritten to match. Segment contents are written straight from the DSC's mapping, so the
+    image is never assembled in memory. Only the rebuilt __LINKEDIT is.
+
+    Virtual addresses are left as they are in the DSC. The contents of the segments are copied verbatim, so pointers
+    in the image's data keep the DSC's encoding, and references to other images, such as selector references, still
+    point into the DSC.
+    """
+    image = dyld_shared_cache.get_embedded_image(image_path)
+    header_and_commands_size = sizeof(MachoHeader64) + image.header.sizeofcmds
+    load_commands = bytearray(
+        dyld_shared_cache.get_bytes(image.dyld_shared_cache_file_offset, header_and_commands_size)
+    )
+
+    # Lay out the segments in load command order, with the rebuilt __LINKEDIT after every other segment
+    segment_file_offsets: Dict[bytes, int] = {}
+    file_offset = 0
+    for segment in image.segments:
+        if segment.segname == b"__LINKEDIT" or not segment.filesize:
+            continue
+        segment_file_offsets[segment.segname] = file_offset
+        file_offset = _page_align(file_offset + segment.filesize)
+    linkedit_offset = file_offset
+
+    linkedit = _rewrite_load_commands(image, load_commands, segment_file_offsets, linkedit_offset)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "wb") as output_file:
+        for segment in image.segments:
+            if segment.segname not in segment_file_offsets:
+                continue
+            if segment.segname == b"__TEXT":
+                # Locate __TEXT through the DSC's image list, as get_embedded_image() does
+                segment_start = image.dyld_shared_cache_file_offset
+            else:
+                segment_start = dyld_shared_cache.translate_virtual_address_to_static(
+                    VirtualMemoryPointer(segment.vmaddr)
+                )
+            output_file.seek(segment_file_offsets[segment.segname])
+            # Writing the view of the DSC's mapping hands its pages straight to the OS, without copying them
+            output_file.write(dyld_shared_cache.get_bytes(segment_start, segment.filesize))
+
+        output_file.seek(0)
+        output_file.write(load_commands)
+        output_file.seek(linkedit_offset)
+        output_file.write(linkedit)
+
+
+def _output_path_for_image(output_directory: Path, image_path: Path) -> Path:
+    """Images are extracted to the same path beneath the output directory as they have on the device."""
+    return output_directory / image_path.relative_to(image_path.anchor)
+
+
+def _extract_embedded_image_or_none(
+    dyld_shared_cache: DyldSharedCacheParser, image_path: Path, output_directory: Path
+) -> Optional[Path]:
+    output_path = _output_path_for_image(output_directory, image_path)
+    try:
+        extract_embedded_image(dyld_shared_cache, image_path, output_path)
+        return output_path
+    except Exception:
+        logger.error(f"Failed to extract {image_path}")
+        # Don't leave a partially written image behind
+        if output_path.exists():
+            output_path.unlink()
+        return None
+
+
+def extract_dyld_shared_cache(
+    dyld_shared_cache_path: Path,
+    output_directory: Path,
+    parallel_workers: Optional[int] = None,
+    image_paths: Optional[Iterable[Path]] = None,
+) -> Iterator[Tuple[Path, Optional[Path]]]:
+    """Rebuild images embedded in the DSC into standalone Mach-Os beneath `output_directory`.
+    Yields (image path, extracted path) as each image is extracted. The extracted path is None if the image couldn't
+    be extracted. Every image is extracted, unless `image_paths` is provided. See extract_embedded_image().
+
+    If `parallel_workers` is set, images are extracted across a pool of this many processes. Each worker maps the DSC
+    from its path, so the workers share the same pages of the file. Images are yielded as soon as they complete.
+    """
+    dyld_shared_cache = DyldSharedCacheParser(dyld_shared_cache_path)
+    images = list(dyld_shared_cache.embedded_binary_info) if image_paths is None else list(image_paths)
+    if not parallel_workers:
+        for image_path in images:
+            yield image_path, _extract_embedded_image_or_none(dyld_shared_cache, image_path, output_directory)
+        return
+
+    logger.debug(f"Extracting {len(images)} images across {parallel_workers} workers")
+    init_args = (dyld_shared_cache_path,)
+    with ProcessPoolExecutor(parallel_workers, initializer=_init_extraction_worker, initargs=init_args) as executor:
+        futures_to_image_paths = {
+            executor.submit(_extract_image, image_path, output_directory): image_path for image_path in images
+        }
+        try:
+            for future in as_completed(futures_to_image_paths):
+                yield futures_to_image_paths[future], future.result()
+        finally:
+            # Don't extract the remaining images if the caller stopped iterating early
+            for future in futures_to_image_paths:
+                future.cancel()
+
+
+# The DSC used by each process of a parallel extraction. See extract_dyld_shared_cache()
+_worker_dyld_shared_cache: Optional[DyldSharedCacheParser] = None
+
+
+def _init_extraction_worker(dyld_shared_cache_path: Path) -> None:
+    global _worker_dyld_shared_cache
+    _worker_dyld_shared_cache = DyldSharedCacheParser(dyld_shared_cache_path)
+
+
+def _extract_image(image_path: Path, output_directory: Path) -> Optional[Path]:
+    return _extract_embedded_image_or_none(
+        cast(DyldSharedCacheParser, _worker_dyld_shared_cache), image_path, output_directory
+    )
@@ -0,0 +1,358 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from strongarm.logger import strongarm_logger
+from strongarm.macho.dyld_shared_cache import DyldSharedCacheParser
+from strongarm.macho.dyld_shared_cache_symbol_map import iter_dyld_shared_cache_symbols
+
+logger = strongarm_logger.getChild(__file__)
+
+# The image containing an address, the name of the closest symbol at or before the address (or None if the image
+# defines no symbol before it), and the offset of the address from that symbol (or from the start of the image)
+SymbolicatedAddress = Tuple[Path, Optional[str], int]
+
+
+class DyldSharedCacheSymbolIndex:
+    """A sorted index of every symbol defined by the images in a dyld_shared_cache, for bulk symbolication.
+
+    The index is a set of flat arrays:
+    * The address of each symbol, sorted, along with the ID of its name and of the image which defines it
+    * The __TEXT range and name ID of each image, sorted by address
+    * A table of the first symbol within each 64KiB bucket of the cache's address space, which narrows each lookup
+      to a handful of symbols
+    * The offset of each name within a blob of every name. Symbol names and image paths are stored once each
+
+    for_dyld_shared_cache() builds the index the first time it's used with a DSC and saves it next to the DSC.
+    Afterwards, the saved index is memory-mapped, so loading it costs almost nothing.
+    """
+
+    INDEX_FILE_SUFFIX = ".strongarm-symbols"
+
+    _MAGIC = b"SASYMIDX"
+    _VERSION = 1
+    # magic, version, image count, symbol count, name count, name blob size, DSC UUID, DSC size, bucket shift,
+    # bucket count, bucket base address
+    _HEADER = struct.Struct("<8sIIQQQ16sQIIQ")
+    _BUCKET_SHIFT = 16
+
+    def __init__(
+        self,
+        dyld_shared_cache_uuid: bytes,
+        dyld_shared_cache_size: int,
+        symbol_addresses: Sequence[int],
+        symbol_name_ids: Sequence[int],
+        symbol_image_ids: Sequence[int],
+        image_text_starts: Sequence[int],
+        image_text_ends: Sequence[int],
+        image_name_ids: Sequence[int],
+        bucket_base: int,
+        buckets: Sequence[int],
+        name_offsets: Sequence[int],
+        name_blob: Union[bytes, memoryview],
+    ) -> None:
+        """Use build(), load() or for_dyld_shared_cache() rather than constructing an index directly."""
+        self.dyld_shared_cache_uuid = dyld_shared_cache_uuid
+        self.dyld_shared_cache_size = dyld_shared_cache_size
+        self._symbol_addresses = symbol_addresses
+        self._symbol_name_ids = symbol_name_ids
+        self._symbol_image_ids = symbol_image_ids
+        # The image and bucket tables are small, and lists are the quickest to index, so they're copied out of the
+        # mapped file. The symbol tables stay mapped
+        self._image_text_starts = list(image_text_starts)
+        self._image_text_ends = list(image_text_ends)
+        self._image_name_ids = list(image_name_ids)
+        self._bucket_base = bucket_base
+        self._buckets = list(buckets)
+        self._name_offsets = name_offsets
+        self._name_blob = name_blob
+        self._names: Dict[int, str] = {}
+        self.image_paths = [Path(self._name(name_id)) for name_id in image_name_ids]
+
+    def __len__(self) -> int:
+        return len(self._symbol_addresses)
+
+    def _name(self, name_id: int) -> str:
+        name = self._names.get(name_id)
+        if name is None:
+            name = bytes(self._name_blob[self._name_offsets[name_id] : self._name_offsets[name_id + 1]]).decode()
+            self._names[name_id] = name
+        return name
+
+    @staticmethod
+    def _identify(dyld_shared_cache: DyldSharedCacheParser) -> Tuple[bytes, int]:
+        """Return the values which tie an index to the DSC it was built from."""
+        return bytes(dyld_shared_cache.header.uuid).ljust(16, b"\x00"), os.path.getsize(dyld_shared_cache.path)
+
+    @classmethod
+    def build(
+        cls, dyld_shared_cache: DyldSharedCacheParser, parallel_workers: Optional[int] = None
+    ) -> "DyldSharedCacheSymbolIndex":
+        """Build an index of the symbols defined by every image in the DSC.
+        If `parallel_workers` is set, images are symbolicated across a pool of this many processes.
+        If several images define a symbol at the same address, the first image in the DSC's image order is kept.
+        """
+        names_to_ids: Dict[str, int] = {}
+
+        def intern(name: str) -> int:
+            name_id = names_to_ids.get(name)
+            if name_id is None:
+                name_id = names_to_ids[name] = len(names_to_ids)
+            return name_id
+
+        # Sort the images by the start of their __TEXT, as DyldSharedCacheParser.image_for_text_address() does
+        image_text_starts = array("Q")
+        image_text_ends = array("Q")
+        image_name_ids = array("I")
+        image_paths_to_ids: Dict[Path, int] = {}
+        for path, (text_vm_start, text_vm_end) in sorted(
+            dyld_shared_cache.embedded_binary_info.items(), key=lambda item: item[1][0]
+        ):
+            if image_text_starts and image_text_starts[-1] == text_vm_start:
+                continue
+            image_paths_to_ids[path] = len(image_text_starts)
+            image_text_starts.append(text_vm_start)
+            image_text_ends.append(text_vm_end)
+            image_name_ids.append(intern(str(path)))
+
+        addresses_to_symbols: Dict[int, Tuple[int, int]] = {}
+        for image_path, symbols in iter_dyld_shared_cache_symbols(
+            dyld_shared_cache.path, parallel_workers, ordered=True
+        ):
+            image_id = image_paths_to_ids.get(image_path)
+            if image_id is None or not symbols:
+                continue
+            for address, name in symbols:
+                if address not in addresses_to_symbols:
+                    addresses_to_symbols[address] = (intern(name), image_id)
+
+        symbol_addresses = array("Q", sorted(addresses_to_symbols))
+        symbol_name_ids = array("I", (addresses_to_symbols[address][0] for address in symbol_addresses))
+        symbol_image_ids = array("I", (addresses_to_symbols[address][1] for address in symbol_addresses))
+
+        # Bucket the address space spanned by the DSC's mappings
+        bucket_base = min(mapping.address for mapping in dyld_shared_cache.segment_mappings)
+        address_space_end = max(mapping.address + mapping.size for mapping in dyld_shared_cache.segment_mappings)
+        bucket_count = ((address_space_end - bucket_base) >> cls._BUCKET_SHIFT) + 1
+        buckets = array(
+            "I",
+            (
+                bisect_left(symbol_addresses, bucket_base + (bucket << cls._BUCKET_SHIFT))
+                for bucket in range(bucket_count + 1)
+            ),
+        )
+
+        encoded_names = [name.encode() for name in names_to_ids]
+        name_offsets = array("Q", [0])
+        for encoded_name in encoded_names:
+            name_offsets.append(name_offsets[-1] + len(encoded_name))
+
+        uuid, size = cls._identify(dyld_shared_cache)
+        return cls(
+            uuid,
+            size,
+            symbol_addresses,
+            symbol_name_ids,
+            symbol_image_ids,
+            image_text_starts,
+            image_text_ends,
+            image_name_ids,
+            bucket_base,
+            buckets,
+            name_offsets,
+            b"".join(encoded_names),
+        )
+
+    def save(self, path: Path) -> None:
+        """Write the index to a file, which can be memory-mapped by load()."""
+        arrays = [
+            array("Q", self._symbol_addresses),
+            array("I", self._symbol_name_ids),
+            array("I", self._symbol_image_ids),
+            array("Q", self._image_text_starts),
+            array("Q", self._image_text_ends),
+            array("I", self._image_name_ids),
+            array("I", self._buckets),
+            array("Q", self._name_offsets),
+        ]
+        header = self._HEADER.pack(
+            self._MAGIC,
+            self._VERSION,
+            len(self._image_text_starts),
+            len(self._symbol_addresses),
+            len(self._name_offsets) - 1,
+            len(self._name_blob),
+            self.dyld_shared_cache_uuid,
+            self.dyld_shared_cache_size,
+            self._BUCKET_SHIFT,
+            len(self._buckets) - 1,
+            self._bucket_base,
+        )
+        # Write to a temporary file first, so that an interrupted save never leaves a truncated index behind
+        temporary_path = path.with_name(f"{path.name}.tmp")
+        with open(temporary_path, "wb") as index_file:
+            index_file.write(header)
+            for values in arrays:
+                # The index is always stored little-endian
+                if sys.byteorder == "big":
+                    values.byteswap()
+                index_file.write(values.tobytes())
+                # Keep each array 8-byte aligned
+                index_file.write(bytes(-index_file.tell() % 8))
+            index_file.write(self._name_blob)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "DyldSharedCacheSymbolIndex":
+        """Memory-map an index written by save()."""
+        with open(path, "rb") as index_file:
+            mapping = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        contents = memoryview(mapping)
+        if len(contents) < cls._HEADER.size:
+            raise ValueError(f"{path} is truncated")
+
+        (
+            magic,
+            version,
+            image_count,
+            symbol_count,
+            name_count,
+            name_blob_size,
+            uuid,
+            size,
+            bucket_shift,
+            bucket_count,
+            bucket_base,
+        ) = cls._HEADER.unpack_from(contents)
+        if magic != cls._MAGIC or version != cls._VERSION or bucket_shift != cls._BUCKET_SHIFT:
+            raise ValueError(f"{path} is not a supported symbol index")
+
+        offset = cls._HEADER.size
+
+        def read_array(typecode: str, count: int) -> Sequence[int]:
+            nonlocal offset
+            item_size = array(typecode).itemsize
+            if offset + count * item_size > len(contents):
+                raise ValueError(f"{path} is truncated")
+            region = contents[offset : offset + count * item_size]
+            values: Sequence[int] = region.cast(typecode)  # type: ignore[call-overload]
+            if sys.byteorder == "big":
+                swapped_values = array(typecode, values)
+                swapped_values.byteswap()
+                values = swapped_values
+            offset += count * item_size
+            offset += -offset % 8
+            return values
+
+        symbol_addresses = read_array("Q", symbol_count)
+        symbol_name_ids = read_array("I", symbol_count)
+        symbol_image_ids = read_array("I", symbol_count)
+        image_text_starts = read_array("Q", image_count)
+        image_text_ends = read_array("Q", image_count)
+        image_name_ids = read_array("I", image_count)
+        buckets = read_array("I", bucket_count + 1)
+        name_offsets = read_array("Q", name_count + 1)
+        name_blob = contents[offset : offset + name_blob_size]
+        if len(name_blob) != name_blob_size:
+            raise ValueError(f"{path} is truncated")
+
+        return cls(
+            uuid,
+            size,
+            symbol_addresses,
+            symbol_name_ids,
+            symbol_image_ids,
+            image_text_starts,
+            image_text_ends,
+            image_name_ids,
+            bucket_base,
+            buckets,
+            name_offsets,
+            name_blob,
+        )
+
+    @classmethod
+    def for_dyld_shared_cache(
+        cls, dyld_shared_cache: DyldSharedCacheParser, parallel_workers: Optional[int] = None
+    ) -> "DyldSharedCacheSymbolIndex":
+        """Load the index saved next to the DSC, or build and save it if there's no up-to-date index.
+        If the index can't be saved, such as when the DSC is on a read-only volume, the built index is still returned.
+        """
+        index_path = dyld_shared_cache.path.with_name(f"{dyld_shared_cache.path.name}{cls.INDEX_FILE_SUFFIX}")
+        if index_path.exists():
+            try:
+                index = cls.load(index_path)
+                if (index.dyld_shared_cache_uuid, index.dyld_shared_cache_size) == cls._identify(dyld_shared_cache):
+                    return index
+                logger.info(f"Rebuilding out-of-date symbol index {index_path}")
+            except ValueError as e:
+                logger.warning(f"Rebuilding unreadable symbol index {index_path}: {e}")
+
+        index = cls.build(dyld_shared_cache, parallel_workers)
+        try:
+            index.save(index_path)
+        except OSError as e:
+            logger.warning(f"Failed to save symbol index to {index_path}: {e}")
+        return index
+
+    def symbolicate(self, addresses: Iterable[int]) -> List[Optional[SymbolicatedAddress]]:
+        """Symbolicate each address, returning (image path, symbol name, offset from symbol) in the same order.
+
+        The symbol is the closest one at or before the address, among those defined by the image whose __TEXT
+        contains the address. If that image defines no symbol before the address, the symbol name is None and the
+        offset is from the start of the image. Addresses outside every image's __TEXT are only symbolicated if
+        they're exactly the address of a symbol. Otherwise, None is returned for them.
+        """
+        symbol_addresses = self._symbol_addresses
+        symbol_name_ids = self._symbol_name_ids
+        symbol_image_ids = self._symbol_image_ids
+        image_paths = self.image_paths
+        names = self._names
+        image_text_starts = self._image_text_starts
+        image_text_ends = self._image_text_ends
+        buckets = self._buckets
+        bucket_base = self._bucket_base
+        last_bucket = len(buckets) - 2
+        bucket_shift = self._BUCKET_SHIFT
+
+        addresses = list(addresses)
+        # Backtraces repeat the same addresses many times, so each distinct address is only looked up once
+        results: Dict[int, Optional[SymbolicatedAddress]] = {}
+        for address in addresses:
+            if address in results:
+                continue
+
+            # Find the closest symbol at or before the address, searching only the symbols in its bucket
+            if address < bucket_base:
+                symbol_index = -1
+            else:
+                bucket = (address - bucket_base) >> bucket_shift
+                if bucket > last_bucket:
+                    bucket = last_bucket
+                high = buckets[bucket + 1] if bucket < last_bucket else len(symbol_addresses)
+                symbol_index = bisect_right(symbol_addresses, address, buckets[bucket], high) - 1
+
+            image_index = bisect_right(image_text_starts, address) - 1
+            if image_index >= 0 and address >= image_text_ends[image_index]:
+                image_index = -1
+
+            result: Optional[SymbolicatedAddress] = None
+            if symbol_index >= 0:
+                symbol_image_id = symbol_image_ids[symbol_index]
+                symbol_address = symbol_addresses[symbol_index]
+                if symbol_image_id == image_index or symbol_address == address:
+                    name_id = symbol_name_ids[symbol_index]
+                    name = names.get(name_id)
+                    if name is None:
+                        name = self._name(name_id)
+                    result = (image_paths[symbol_image_id], name, address - symbol_address)
+            if result is None and image_index >= 0:
+                result = (image_paths[image_index], None, address - image_text_starts[image_index])
+            results[address] = result
+
+        return [results[address] for address in addresses]
@@ -0,0 +1,128 @@
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, cast
+
+from strongarm.logger import strongarm_logger
+from strongarm.macho.dyld_shared_cache import DyldSharedCacheParser
+from strongarm.macho.macho_definitions import VirtualMemoryPointer
+
+logger = strongarm_logger.getChild(__file__)
+
+# The symbols defined by one image, as (address, name) pairs
+ImageSymbols = List[Tuple[VirtualMemoryPointer, str]]
+
+
+def exported_symbols_for_image(dyld_shared_cache: DyldSharedCacheParser, image_path: Path) -> ImageSymbols:
+    """Return the address and name of each symbol defined by an image embedded in the DSC.
+    These are the symbols, in the same order, that MachoAnalyzer.exported_symbol_names_to_pointers reports for the
+    image. See DyldSharedCacheImage.defined_symbols().
+    """
+    return dyld_shared_cache.get_embedded_image(image_path).defined_symbols()
+
+
+def _exported_symbols_or_none(dyld_shared_cache: DyldSharedCacheParser, image_path: Path) -> Optional[ImageSymbols]:
+    try:
+        return exported_symbols_for_image(dyld_shared_cache, image_path)
+    except Exception:
+        logger.error(f"Failed to symbolicate {image_path}")
+        return None
+
+
+def iter_dyld_shared_cache_symbols(
+    dyld_shared_cache_path: Path,
+    parallel_workers: Optional[int] = None,
+    skip_images: Iterable[Path] = (),
+    ordered: bool = False,
+) -> Iterator[Tuple[Path, Optional[ImageSymbols]]]:
+    """Yield (image path, symbols) for each image in the DSC, as each image is symbolicated.
+    The symbols are None if the image couldn't be parsed. Images in `skip_images` aren't symbolicated.
+
+    If `parallel_workers` is set, images are symbolicated across a pool of this many processes. Each worker maps the
+    DSC from its path, so the workers share the same pages of the file. Images are yielded as soon as they complete,
+    unless `ordered` is set, in which case they're yielded in the DSC's image order, like a sequential run.
+    """
+    dyld_shared_cache = DyldSharedCacheParser(dyld_shared_cache_path)
+    skipped_images = set(skip_images)
+    image_paths = [path for path in dyld_shared_cache.embedded_binary_info if path not in skipped_images]
+    if not parallel_workers:
+        for image_path in image_paths:
+            yield image_path, _exported_symbols_or_none(dyld_shared_cache, image_path)
+        return
+
+    logger.debug(f"Symbolicating {len(image_paths)} images across {parallel_workers} workers")
+    init_args = (dyld_shared_cache_path,)
+    with ProcessPoolExecutor(parallel_workers, initializer=_init_symbol_map_worker, initargs=init_args) as executor:
+        futures_to_image_paths = {executor.submit(_symbolicate_image, path): path for path in image_paths}
+        try:
+            # Dicts preserve insertion order, so iterating the futures directly visits them in image order
+            futures = futures_to_image_paths if ordered else as_completed(futures_to_image_paths)
+            for future in futures:
+                yield futures_to_image_paths[future], future.result()
+        finally:
+            # Don't symbolicate the remaining images if the caller stopped iterating early
+            for future in futures_to_image_paths:
+                future.cancel()
+
+
+def write_dyld_shared_cache_symbol_map(
+    dyld_shared_cache_path: Path,
+    output_csv_path: Path,
+    parallel_workers: Optional[int] = None,
+    ordered: bool = False,
+    resume: bool = False,
+) -> None:
+    """Write a CSV of (address, symbol name, image path) rows for each symbol defined by an image in the DSC.
+
+    Each image's rows are written as soon as it's symbolicated. See iter_dyld_shared_cache_symbols() for the meaning
+    of `parallel_workers` and `ordered`. Images which fail to parse are skipped.
+
+    While the map is written, the images that have been written are recorded in `<output_csv_path>.progress`, which
+    is removed once the map is complete. If `resume` is set and a previous run was interrupted, the images it
+    completed are kept and the map continues with the remaining images. Otherwise, the map is written from scratch.
+    """
+    progress_path = output_csv_path.with_name(f"{output_csv_path.name}.progress")
+    completed_images: List[Path] = []
+    # The size of the CSV once the last completed image was written
+    completed_csv_size = 0
+    if resume and progress_path.exists():
+        for line in progress_path.read_text().splitlines():
+            csv_size, completed_image = line.split("\t", 1)
+            completed_csv_size = int(csv_size)
+            completed_images.append(Path(completed_image))
+        logger.info(f"Resuming symbol map after {len(completed_images)} completed images")
+
+    # Discard any rows which were written after the last completed image
+    with open(output_csv_path, "a"):
+        pass
+    os.truncate(output_csv_path, completed_csv_size)
+
+    with open(output_csv_path, "a", newline="") as output_csv, open(progress_path, "a" if resume else "w") as progress:
+        csv_writer = csv.writer(output_csv, delimiter=",", quoting=csv.QUOTE_MINIMAL)
+        for image_path, symbols in iter_dyld_shared_cache_symbols(
+            dyld_shared_cache_path, parallel_workers, skip_images=completed_images, ordered=ordered
+        ):
+            if symbols is None:
+                continue
+            for address, name in symbols:
+                csv_writer.writerow((address, name, image_path))
+            # Only record the image as completed once its rows are on disk
+            output_csv.flush()
+            progress.write(f"{os.fstat(output_csv.fileno()).st_size}\t{image_path}\n")
+            progress.flush()
+
+    progress_path.unlink()
+
+
+# The DSC used by each process of a parallel symbolication. See iter_dyld_shared_cache_symbols()
+_worker_dyld_shared_cache: Optional[DyldSharedCacheParser] = None
+
+
+def _init_symbol_map_worker(dyld_shared_cache_path: Path) -> None:
+    global _worker_dyld_shared_cache
+    _worker_dyld_shared_cache = DyldSharedCacheParser(dyld_shared_cache_path)
+
+
+def _symbolicate_image(image_path: Path) -> Optional[ImageSymbols]:
+    return _exported_symbols_or_none(cast(DyldSharedCacheParser, _worker_dyld_shared_cache), image_path)
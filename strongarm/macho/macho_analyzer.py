@@ -4,20 +4,41 @@ import shutil
 import sqlite3
 import tempfile
 import time
+from array import array
+from bisect import bisect_left, bisect_right
 from contextlib import closing
 from ctypes import sizeof
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Type, TypeVar, cast
+from enum import Enum
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from capstone import CS_ARCH_ARM64, CS_MODE_ARM, Cs, CsInsn
-from more_itertools import first, pairwise
+from more_itertools import pairwise
 
 from strongarm.logger import strongarm_logger
 from strongarm.macho.arch_independent_structs import CFString32, CFString64, CFStringStruct
+from strongarm.macho.call_graph import CallGraph
+from strongarm.macho.control_flow_graph import ControlFlowGraph, compute_cfg_edges
+from strongarm.macho.data_xref_scanner import find_data_xrefs
+from strongarm.macho.disassembly_cache import DisassemblyCache
 from strongarm.macho.dyld_info_parser import DyldBoundSymbol
-from strongarm.macho.macho_binary import InvalidAddressError, MachoBinary
-from strongarm.macho.macho_definitions import VirtualMemoryPointer
-from strongarm.macho.macho_imp_stubs import MachoImpStubsParser
+from strongarm.macho.macho_binary import InvalidAddressError, MachoBinary, MachoSection
+from strongarm.macho.macho_definitions import StaticFilePointer, VirtualMemoryPointer
+from strongarm.macho.macho_imp_stubs import MachoImpStub, MachoImpStubsParser
 from strongarm.macho.macho_string_table_helper import MachoStringTableHelper
 from strongarm.macho.objc_runtime_data_parser import (
     ObjcCategory,
@@ -26,6 +47,7 @@ from strongarm.macho.objc_runtime_data_parser import (
     ObjcRuntimeDataParser,
     ObjcSelector,
 )
+from strongarm.macho.utils import cached_property
 
 if TYPE_CHECKING:
     from strongarm.objc import ObjcFunctionAnalyzer, ObjcMethodInfo
@@ -49,6 +71,10 @@ ANALYZER_SQL_SCHEMA = """
         CHECK(start_address < end_address),
         UNIQUE(entry_point, start_address, end_address)
     );
+    CREATE TABLE cfg_edges(
+        entry_point INT NOT NULL UNIQUE,
+        edges BLOB NOT NULL
+    );
 
     CREATE TABLE function_calls(
         destination_address INT,
@@ -75,6 +101,14 @@ ANALYZER_SQL_SCHEMA = """
         accessor_address INT,
         accessor_func_start_address INT
     );
+
+    CREATE TABLE data_xrefs(
+        target_address INT NOT NULL,
+        segment_name TEXT NOT NULL,
+        section_name TEXT NOT NULL,
+        accessor_address INT NOT NULL,
+        accessor_func_start_address INT NOT NULL
+    );
 """
 
 
@@ -95,6 +129,17 @@ class ObjcMsgSendXref(CallerXRef):
     selector: Optional[str]
 
 
+@dataclass(order=True, frozen=True)
+class DataXRef:
+    """A code location which materializes the address of something in a section of the binary."""
+
+    target_addr: VirtualMemoryPointer
+    segment_name: str
+    section_name: str
+    accessor_addr: VirtualMemoryPointer
+    accessor_func_start_address: VirtualMemoryPointer
+
+
 @dataclass
 class CallableSymbol:
     """A locally-defined function or externally-defined imported function."""
@@ -104,9 +149,44 @@ class CallableSymbol:
     symbol_name: str
 
 
+class AnalyzerStage(Enum):
+    """A unit of one-time work that MachoAnalyzer performs lazily, the first time an API needs its results.
+
+    Each stage may depend on other stages. See MachoAnalyzer._STAGE_DEPENDENCIES.
+    """
+
+    DISASSEMBLER = "disassembler"
+    STRING_TABLE = "string_table"
+    IMP_STUBS = "imp_stubs"
+    DATABASE = "database"
+    CALLABLE_SYMBOLS = "callable_symbols"
+    FUNCTION_BOUNDARIES = "function_boundaries"
+    CFSTRINGS = "cfstrings"
+    CSTRINGS = "cstrings"
+    OBJC_RUNTIME = "objc_runtime"
+    XREFS = "xrefs"
+    DATA_XREFS = "data_xrefs"
+    CALL_GRAPH = "call_graph"
+
+
 CallableT = TypeVar("CallableT", bound=Callable)
 
 
+def _requires_stages(*stages: AnalyzerStage) -> Callable[[CallableT], CallableT]:
+    """Ensure the provided analysis stages (and everything they depend on) have run before calling the method."""
+
+    def decorator(func: CallableT) -> CallableT:
+        @functools.wraps(func)
+        def wrap(self: "MachoAnalyzer", *args: Any, **kwargs: Any) -> Any:
+            for stage in stages:
+                self._run_stage(stage)
+            return func(self, *args, **kwargs)
+
+        return cast(CallableT, wrap)
+
+    return decorator
+
+
 def _requires_xrefs_computed(func: CallableT) -> CallableT:
     @functools.wraps(func)
     def wrap(self: "MachoAnalyzer", *args: Any, **kwargs: Any) -> Any:
@@ -120,31 +200,6 @@ def _requires_xrefs_computed(func: CallableT) -> CallableT:
     return cast(CallableT, wrap)
 
 
-class cached_property(object):
-    """A property whose value is computed only once.
-    Used as a < py3.8 alternative to @functools.cached_property
-    Avoiding @functools.lru_cache as they would keep-alive the MachoAnalyzer forever. See:
-    https://bugs.python.org/issue19859
-    Implementation copied from:
-    https://github.com/pallets/werkzeug/blob/0e1b8c4fe598725b343085c5a9a867e90b966db6/werkzeug/utils.py#L35-L73
-    """
-
-    def __init__(self, func: Callable) -> None:
-        self.__name__ = func.__name__
-        self.__module__ = func.__module__
-        self.__doc__ = func.__doc__
-        self.func = func
-
-    def __get__(self, obj: Any, _type: Optional[Type] = None) -> Any:
-        if obj is None:
-            return self
-        value = obj.__dict__.get(self.__name__, None)
-        if value is None:
-            value = self.func(obj)
-            obj.__dict__[self.__name__] = value
-        return value
-
-
 class MachoAnalyzer:
     # This class does expensive one-time cross-referencing operations
     # Therefore, we want only one instance to exist for any MachoBinary
@@ -153,47 +208,173 @@ class MachoAnalyzer:
     # XXX(PT): These references live to process termination, or until clear_cache() is called
     _ANALYZER_CACHE: Dict[MachoBinary, "MachoAnalyzer"] = {}
 
-    def __init__(self, binary: MachoBinary) -> None:
+    # The stages which must be complete before each stage can run
+    _STAGE_DEPENDENCIES: Dict[AnalyzerStage, List[AnalyzerStage]] = {
+        AnalyzerStage.DISASSEMBLER: [],
+        AnalyzerStage.STRING_TABLE: [],
+        AnalyzerStage.IMP_STUBS: [AnalyzerStage.DISASSEMBLER],
+        AnalyzerStage.DATABASE: [],
+        AnalyzerStage.CALLABLE_SYMBOLS: [AnalyzerStage.DATABASE, AnalyzerStage.STRING_TABLE, AnalyzerStage.IMP_STUBS],
+        AnalyzerStage.FUNCTION_BOUNDARIES: [AnalyzerStage.DATABASE],
+        AnalyzerStage.CFSTRINGS: [],
+        AnalyzerStage.CSTRINGS: [],
+        AnalyzerStage.OBJC_RUNTIME: [],
+        AnalyzerStage.XREFS: [
+            AnalyzerStage.CALLABLE_SYMBOLS,
+            AnalyzerStage.FUNCTION_BOUNDARIES,
+            AnalyzerStage.OBJC_RUNTIME,
+        ],
+        AnalyzerStage.DATA_XREFS: [AnalyzerStage.FUNCTION_BOUNDARIES],
+        AnalyzerStage.CALL_GRAPH: [AnalyzerStage.XREFS],
+    }
+    # The name of the method which performs the work of each stage
+    _STAGE_BUILDERS: Dict[AnalyzerStage, str] = {
+        AnalyzerStage.DISASSEMBLER: "_build_disassembler",
+        AnalyzerStage.STRING_TABLE: "_build_string_table",
+        AnalyzerStage.IMP_STUBS: "_build_imp_stubs",
+        AnalyzerStage.DATABASE: "_build_database",
+        AnalyzerStage.CALLABLE_SYMBOLS: "_build_callable_symbol_index",
+        AnalyzerStage.FUNCTION_BOUNDARIES: "_build_function_boundaries_index",
+        AnalyzerStage.CFSTRINGS: "_build_cfstring_map",
+        AnalyzerStage.CSTRINGS: "_build_cstring_map",
+        AnalyzerStage.OBJC_RUNTIME: "_build_objc_helper",
+        AnalyzerStage.XREFS: "_populate_xref_tables",
+        AnalyzerStage.DATA_XREFS: "_populate_data_xrefs_table",
+        AnalyzerStage.CALL_GRAPH: "_build_call_graph",
+    }
+
+    def __init__(self, binary: MachoBinary, lazy_objc_parsing: bool = False) -> None:
         self.binary = binary
-        self.cs = Cs(CS_ARCH_ARM64, CS_MODE_ARM)
-        self.cs.detail = True
+        # If set, each ObjC class is only parsed once it's needed. See ObjcRuntimeDataParser
+        self._lazy_objc_parsing = lazy_objc_parsing
+
+        # Analysis is split into stages which are run on-demand, the first time an API needs their results.
+        # See AnalyzerStage and MachoAnalyzer.warm()
+        self._completed_stages: Set[AnalyzerStage] = set()
+        self._stage_timings: Dict[AnalyzerStage, float] = {}
 
         # Each __stubs function calls a single dyld stub address, which has a corresponding DyldBoundSymbol.
         # Map of each __stub function to the associated name of the DyldBoundSymbol
         self._imported_symbol_addresses_to_names: Dict[VirtualMemoryPointer, str] = {}
 
-        self.crossref_helper = MachoStringTableHelper(binary)
-        self.imported_symbols = self.crossref_helper.imported_symbols
+        # Every imported and locally-defined callable symbol, indexed by address and by name
+        self._callable_symbols_by_address: Dict[VirtualMemoryPointer, CallableSymbol] = {}
+        self._callable_symbols_by_name: Dict[str, CallableSymbol] = {}
+        # The sorted address of each callable symbol, to find the symbol preceding an arbitrary address
+        self._callable_symbol_addresses = array("Q")
+        # Addresses and names which more than one callable symbol claims
+        self._ambiguous_callable_symbol_keys: Set[Union[VirtualMemoryPointer, str]] = set()
+
+        # The sorted entry point of each function, and its (right-exclusive) end address at the same index
+        self._function_entry_points = array("Q")
+        self._function_end_addresses = array("Q")
+        self._function_boundaries: FrozenSet[Tuple[VirtualMemoryPointer, VirtualMemoryPointer]] = frozenset()
 
-        self.imp_stubs = MachoImpStubsParser(binary, self.cs).imp_stubs
         self._objc_helper: Optional[ObjcRuntimeDataParser] = None
+        self._call_graph: Optional[CallGraph] = None
         self._objc_method_list: List[ObjcMethodInfo] = []
 
-        # Use a temporary database to store cross-referenced data. This provides constant-time lookups for things like
-        # finding all the calls to a particular function.
-        self._has_computed_xrefs = False
-        self._db_tempdir = pathlib.Path(tempfile.mkdtemp())
-        self._db_path = self._db_tempdir / "strongarm.db"
-        self._db_handle = sqlite3.connect(self._db_path.as_posix())
-        cursor = self._db_handle.executescript(ANALYZER_SQL_SCHEMA)
-        with self._db_handle:
-            cursor.close()
-
-        self._build_callable_symbol_index()
-        self._build_function_boundaries_index()
-
-        self._cfstring_to_stringref_map = self._build_cfstring_map()
-        self._cstring_to_stringref_map = self._build_cstring_map()
+        self._cfstrings_to_stringrefs: Dict[str, VirtualMemoryPointer] = {}
+        self._cstrings_to_stringrefs: Dict[str, VirtualMemoryPointer] = {}
 
         self.__cached_strings: Optional[Set[str]] = None
         self.__cached_cstrings: Optional[Set[str]] = None
 
+        # Function analyzers handed out by get_function_analyzer(), keyed by the (entry point, size) of the function.
+        # Each is kept only while the DisassemblyCache holds its instructions
+        self._function_analyzers: Dict[Tuple[VirtualMemoryPointer, int], ObjcFunctionAnalyzer] = {}
+
         # Done setting up, store this analyzer in class cache
         MachoAnalyzer._ANALYZER_CACHE[binary] = self
 
     def __repr__(self) -> str:
         return f"<MachoAnalyzer binary={self.binary.path.as_posix()}>"
 
+    def _run_stage(self, stage: AnalyzerStage) -> None:
+        """Run an analysis stage, after running each stage it depends on. Stages only ever run once."""
+        if stage in self._completed_stages:
+            return
+
+        for dependency in self._STAGE_DEPENDENCIES[stage]:
+            self._run_stage(dependency)
+
+        start_time = time.perf_counter()
+        getattr(self, self._STAGE_BUILDERS[stage])()
+        # Don't include the time spent on dependencies, so the timings of each stage sum up to the total
+        self._stage_timings[stage] = time.perf_counter() - start_time
+        self._completed_stages.add(stage)
+        logger.debug(f"{self.binary.path.name} stage {stage.value} took {self._stage_timings[stage]:.3f} seconds")
+
+    def warm(self, stages: Optional[Iterable[AnalyzerStage]] = None) -> None:
+        """Eagerly run the provided analysis stages, or every stage if none are provided.
+        Analysis stages otherwise run lazily, the first time an API needs their results.
+        """
+        for stage in stages if stages is not None else list(AnalyzerStage):
+            self._run_stage(stage)
+
+    @property
+    def stage_timings(self) -> Dict[AnalyzerStage, float]:
+        """Return the number of seconds spent running each completed analysis stage, excluding its dependencies."""
+        return dict(self._stage_timings)
+
+    @property
+    def _has_computed_xrefs(self) -> bool:
+        return AnalyzerStage.XREFS in self._completed_stages
+
+    def _build_disassembler(self) -> None:
+        self._cs = Cs(CS_ARCH_ARM64, CS_MODE_ARM)
+        self._cs.detail = True
+        self._disassembly_cache = DisassemblyCache(self.binary, self._cs, on_evict=self._release_function_analyzer)
+
+    def _release_function_analyzer(self, region: Tuple[VirtualMemoryPointer, int]) -> None:
+        """Drop the cached analyzer of a function whose instructions were evicted from the DisassemblyCache."""
+        self._function_analyzers.pop(region, None)
+
+    @property
+    @_requires_stages(AnalyzerStage.DISASSEMBLER)
+    def cs(self) -> Cs:
+        return self._cs
+
+    @property
+    @_requires_stages(AnalyzerStage.DISASSEMBLER)
+    def disassembly_cache(self) -> DisassemblyCache:
+        return self._disassembly_cache
+
+    def _build_string_table(self) -> None:
+        self._crossref_helper = MachoStringTableHelper(self.binary)
+
+    @property
+    @_requires_stages(AnalyzerStage.STRING_TABLE)
+    def crossref_helper(self) -> MachoStringTableHelper:
+        return self._crossref_helper
+
+    @property
+    def imported_symbols(self) -> List[str]:
+        return self.crossref_helper.imported_symbols
+
+    def _build_imp_stubs(self) -> None:
+        self._imp_stubs = MachoImpStubsParser(self.binary, self.cs).imp_stubs
+
+    @property
+    @_requires_stages(AnalyzerStage.IMP_STUBS)
+    def imp_stubs(self) -> List[MachoImpStub]:
+        return self._imp_stubs
+
+    def _build_database(self) -> None:
+        # Use a temporary database to store cross-referenced data. This provides constant-time lookups for things like
+        # finding all the calls to a particular function.
+        self._db_tempdir = pathlib.Path(tempfile.mkdtemp())
+        self._db_path = self._db_tempdir / "strongarm.db"
+        self._db_connection = sqlite3.connect(self._db_path.as_posix())
+        cursor = self._db_connection.executescript(ANALYZER_SQL_SCHEMA)
+        with self._db_connection:
+            cursor.close()
+
+    @property
+    @_requires_stages(AnalyzerStage.DATABASE)
+    def _db_handle(self) -> sqlite3.Connection:
+        return self._db_connection
+
     @_requires_xrefs_computed
     def calls_to(self, address: VirtualMemoryPointer) -> List[CallerXRef]:
         """Return the list of code-locations within the binary which branch to the provided address."""
@@ -227,9 +408,76 @@ class MachoAnalyzer:
         objc_calls_cursor = self._db_handle.execute(query)
         return [ObjcMsgSendXref(x[0], x[1], x[2], x[3], x[4]) for x in objc_calls_cursor]
 
+    def _build_call_graph(self) -> None:
+        """Build the CallGraph from the function_calls and objc_msgSends tables.
+
+        Each _objc_msgSend call is an edge to the messaging function. It's also an edge to each local implementation
+        of the messaged selector which could handle the message: when the receiver's class is known, these are its
+        class' (or its categories') implementations. When the receiver is a local class which inherits the selector,
+        or the receiver's class is unknown, every local implementation of the selector is included.
+        """
+        edges: List[Tuple[VirtualMemoryPointer, VirtualMemoryPointer]] = []
+        cursor = self._db_handle.execute("SELECT caller_func_start_address, destination_address FROM function_calls")
+        with closing(cursor):
+            edges.extend((VirtualMemoryPointer(x[0]), VirtualMemoryPointer(x[1])) for x in cursor)
+
+        selectors_to_implementations: Dict[str, List[Tuple[str, VirtualMemoryPointer]]] = {}
+        for method_info in self.get_objc_methods():
+            if method_info.imp_addr:
+                selectors_to_implementations.setdefault(method_info.objc_sel.name, []).append(
+                    (method_info.objc_class.name, method_info.imp_addr)
+                )
+        local_class_names = {class_name for impls in selectors_to_implementations.values() for class_name, _ in impls}
+
+        cursor = self._db_handle.execute(
+            "SELECT caller_func_start_address, destination_address, class_name, selector FROM objc_msgSends"
+        )
+        with closing(cursor):
+            for caller_func_start_address, destination_address, class_name, selector in cursor:
+                caller = VirtualMemoryPointer(caller_func_start_address)
+                edges.append((caller, VirtualMemoryPointer(destination_address)))
+
+                implementations = selectors_to_implementations.get(selector, [])
+                if class_name is not None:
+                    category_prefix = f"{class_name} ("
+                    class_implementations = [
+                        (implementing_class, imp)
+                        for implementing_class, imp in implementations
+                        if implementing_class == class_name or implementing_class.startswith(category_prefix)
+                    ]
+                    if class_implementations or class_name not in local_class_names:
+                        implementations = class_implementations
+                edges.extend((caller, imp) for _, imp in implementations)
+
+        self._call_graph = CallGraph(edges, (entry_point for entry_point, _ in self.get_function_boundaries()))
+
+    @property
+    @_requires_stages(AnalyzerStage.CALL_GRAPH)
+    def call_graph(self) -> CallGraph:
+        """The graph of calls between every function in the binary."""
+        return cast(CallGraph, self._call_graph)
+
+    def search_call_tree(
+        self, source_function: VirtualMemoryPointer, destination_address: VirtualMemoryPointer
+    ) -> List[CallerXRef]:
+        """Return the call-sites which branch to destination_address, within any function reachable from the
+        function at source_function through a chain of calls (including source_function itself).
+        """
+        call_graph = self.call_graph
+        if destination_address not in call_graph:
+            return []
+        reachable_callers = {
+            caller
+            for caller in call_graph.callers(destination_address)
+            if call_graph.is_reachable(source_function, caller)
+        }
+        return [
+            xref for xref in self.calls_to(destination_address) if xref.caller_func_start_address in reachable_callers
+        ]
+
     def _compute_function_basic_blocks(
-        self, entry_point: VirtualMemoryPointer, end_address: VirtualMemoryPointer
-    ) -> Iterable[Tuple[int, int]]:
+        self, entry_point: VirtualMemoryPointer, bytecode: bytearray
+    ) -> List[Tuple[int, int]]:
         # PT: This implicitly links against the capstone shared library,
         # and if capstone is not installed correctly it will raise an ImportError.
         # Report this in a clearer way so the user can see exactly what went wrong.
@@ -243,13 +491,11 @@ class MachoAnalyzer:
                 sys.exit(1)
             raise
 
-        bytecode = self.binary.get_content_from_virtual_address(
-            virtual_address=entry_point, size=end_address - entry_point
-        )
         basic_block_starts = compute_function_basic_blocks_fast(bytecode, entry_point)
         # Convert basic-block starts to [start, end] pairs
-        return pairwise(x for x in basic_block_starts)
+        return list(pairwise(x for x in basic_block_starts))
 
+    @_requires_stages(AnalyzerStage.FUNCTION_BOUNDARIES)
     def get_basic_block_boundaries(
         self, entry_point: VirtualMemoryPointer
     ) -> List[Tuple[VirtualMemoryPointer, VirtualMemoryPointer]]:
@@ -260,6 +506,21 @@ class MachoAnalyzer:
         with closing(cursor):
             return [(VirtualMemoryPointer(x[0]), VirtualMemoryPointer(x[1])) for x in cursor]
 
+    @_requires_stages(AnalyzerStage.FUNCTION_BOUNDARIES)
+    def get_control_flow_graph(self, entry_point: VirtualMemoryPointer) -> ControlFlowGraph:
+        """Return the ControlFlowGraph of the function starting at the provided address.
+        The edges between basic blocks are found alongside the blocks, so no disassembly is needed.
+        """
+        cursor = self._db_handle.execute("SELECT edges FROM cfg_edges WHERE entry_point=?", (entry_point,))
+        with closing(cursor):
+            result = cursor.fetchone()
+        if result is None:
+            raise RuntimeError(f"No function with start address {entry_point} found.")
+
+        edges = array("I")
+        edges.frombytes(result[0])
+        return ControlFlowGraph(entry_point, self.get_basic_block_boundaries(entry_point), edges)
+
     def _build_function_boundaries_index(self) -> None:
         """Iterate all the entry points listed in the binary metadata and compute the end-of-function address for each.
         The end-of-function address for each entry point is then stored in a DB table.
@@ -282,23 +543,35 @@ class MachoAnalyzer:
             sorted_entry_points.append(VirtualMemoryPointer(section.end_address))
 
         for entry_point, end_address in pairwise(sorted_entry_points):
+            bytecode = self.binary.get_content_from_virtual_address(
+                virtual_address=entry_point, size=end_address - entry_point
+            )
             # The end address of the function is the last instruction in the last basic block
-            basic_blocks = [x for x in self._compute_function_basic_blocks(entry_point, end_address)]
+            basic_blocks = self._compute_function_basic_blocks(entry_point, bytecode)
             # If we found a function with no code, just skip it
             # This can happen in the assembly unit tests, where we insert a jump to a dummy __text label
             if len(basic_blocks) == 0:
                 continue
             end_address = VirtualMemoryPointer(max((bb_end for _, bb_end in basic_blocks)))
+            self._function_entry_points.append(entry_point)
+            self._function_end_addresses.append(end_address)
             cursor.execute(
                 "INSERT INTO function_boundaries (entry_point, end_address) VALUES (?, ?)", (entry_point, end_address)
             )
             cursor.executemany(
                 "INSERT INTO basic_blocks VALUES (?, ?, ?)", [(entry_point, t[0], t[1]) for t in basic_blocks]
             )
+            cfg_edges = compute_cfg_edges(bytecode, entry_point, basic_blocks)
+            cursor.execute("INSERT INTO cfg_edges VALUES (?, ?)", (entry_point, cfg_edges.tobytes()))
 
         with self._db_handle:
             cursor.close()
 
+        self._function_boundaries = frozenset(
+            (VirtualMemoryPointer(start), VirtualMemoryPointer(end))
+            for start, end in zip(self._function_entry_points, self._function_end_addresses)
+        )
+
     @cached_property
     def _objc_msgSend_addr(self) -> Optional[VirtualMemoryPointer]:
         objc_msgsend_symbol = self.callable_symbol_for_symbol_name("_objc_msgSend")
@@ -352,12 +625,15 @@ class MachoAnalyzer:
         * function_calls
         * objc_msgSends
         * string_xrefs
+        The data_xrefs table is filled separately, by the DATA_XREFS stage, only once an API needs it.
         """
-        from strongarm_dataflow.dataflow import build_xref_database_fast
-
         if self._has_computed_xrefs:
             logger.error("Already computed xrefs, why was _build_xref_database called again?")
             return
+        self._run_stage(AnalyzerStage.XREFS)
+
+    def _populate_xref_tables(self) -> None:
+        from strongarm_dataflow.dataflow import build_xref_database_fast
 
         start_time = time.time()
         logger.debug(f"{self.binary.path} computing call XRefs...")
@@ -369,59 +645,120 @@ class MachoAnalyzer:
         # SCAN-3535: For each function entry point, we'll need its file offset.
         # When the function is in __TEXT this'll simply be (virt_addr - __TEXT.virt_base), but we've encountered
         # cases in which functions are stored in a segment other than __TEXT.
-        boundaries_with_file_off = [
-            (tup, self.binary.file_offset_for_virtual_address(tup[0])) for tup in self.get_function_boundaries()
-        ]
-        build_xref_database_fast(
-            self,
-            self.binary.path.as_posix(),
-            self._db_path.as_posix(),
-            self.binary.get_virtual_base(),
-            self.binary.get_file_offset(),
-            self._objc_msgSend_addr,
-            objc_function_family,
-            boundaries_with_file_off,
-            self._get_objc_selector_stubs(),
-        )
+        boundaries_with_file_off = []
+        # Functions are almost always in the same section as the previous function, so reuse its translation
+        section: Optional[MachoSection] = None
+        for boundaries in zip(self._function_entry_points, self._function_end_addresses):
+            entry_point = VirtualMemoryPointer(boundaries[0])
+            if section is None or not section.address <= entry_point < section.end_address:
+                section = self.binary.section_for_address(entry_point)
+            if section is not None and section.address <= entry_point < section.end_address:
+                file_offset = StaticFilePointer(entry_point - section.address + section.offset)
+            else:
+                file_offset = self.binary.file_offset_for_virtual_address(entry_point)
+            boundaries_with_file_off.append(((entry_point, VirtualMemoryPointer(boundaries[1])), file_offset))
+        # The native builder maps the slice from disk
+        with self.binary.on_disk_slice() as (slice_path, slice_file_offset):
+            build_xref_database_fast(
+                self,
+                slice_path.as_posix(),
+                self._db_path.as_posix(),
+                self.binary.get_virtual_base(),
+                slice_file_offset,
+                self._objc_msgSend_addr,
+                objc_function_family,
+                boundaries_with_file_off,
+                self._get_objc_selector_stubs(),
+            )
 
-        self._has_computed_xrefs = True
         end_time = time.time()
         logger.debug(f"Finding xrefs took {end_time - start_time} seconds")
 
+    def _populate_data_xrefs_table(self) -> None:
+        """Find every address materialized by code in the binary, and store those which point into a section.
+        This decodes every function a second time, separately from the native xref pass, so it's its own stage.
+        """
+        sections = sorted((s.address, s.end_address, s.segment_name, s.name) for s in self.binary.sections)
+        section_starts = [start for start, _, _, _ in sections]
+
+        function_basic_block_starts: Dict[int, List[int]] = {}
+        cursor = self._db_handle.execute("SELECT entry_point, start_address FROM basic_blocks")
+        with closing(cursor):
+            for entry_point, start_address in cursor:
+                function_basic_block_starts.setdefault(entry_point, []).append(start_address)
+
+        rows = []
+        for entry_point, end_address in self.get_function_boundaries():
+            bytecode = self.binary.get_content_from_virtual_address(entry_point, end_address - entry_point)
+            basic_block_starts = function_basic_block_starts.get(entry_point, [])
+            for accessor_address, target_address in find_data_xrefs(bytecode, entry_point, basic_block_starts):
+                section_index = bisect_right(section_starts, target_address) - 1
+                if section_index < 0:
+                    continue
+                _, section_end, segment_name, section_name = sections[section_index]
+                if target_address >= section_end:
+                    continue
+                rows.append((target_address, segment_name, section_name, accessor_address, entry_point))
+
+        with self._db_handle:
+            self._db_handle.executemany("INSERT INTO data_xrefs VALUES (?, ?, ?, ?, ?)", rows)
+            self._db_handle.execute("CREATE INDEX data_xrefs_target_address ON data_xrefs(target_address)")
+
     @classmethod
     def clear_cache(cls) -> None:
         """Delete cached MachoAnalyzer's
         This can be used when you are finished analyzing a binary set and don't want to retain the cached data in memory
         """
         for binary, analyzer in cls._ANALYZER_CACHE.items():
+            # The database is only created once an API needs it
+            if AnalyzerStage.DATABASE not in analyzer._completed_stages:
+                continue
             logger.debug(f"Deleting db {analyzer._db_path}...")
             analyzer._db_handle.close()
             shutil.rmtree(analyzer._db_tempdir.as_posix())
 
         cls._ANALYZER_CACHE.clear()
 
+    def _build_objc_helper(self) -> None:
+        self._objc_helper = ObjcRuntimeDataParser(self.binary, lazy=self._lazy_objc_parsing)
+
     @property
+    @_requires_stages(AnalyzerStage.OBJC_RUNTIME)
     def objc_helper(self) -> ObjcRuntimeDataParser:
-        if not self._objc_helper:
-            self._objc_helper = ObjcRuntimeDataParser(self.binary)
-        return self._objc_helper
+        return cast(ObjcRuntimeDataParser, self._objc_helper)
 
     @classmethod
-    def get_analyzer(cls, binary: MachoBinary) -> "MachoAnalyzer":
-        """Get a cached analyzer for a given MachoBinary."""
+    def get_analyzer(cls, binary: MachoBinary, lazy_objc_parsing: bool = False) -> "MachoAnalyzer":
+        """Get a cached analyzer for a given MachoBinary.
+        lazy_objc_parsing is only used if there isn't already an analyzer for the binary.
+        """
         if binary in cls._ANALYZER_CACHE:
             # There exists a MachoAnalyzer for this binary - use it instead of making a new one
             return cls._ANALYZER_CACHE[binary]
-        return MachoAnalyzer(binary)
+        return MachoAnalyzer(binary, lazy_objc_parsing=lazy_objc_parsing)
+
+    @cached_property
+    def _entry_points_to_method_info(self) -> Dict[VirtualMemoryPointer, "ObjcMethodInfo"]:
+        entry_points_to_method_info: Dict[VirtualMemoryPointer, "ObjcMethodInfo"] = {}
+        for method_info in self.get_objc_methods():
+            if method_info.imp_addr is not None:
+                # If several selectors share an IMP, the first one in class-list order wins
+                entry_points_to_method_info.setdefault(method_info.imp_addr, method_info)
+        return entry_points_to_method_info
 
     def method_info_for_entry_point(self, entry_point: VirtualMemoryPointer) -> Optional["ObjcMethodInfo"]:
         # TODO(PT): This should return any symbol name, not just Obj-C methods
-        from strongarm.objc.objc_analyzer import ObjcMethodInfo
+        return self._entry_points_to_method_info.get(entry_point)
+
+    def method_info_for_signature(self, class_name: str, selector_name: str) -> Optional["ObjcMethodInfo"]:
+        """Return the method implementing -[class_name selector_name], or None if the binary doesn't implement it."""
+        from strongarm.objc import ObjcMethodInfo
 
-        for objc_cls in self.objc_classes():
-            for sel in objc_cls.selectors:
-                if sel.implementation == entry_point:
-                    return ObjcMethodInfo(objc_cls, sel, sel.implementation)
+        # Only look at the classes with this name, so a lazy ObjC parse doesn't need to parse every class
+        for objc_class in self.objc_helper.classes_for_class_name(class_name):
+            for objc_sel in objc_class.selectors:
+                if objc_sel.name == selector_name:
+                    return ObjcMethodInfo(objc_class, objc_sel, objc_sel.implementation)
         return None
 
     def objc_classes(self) -> List[ObjcClass]:
@@ -430,9 +767,11 @@ class MachoAnalyzer:
 
     def objc_categories(self) -> List[ObjcCategory]:
         """Return the List of categories implemented within the app."""
-        all_classes = self.objc_classes()
-        categories: List[ObjcCategory] = [c for c in all_classes if isinstance(c, ObjcCategory)]
-        return categories
+        return self.objc_helper.categories
+
+    def objc_categories_for_base_class(self, base_class_name: str) -> List[ObjcCategory]:
+        """Return the List of categories implemented within the app which extend the provided class."""
+        return self.objc_helper.categories_for_base_class(base_class_name)
 
     def get_conformed_protocols(self) -> List[ObjcProtocol]:
         """Return the List of protocols to which code within the binary conforms."""
@@ -516,9 +855,10 @@ class MachoAnalyzer:
         raise RuntimeError(f"Unknown branch destination {hex(branch_address)}. Is this a local branch?")
 
     def disassemble_region(self, start_address: VirtualMemoryPointer, size: int) -> List[CsInsn]:
-        """Disassemble the executable code in a given region into a list of CsInsn objects."""
-        func_str = bytes(self.binary.get_content_from_virtual_address(virtual_address=start_address, size=size))
-        instructions = [instr for instr in self.cs.disasm(func_str, start_address)]
+        """Disassemble the executable code in a given region into a list of CsInsn objects.
+        Recently disassembled regions are served from the binary's DisassemblyCache.
+        """
+        instructions = self.disassembly_cache.disassemble(start_address, size)
         if not len(instructions):
             raise DisassemblyFailedError(f"Failed to disassemble code at {hex(start_address)}:{hex(size)}")
         return instructions
@@ -533,6 +873,55 @@ class MachoAnalyzer:
         instructions = self.disassemble_region(start_address, end_address - start_address)
         return instructions
 
+    def get_function_analyzer(
+        self, start_address: VirtualMemoryPointer, method_info: Optional["ObjcMethodInfo"] = None
+    ) -> "ObjcFunctionAnalyzer":
+        """Get the shared ObjcFunctionAnalyzer for the function beginning at start_address.
+
+        Analyzers are cached by entry point, so the results they compute lazily (call targets, basic blocks, register
+        contents) are reused by every caller. An analyzer is cached for as long as the DisassemblyCache holds the
+        function's instructions, so both caches share the DisassemblyCache's instruction budget.
+
+        Args:
+            start_address: The entry point of the function to be analyzed
+            method_info: The Objective-C method implemented by the function, if known
+
+        Returns:
+            An ObjcFunctionAnalyzer suitable for introspecting the function.
+        """
+        from strongarm.objc import ObjcFunctionAnalyzer  # noqa: F811
+
+        end_address = self.get_function_end_address(start_address)
+        if end_address is None:
+            raise RuntimeError(f"No function with start address {start_address} found.")
+        region = (start_address, end_address - start_address)
+
+        function_analyzer = self._function_analyzers.get(region)
+        if function_analyzer is not None:
+            self.disassembly_cache.touch(*region)
+            if method_info is None or method_info is function_analyzer.method_info:
+                return function_analyzer
+
+            # Analyzers which have been handed out are never changed. Describe this method with a new analyzer which
+            # reuses the instructions
+            described_analyzer = ObjcFunctionAnalyzer(
+                self.binary, function_analyzer.instructions, method_info=method_info, macho_analyzer=self
+            )
+            if function_analyzer.method_info is None:
+                # The function was cached before its method was known. Cache the analyzer which describes it instead
+                self._function_analyzers[region] = described_analyzer
+            # Otherwise, several methods share this IMP, and the cached analyzer keeps describing the first
+            return described_analyzer
+
+        instructions = self.disassemble_region(*region)
+        function_analyzer = ObjcFunctionAnalyzer(
+            self.binary, instructions, method_info=method_info, macho_analyzer=self
+        )
+        # A function too large for the DisassemblyCache isn't cached here either
+        if self.disassembly_cache.touch(*region):
+            self._function_analyzers[region] = function_analyzer
+        return function_analyzer
+
     def imp_for_selref(self, selref_ptr: VirtualMemoryPointer) -> Optional[VirtualMemoryPointer]:
         selector = self.objc_helper.selector_for_selref(selref_ptr)
         if not selector:
@@ -557,14 +946,10 @@ class MachoAnalyzer:
         Returns:
             A list of ObjcFunctionAnalyzers corresponding to each found implementation of the provided selector.
         """
-        from strongarm.objc import ObjcFunctionAnalyzer  # noqa: F811
-
         implementation_analyzers = []
         imp_addresses = self.get_method_imp_addresses(selector)
         for imp_start in imp_addresses:
-            imp_instructions = self.get_function_instructions(imp_start)
-            function_analyzer = ObjcFunctionAnalyzer(self.binary, imp_instructions)
-            implementation_analyzers.append(function_analyzer)
+            implementation_analyzers.append(self.get_function_analyzer(imp_start))
         return implementation_analyzers
 
     def get_objc_methods(self) -> List["ObjcMethodInfo"]:
@@ -590,24 +975,50 @@ class MachoAnalyzer:
         """
         return self.binary.get_functions()
 
-    def get_function_boundaries(self) -> Set[Tuple[VirtualMemoryPointer, VirtualMemoryPointer]]:
-        cursor = self._db_handle.execute("SELECT entry_point, end_address FROM function_boundaries")
-
-        with closing(cursor):
-            return {(VirtualMemoryPointer(a), VirtualMemoryPointer(b)) for a, b in cursor}
+    @_requires_stages(AnalyzerStage.FUNCTION_BOUNDARIES)
+    def get_function_boundaries(self) -> FrozenSet[Tuple[VirtualMemoryPointer, VirtualMemoryPointer]]:
+        """Return the (entry point, end address) of every function in the binary.
+        The same immutable set is returned on every call.
+        """
+        return self._function_boundaries
 
+    @_requires_stages(AnalyzerStage.FUNCTION_BOUNDARIES)
     def get_function_end_address(self, entry_point: VirtualMemoryPointer) -> Optional[VirtualMemoryPointer]:
-        cursor = self._db_handle.execute(
-            "SELECT end_address FROM function_boundaries WHERE entry_point = ?", (entry_point,)
-        )
-
-        with closing(cursor):
-            results = cursor.fetchone()
-
-        if results is None:
+        index = bisect_left(self._function_entry_points, entry_point)
+        if index == len(self._function_entry_points) or self._function_entry_points[index] != entry_point:
             return None
+        return VirtualMemoryPointer(self._function_end_addresses[index])
 
-        return VirtualMemoryPointer(results[0])
+    @_requires_stages(AnalyzerStage.FUNCTION_BOUNDARIES)
+    def function_containing(self, address: VirtualMemoryPointer) -> Optional[VirtualMemoryPointer]:
+        """Return the entry point of the function containing the provided address, or None if no function does."""
+        index = bisect_right(self._function_entry_points, address) - 1
+        if index < 0 or address >= self._function_end_addresses[index]:
+            return None
+        return VirtualMemoryPointer(self._function_entry_points[index])
+
+    @_requires_stages(AnalyzerStage.FUNCTION_BOUNDARIES)
+    def function_containing_many(
+        self, addresses: Iterable[VirtualMemoryPointer]
+    ) -> List[Optional[VirtualMemoryPointer]]:
+        """Return the entry point of the function containing each of the provided addresses, in the same order.
+        The addresses are sorted, and each is bisected into the function boundaries after the previous address's hit,
+        so a batch of m addresses costs O(m log n) in the number of functions.
+        """
+        addresses = list(addresses)
+        entry_points = self._function_entry_points
+        end_addresses = self._function_end_addresses
+        containing_functions: List[Optional[VirtualMemoryPointer]] = [None] * len(addresses)
+
+        search_start = 0
+        for address_index in sorted(range(len(addresses)), key=addresses.__getitem__):
+            address = addresses[address_index]
+            # The index after the last function which starts at or before the address
+            search_start = bisect_right(entry_points, address, lo=search_start)
+            function_index = search_start - 1
+            if function_index >= 0 and address < end_addresses[function_index]:
+                containing_functions[address_index] = VirtualMemoryPointer(entry_points[function_index])
+        return containing_functions
 
     @cached_property
     def class_for_class_pointer_map(self) -> Dict[VirtualMemoryPointer, ObjcClass]:
@@ -646,27 +1057,37 @@ class MachoAnalyzer:
         # Invalid classref
         return None
 
+    @cached_property
+    def _imported_class_names_to_classrefs(self) -> Dict[str, VirtualMemoryPointer]:
+        imported_class_names_to_classrefs: Dict[str, VirtualMemoryPointer] = {}
+        for addr, name in self.imported_symbols_to_symbol_names.items():
+            if name in imported_class_names_to_classrefs:
+                continue
+            if self.binary.section_name_for_address(addr) == "__objc_classrefs":
+                imported_class_names_to_classrefs[name] = addr
+        return imported_class_names_to_classrefs
+
+    @cached_property
+    def _class_pointers_to_classrefs(self) -> Dict[VirtualMemoryPointer, VirtualMemoryPointer]:
+        class_pointers_to_classrefs: Dict[VirtualMemoryPointer, VirtualMemoryPointer] = {}
+        for classref, class_pointer in self.binary.read_pointer_section("__objc_classrefs").items():
+            class_pointers_to_classrefs.setdefault(class_pointer, classref)
+        return class_pointers_to_classrefs
+
     def classref_for_class_name(self, class_name: str) -> Optional[VirtualMemoryPointer]:
         """Given a class name, try to find a classref for it."""
-        classrefs = [
-            addr
-            for addr, name in self.imported_symbols_to_symbol_names.items()
-            if name == class_name and self.binary.section_name_for_address(addr) == "__objc_classrefs"
-        ]
-        if len(classrefs):
-            return classrefs[0]
+        imported_classref = self._imported_class_names_to_classrefs.get(class_name)
+        if imported_classref is not None:
+            return imported_classref
 
-        # TODO(PT): this is expensive! We should do one analysis step of __objc_classrefs and create a map.
         # is it a local class?
-        class_locations = [x.raw_struct.binary_offset for x in self.objc_classes() if x.name == class_name]
-        if not len(class_locations):
+        local_classes = self.objc_helper.classes_for_class_name(class_name)
+        if not local_classes:
             # unknown class name
             return None
-        class_location = VirtualMemoryPointer(class_locations[0])
-
-        classref_addr_to_pointer_map = self.binary.read_pointer_section("__objc_classrefs")
+        class_location = VirtualMemoryPointer(local_classes[0].raw_struct.binary_offset)
         # If None is returned, it is an unknown class name
-        return first((k for k, v in classref_addr_to_pointer_map.items() if v == class_location), None)
+        return self._class_pointers_to_classrefs.get(class_location)
 
     def selref_for_selector_name(self, selector_name: str) -> Optional[VirtualMemoryPointer]:
         return self.objc_helper.selref_for_selector_name(selector_name)
@@ -702,10 +1123,10 @@ class MachoAnalyzer:
             self.__cached_cstrings = self._strings_in_section("__cstring", segment)
         return self.__cached_cstrings
 
-    def _build_cstring_map(self) -> Dict[str, VirtualMemoryPointer]:
+    def _build_cstring_map(self) -> None:
         cstring_section = self.binary.get_cstring_section()
         if not cstring_section:
-            return {}
+            return
 
         strings_base = cstring_section.address
         strings_content = self.binary.get_bytes(cstring_section.offset, cstring_section.size)
@@ -718,7 +1139,12 @@ class MachoAnalyzer:
             # Address is the base of __cstring plus the index of the entry
             stringref_address = VirtualMemoryPointer(strings_base + idx)
             string_to_stringrefs[entry.full_string] = stringref_address
-        return string_to_stringrefs
+        self._cstrings_to_stringrefs = string_to_stringrefs
+
+    @property
+    @_requires_stages(AnalyzerStage.CSTRINGS)
+    def _cstring_to_stringref_map(self) -> Dict[str, VirtualMemoryPointer]:
+        return self._cstrings_to_stringrefs
 
     def _stringref_for_cstring(self, string: str) -> Optional[VirtualMemoryPointer]:
         """Try to find the stringref in __cstrings for a provided C string.
@@ -728,12 +1154,12 @@ class MachoAnalyzer:
             return None
         return self._cstring_to_stringref_map[string]
 
-    def _build_cfstring_map(self) -> Dict[str, VirtualMemoryPointer]:
+    def _build_cfstring_map(self) -> None:
         cfstrings_section = self.binary.section_with_name("__cfstring", "__DATA")
         if not cfstrings_section:
             cfstrings_section = self.binary.section_with_name("__cfstring", "__DATA_CONST")
             if not cfstrings_section:
-                return {}
+                return
 
         sizeof_cfstring = sizeof(CFString64) if self.binary.is_64bit else sizeof(CFString32)
         cfstrings_base = cfstrings_section.address
@@ -746,7 +1172,12 @@ class MachoAnalyzer:
             literal = self.binary.read_string_at_address(cfstring.literal)
             if literal:
                 cfstring_to_stringrefs[literal] = VirtualMemoryPointer(cfstring_addr)
-        return cfstring_to_stringrefs
+        self._cfstrings_to_stringrefs = cfstring_to_stringrefs
+
+    @property
+    @_requires_stages(AnalyzerStage.CFSTRINGS)
+    def _cfstring_to_stringref_map(self) -> Dict[str, VirtualMemoryPointer]:
+        return self._cfstrings_to_stringrefs
 
     def _stringref_for_cfstring(self, string: str) -> Optional[VirtualMemoryPointer]:
         """Try to find the stringref in __cfstrings for a provided Objective-C string literal.
@@ -776,36 +1207,39 @@ class MachoAnalyzer:
             return self._stringref_for_cfstring(string)
         return self._stringref_for_cstring(string)
 
-    @functools.lru_cache(64)
+    @_requires_stages(AnalyzerStage.CALLABLE_SYMBOLS)
     def callable_symbol_for_address(self, branch_destination: VirtualMemoryPointer) -> Optional[CallableSymbol]:
         """Retrieve information about a callable branch destination.
         It's the caller's responsibility to provide a valid branch destination with a symbol associated with it.
         """
-        c = self._db_handle.cursor()
-        symbols = c.execute("SELECT * from named_callable_symbols WHERE address=?", (branch_destination,)).fetchall()
-        if not len(symbols):
-            return None
-        assert len(symbols) == 1, f"Found more than 1 symbol at {branch_destination}?"
-        symbol_data = symbols[0]
-
-        return CallableSymbol(
-            is_imported=bool(symbol_data[0]), address=VirtualMemoryPointer(symbol_data[1]), symbol_name=symbol_data[2]
-        )
-
+        symbol = self._callable_symbols_by_address.get(branch_destination)
+        if symbol:
+            assert (
+                branch_destination not in self._ambiguous_callable_symbol_keys
+            ), f"Found more than 1 symbol at {branch_destination}?"
+        return symbol
+
+    @_requires_stages(AnalyzerStage.CALLABLE_SYMBOLS)
     def callable_symbol_for_symbol_name(self, symbol_name: str) -> Optional[CallableSymbol]:
         """Retrieve information about a name within the imported or exported symbols tables.
         It's the caller's responsibility to provide a valid callable symbol name.
         """
-        c = self._db_handle.cursor()
-        symbols = c.execute("SELECT * from named_callable_symbols WHERE symbol_name=?", (symbol_name,)).fetchall()
-        if not len(symbols):
+        symbol = self._callable_symbols_by_name.get(symbol_name)
+        if symbol:
+            assert (
+                symbol_name not in self._ambiguous_callable_symbol_keys
+            ), f"Found more than 1 symbol named {symbol_name}?"
+        return symbol
+
+    @_requires_stages(AnalyzerStage.CALLABLE_SYMBOLS)
+    def callable_symbol_preceding_address(self, address: VirtualMemoryPointer) -> Optional[CallableSymbol]:
+        """Retrieve the callable symbol with the highest address less than or equal to the provided address.
+        For an address within a named function, this is the function's symbol.
+        """
+        index = bisect_right(self._callable_symbol_addresses, address) - 1
+        if index < 0:
             return None
-        assert len(symbols) == 1, f"Found more than 1 symbol named {symbol_name}?"
-        symbol_data = symbols[0]
-
-        return CallableSymbol(
-            is_imported=bool(symbol_data[0]), address=VirtualMemoryPointer(symbol_data[1]), symbol_name=symbol_data[2]
-        )
+        return self._callable_symbols_by_address[VirtualMemoryPointer(self._callable_symbol_addresses[index])]
 
     @_requires_xrefs_computed
     def string_xrefs_to(self, string_literal: str) -> List[Tuple[VirtualMemoryPointer, VirtualMemoryPointer]]:
@@ -820,6 +1254,42 @@ class MachoAnalyzer:
         string_xrefs = [(VirtualMemoryPointer(x[0]), VirtualMemoryPointer(x[1])) for x in xrefs_query]
         return string_xrefs
 
+    @_requires_stages(AnalyzerStage.DATA_XREFS)
+    def data_xrefs_to(self, address: VirtualMemoryPointer) -> List[DataXRef]:
+        """Return the code locations which materialize the provided address, such as a classref, selref, global
+        variable or constant table. Address materializations which don't point into a section aren't recorded.
+        """
+        cursor = self._db_handle.execute("SELECT * FROM data_xrefs WHERE target_address=?", (int(address),))
+        with closing(cursor):
+            return [
+                DataXRef(VirtualMemoryPointer(x[0]), x[1], x[2], VirtualMemoryPointer(x[3]), VirtualMemoryPointer(x[4]))
+                for x in cursor
+            ]
+
+    @_requires_stages(AnalyzerStage.DATA_XREFS)
+    def data_xrefs_to_many(
+        self, addresses: Iterable[VirtualMemoryPointer]
+    ) -> Dict[VirtualMemoryPointer, List[DataXRef]]:
+        """Return the code locations which materialize each of the provided addresses.
+        This is equivalent to calling data_xrefs_to() for each address, but queries the database in batches.
+        """
+        unique_addresses = sorted(set(int(x) for x in addresses))
+        xrefs: Dict[VirtualMemoryPointer, List[DataXRef]] = {VirtualMemoryPointer(x): [] for x in unique_addresses}
+        # Stay below SQLite's limit on the number of parameters in a query
+        batch_size = 500
+        for i in range(0, len(unique_addresses), batch_size):
+            batch = unique_addresses[i : i + batch_size]
+            cursor = self._db_handle.execute(
+                f"SELECT * FROM data_xrefs WHERE target_address IN ({', '.join('?' * len(batch))})", batch
+            )
+            with closing(cursor):
+                for x in cursor:
+                    xref = DataXRef(
+                        VirtualMemoryPointer(x[0]), x[1], x[2], VirtualMemoryPointer(x[3]), VirtualMemoryPointer(x[4])
+                    )
+                    xrefs[xref.target_addr].append(xref)
+        return xrefs
+
     @_requires_xrefs_computed
     def strings_in_func(self, func_addr: VirtualMemoryPointer) -> List[Tuple[VirtualMemoryPointer, str]]:
         """Fetch the list of strings referenced by the provided function.
@@ -834,9 +1304,26 @@ class MachoAnalyzer:
         return string_loads
 
     def _build_callable_symbol_index(self) -> None:
-        """Build a database index for every callable symbol to symbol name.
+        """Build an index for every callable symbol to symbol name, in memory and in the database.
         This index includes both imported and exported symbols.
         """
+        for is_imported, addresses_to_names in (
+            (True, self.imp_stubs_to_symbol_names),
+            (False, self.exported_symbol_pointers_to_names),
+        ):
+            for address, symbol_name in addresses_to_names.items():
+                symbol = CallableSymbol(address=address, is_imported=is_imported, symbol_name=symbol_name)
+                # Keep the first symbol seen for an address or name, but remember that it's ambiguous
+                if address in self._callable_symbols_by_address:
+                    self._ambiguous_callable_symbol_keys.add(address)
+                else:
+                    self._callable_symbols_by_address[address] = symbol
+                if symbol_name in self._callable_symbols_by_name:
+                    self._ambiguous_callable_symbol_keys.add(symbol_name)
+                else:
+                    self._callable_symbols_by_name[symbol_name] = symbol
+        self._callable_symbol_addresses = array("Q", sorted(self._callable_symbols_by_address.keys()))
+
         c = self._db_handle.cursor()
 
         # Process __imp_stubs
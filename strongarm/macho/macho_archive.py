@@ -0,0 +1,135 @@
+import mmap
+import struct
+import zipfile
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, cast
+
+from strongarm.logger import strongarm_logger
+from strongarm.macho.macho_binary import MachoBinary
+from strongarm.macho.macho_definitions import CPU_TYPE, StaticFilePointer
+from strongarm.macho.macho_parse import ArchitectureNotSupportedError, MachoParser
+from strongarm.macho.macho_source import MachoSource, MachoSourceBytes
+
+logger = strongarm_logger.getChild(__file__)
+
+# The signature and size of a zip local file header. The name and extra field lengths are its last two fields
+_LOCAL_FILE_HEADER_SIGNATURE = b"PK\x03\x04"
+_LOCAL_FILE_HEADER_SIZE = 30
+_LOCAL_FILE_HEADER_NAME_AND_EXTRA_LENGTHS = struct.Struct("<HH")
+
+# How much of a deflated member to decompress at a time
+_DECOMPRESSION_CHUNK_SIZE = 1024 * 1024
+
+
+class ZipMemberMachoSource(MachoSource):
+    """A Mach-O or FAT member of a zip archive, such as an IPA, read without extracting it.
+
+    Stored members are read directly from a mapping of the archive, without copying. The source's path is the
+    archive, and its file_offset is the member's data within the archive, so APIs which re-read a MachoBinary from its
+    path, such as parallel ObjC parsing, work as usual.
+
+    Deflated members are decompressed as each slice is read, into a buffer per slice. The source's path is within the
+    archive, so it isn't file-backed, and its slices are written to a temporary file when an API needs to map them.
+    See MachoBinary.on_disk_slice().
+    """
+
+    def __init__(self, archive: zipfile.ZipFile, archive_mapping: mmap.mmap, member: zipfile.ZipInfo) -> None:
+        self.archive = archive
+        self.archive_mapping = archive_mapping
+        self.member = member
+        archive_path = Path(cast(str, archive.filename))
+        if self.is_stored:
+            super().__init__(archive_path, _stored_member_data_offset(archive_mapping, member))
+        else:
+            super().__init__(archive_path / member.filename, is_file_backed=False)
+
+    @property
+    def is_stored(self) -> bool:
+        """Whether the member is stored in the archive uncompressed."""
+        return self.member.compress_type == zipfile.ZIP_STORED
+
+    @property
+    def size(self) -> int:
+        return self.member.file_size
+
+    def read(self, offset: StaticFilePointer, size: int) -> MachoSourceBytes:
+        size = max(0, min(size, self.member.file_size - offset))
+        if self.is_stored:
+            start = self.file_offset + offset
+            # MachoBinary only ever copies out slices of the data it's given, so it can read straight from the mapping
+            return memoryview(self.archive_mapping)[start : start + size]
+
+        data = bytearray(size)
+        filled = 0
+        with self.archive.open(self.member) as member_file:
+            # Seeking forwards in a deflated member decompresses and discards the data up to the offset
+            member_file.seek(offset)
+            while filled < size:
+                chunk = member_file.read(min(size - filled, _DECOMPRESSION_CHUNK_SIZE))
+                if not chunk:
+                    break
+                data[filled : filled + len(chunk)] = chunk
+                filled += len(chunk)
+        del data[filled:]
+        return data
+
+
+def _stored_member_data_offset(archive_mapping: mmap.mmap, member: zipfile.ZipInfo) -> int:
+    """Return the offset within the archive of a member's data, which follows the member's local file header."""
+    header_offset = member.header_offset
+    if archive_mapping[header_offset : header_offset + len(_LOCAL_FILE_HEADER_SIGNATURE)] != (
+        _LOCAL_FILE_HEADER_SIGNATURE
+    ):
+        raise zipfile.BadZipFile(f"Bad local file header for {member.filename}")
+    # The local header's name and extra field may differ from the central directory's, so read their lengths from it
+    name_length, extra_length = _LOCAL_FILE_HEADER_NAME_AND_EXTRA_LENGTHS.unpack_from(
+        archive_mapping, header_offset + _LOCAL_FILE_HEADER_SIZE - _LOCAL_FILE_HEADER_NAME_AND_EXTRA_LENGTHS.size
+    )
+    return header_offset + _LOCAL_FILE_HEADER_SIZE + name_length + extra_length
+
+
+def _is_readable_member(member: zipfile.ZipInfo) -> bool:
+    """Whether a member is a file which can be read without extracting it."""
+    if member.is_dir() or member.flag_bits & 0x1:
+        # Directories and encrypted members
+        return False
+    if member.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        logger.debug(f"Skipping {member.filename} with unsupported compression {member.compress_type}")
+        return False
+    return True
+
+
+def iter_archive_macho_binaries(
+    archive_path: Path, arch: Optional[CPU_TYPE] = None, quick_scan: bool = False
+) -> Iterator[Tuple[str, MachoBinary]]:
+    """Yield (member path, MachoBinary) for each Mach-O slice in a zip archive, such as an IPA.
+
+    Mach-O and FAT members are identified by their magic, and each is parsed straight from the archive as it's
+    reached. A FAT member yields each of its slices, or only the slice for `arch` if it's set. See
+    ZipMemberMachoSource for how members are read, and MachoBinary.__init__() for the meaning of `quick_scan`.
+    Members which fail to parse, or which don't contain a slice for `arch`, are skipped.
+    """
+    with open(archive_path, "rb") as archive_file:
+        # The binaries of stored members reference the mapping, which stays alive as long as they do
+        archive_mapping = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    with zipfile.ZipFile(archive_path) as archive:
+        for member in archive.infolist():
+            if not _is_readable_member(member):
+                continue
+            source = ZipMemberMachoSource(archive, archive_mapping, member)
+            if source.magic not in MachoParser.SUPPORTED_MAG:
+                continue
+
+            try:
+                parser = MachoParser(source, arch=arch, quick_scan=quick_scan)
+                binaries = list(parser.slices)
+            except ArchitectureNotSupportedError:
+                logger.debug(f"Skipping {member.filename}, which has no slice for the requested architecture")
+                continue
+            except Exception:
+                logger.error(f"Failed to parse {member.filename} in {archive_path}")
+                continue
+
+            for binary in binaries:
+                yield member.filename, binary
@@ -1,8 +1,10 @@
 import math
+import tempfile
+from contextlib import contextmanager
 from ctypes import Structure, c_uint32, c_uint64, sizeof
 from distutils.version import LooseVersion
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple, Type, TypeVar
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Set, Tuple, Type, TypeVar, Union
 
 from strongarm.logger import strongarm_logger
 from strongarm.macho.arch_independent_structs import (
@@ -40,6 +42,7 @@ from strongarm.macho.macho_load_commands import MachoLoadCommands
 
 if TYPE_CHECKING:
     from strongarm.macho.codesign import CodesignParser
+    from strongarm.macho.dyld_info_parser import DyldBoundSymbol
 
 logger = strongarm_logger.getChild(__file__)
 
@@ -151,11 +154,30 @@ class MachoBinary:
     SUPPORTED_MAG = _MAG_64 + _MAG_32
     BYTES_PER_INSTRUCTION = 4
 
-    def __init__(self, path: Path, binary_data: bytes, file_offset: Optional[StaticFilePointer] = None) -> None:
-        """Parse the bytes representing a Mach-O file."""
+    def __init__(
+        self,
+        path: Path,
+        binary_data: Union[bytes, bytearray, memoryview],
+        file_offset: Optional[StaticFilePointer] = None,
+        quick_scan: bool = False,
+        is_file_backed: bool = True,
+    ) -> None:
+        """Parse the bytes representing a Mach-O file.
+
+        `path` and `file_offset` locate the slice on disk, if `is_file_backed` is set. Binaries which were parsed from
+        memory, with no copy of the slice on disk, should clear it. See on_disk_slice().
+
+        By default, the symbol table and the binds and rebases are parsed up front.
+        If quick_scan is set, only the header and load commands are parsed, and the rest is parsed on first access.
+        This makes the MachoBinary much cheaper to construct when only header-level information is needed, such as
+        the linked dylibs, build version, encryption info or code signature.
+        The first access of symtab_contents, dyld_bound_symbols or dyld_rebased_pointers pays the remaining cost.
+        """
         from .codesign.codesign_parser import CodesignParser
 
         self._cached_binary = binary_data
+        self.quick_scan = quick_scan
+        self.is_file_backed = is_file_backed
 
         self.path = path
         self.is_64bit: bool = False
@@ -203,23 +225,62 @@ class MachoBinary:
         self.platform_word_type = c_uint64 if self.is_64bit else c_uint32
 
         self._symtab_contents: Optional[List[MachoNlistStruct]] = None
+        self._dyld_bound_symbols: Optional[Dict[VirtualMemoryPointer, "DyldBoundSymbol"]] = None
+        self._dyld_rebased_pointers: Optional[Dict[VirtualMemoryPointer, VirtualMemoryPointer]] = None
+
+        if not quick_scan:
+            self._parse_symtab_and_fixups()
+
+    def _parse_symtab_and_fixups(self) -> None:
+        """Parse the symbol table, and the binds and rebases described by the dyld info or chained fixups."""
+        # Accessing the symtab kicks off its parse
         logger.debug(self, f"parsed symtab, len = {len(self.symtab_contents)}")
 
-        from .dyld_info_parser import DyldBoundSymbol, DyldInfoParser
+        from .dyld_info_parser import DyldInfoParser
 
-        self.dyld_bound_symbols: Dict[VirtualMemoryPointer, DyldBoundSymbol] = {}
-        self.dyld_rebased_pointers: Dict[VirtualMemoryPointer, VirtualMemoryPointer] = {}
+        self._dyld_bound_symbols = {}
+        self._dyld_rebased_pointers = {}
 
         if self._dyld_chained_fixups:
             # PT: Binaries compiled with the Xcode 13+ toolchains describe binds and rebases in the inline CFP format
             rebases, binds = DyldInfoParser.parse_chained_fixups(self)  # type: ignore
-            self.dyld_rebased_pointers, self.dyld_bound_symbols = rebases, binds
+            self._dyld_rebased_pointers, self._dyld_bound_symbols = rebases, binds
         elif self._dyld_info:
             # PT: Binaries produced with older toolchains embed a dyld bytecode stream in __LINKEDIT to describe binds
             # and rebases.
             # However, not all binaries contain the LC_DYLD_INFO load command: fully statically linked binaries
             # (which are very rare) will not contain LC_DYLD_INFO.
-            self.dyld_bound_symbols = DyldInfoParser.parse_dyld_info(self)
+            self._dyld_bound_symbols = DyldInfoParser.parse_dyld_info(self)
+
+    @property
+    def dyld_bound_symbols(self) -> Dict[VirtualMemoryPointer, "DyldBoundSymbol"]:
+        if self._dyld_bound_symbols is None:
+            self._parse_symtab_and_fixups()
+        assert self._dyld_bound_symbols is not None
+        return self._dyld_bound_symbols
+
+    @property
+    def dyld_rebased_pointers(self) -> Dict[VirtualMemoryPointer, VirtualMemoryPointer]:
+        if self._dyld_rebased_pointers is None:
+            self._parse_symtab_and_fixups()
+        assert self._dyld_rebased_pointers is not None
+        return self._dyld_rebased_pointers
+
+    @contextmanager
+    def on_disk_slice(self) -> Iterator[Tuple[Path, StaticFilePointer]]:
+        """Provide a path and file offset at which this slice's bytes can be read from disk, for APIs which map the
+        file, such as the native XRef builder.
+        If the binary isn't file-backed, the slice is written to a temporary file for the duration of the context.
+        """
+        if self.is_file_backed:
+            yield self.path, self.file_offset
+            return
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            slice_path = Path(temp_dir) / self.path.name
+            with open(slice_path, "wb") as slice_file:
+                slice_file.write(self._cached_binary)
+            yield slice_path, StaticFilePointer(0)
 
     def __repr__(self) -> str:
         return f"<MachoBinary binary={self.path}>"
@@ -911,7 +972,8 @@ class MachoBinary:
         new_binary_data[:] = self._cached_binary
         new_binary_data[file_offset : file_offset + len(data)] = data
 
-        return MachoBinary(self.path, new_binary_data)
+        # The modified slice only exists in memory
+        return MachoBinary(self.path, new_binary_data, quick_scan=self.quick_scan, is_file_backed=False)
 
     def write_struct(self, struct: Structure, address: int, virtual: bool = False) -> "MachoBinary":
         """Serialize and write the provided structure the Mach-O slice, returning a new modified binary.
@@ -423,6 +423,74 @@ class DyldSharedCacheHeader(Structure):
         ("accelerateInfoSize", c_uint64),  # size of optimization info
         ("imagesTextOffset", c_uint64),  # file offset to first dyld_cache_image_text_info
         ("imagesTextCount", c_uint64),  # number of dyld_cache_image_text_info entries
+        # The fields below were added by later versions of dyld. They're only present if mappingOffset, which is the
+        # size of the header, covers them
+        # https://github.com/apple-oss-distributions/dyld/blob/dyld-1042.1/cache-builder/dyld_cache_format.h
+        ("patchInfoAddr", c_uint64),  # (unslid) address of dyld_cache_patch_info
+        ("patchInfoSize", c_uint64),  # size of all of the patch information
+        ("otherImageGroupAddrUnused", c_uint64),
+        ("otherImageGroupSizeUnused", c_uint64),
+        ("progClosuresAddr", c_uint64),  # (unslid) address of list of program launch closures
+        ("progClosuresSize", c_uint64),  # size of list of program launch closures
+        ("progClosuresTrieAddr", c_uint64),  # (unslid) address of trie of indexes into program launch closures
+        ("progClosuresTrieSize", c_uint64),  # size of trie of indexes into program launch closures
+        ("platform", c_uint32),  # platform number (macOS=1, etc)
+        ("formatVersionAndFlags", c_uint32),  # closure format version, and flags describing how the cache was built
+        ("sharedRegionStart", c_uint64),  # base load address of cache if not slid
+        ("sharedRegionSize", c_uint64),  # overall size required to map the cache and all subcaches
+        ("maxSlide", c_uint64),  # runtime slide of cache can be between zero and this value
+        ("dylibsImageArrayAddr", c_uint64),  # (unslid) address of ImageArray for dylibs in this cache
+        ("dylibsImageArraySize", c_uint64),  # size of ImageArray for dylibs in this cache
+        ("dylibsTrieAddr", c_uint64),  # (unslid) address of trie of indexes of all cached dylibs
+        ("dylibsTrieSize", c_uint64),  # size of trie of cached dylib paths
+        ("otherImageArrayAddr", c_uint64),  # (unslid) address of ImageArray for dylibs and bundles with closures
+        ("otherImageArraySize", c_uint64),  # size of ImageArray for dylibs and bundles with closures
+        ("otherTrieAddr", c_uint64),  # (unslid) address of trie of indexes of dylibs and bundles with closures
+        ("otherTrieSize", c_uint64),  # size of trie of dylibs and bundles with closures
+        ("mappingWithSlideOffset", c_uint32),  # file offset to first dyld_cache_mapping_and_slide_info
+        ("mappingWithSlideCount", c_uint32),  # number of dyld_cache_mapping_and_slide_info entries
+        ("dylibsPBLStateArrayAddrUnused", c_uint64),
+        ("dylibsPBLSetAddr", c_uint64),  # (unslid) address of PrebuiltLoaderSet of all cached dylibs
+        ("programsPBLSetPoolAddr", c_uint64),  # (unslid) address of pool of PrebuiltLoaderSet for each program
+        ("programsPBLSetPoolSize", c_uint64),  # size of pool of PrebuiltLoaderSet for each program
+        ("programTrieAddr", c_uint64),  # (unslid) address of trie mapping program path to PrebuiltLoaderSet
+        ("programTrieSize", c_uint32),
+        ("osVersion", c_uint32),  # OS Version of dylibs in this cache for the main platform
+        ("altPlatform", c_uint32),  # e.g. iOSMac on macOS
+        ("altOsVersion", c_uint32),  # e.g. 14.0 for iOSMac
+        ("swiftOptsOffset", c_uint64),  # file offset to Swift optimizations header
+        ("swiftOptsSize", c_uint64),  # size of Swift optimizations header
+        ("subCacheArrayOffset", c_uint32),  # file offset to first dyld_subcache_entry
+        ("subCacheArrayCount", c_uint32),  # number of subcache entries
+        ("symbolFileUUID", c_char * 16),  # unique value for the shared cache file containing unmapped local symbols
+        ("rosettaReadOnlyAddr", c_uint64),  # (unslid) address of the start of where Rosetta can add read-only data
+        ("rosettaReadOnlySize", c_uint64),  # maximum size of the Rosetta read-only region
+        ("rosettaReadWriteAddr", c_uint64),  # (unslid) address of the start of where Rosetta can add read-write data
+        ("rosettaReadWriteSize", c_uint64),  # maximum size of the Rosetta read-write region
+        # dyld names these two fields imagesOffset and imagesCount, and the original fields imagesOffsetOld and
+        # imagesCountOld. Caches which use these fields leave the original ones zeroed
+        ("imagesOffsetNew", c_uint32),  # file offset to first dyld_cache_image_info
+        ("imagesCountNew", c_uint32),  # number of dyld_cache_image_info entries
+        ("cacheSubType", c_uint32),  # 0 for development, 1 for production, when cacheType is multi-cache(2)
+    ]
+
+
+class DyldSubcacheEntryV1(Structure):
+    """An entry of the subcache array of a split dyld_shared_cache, as written before dyld added fileSuffix"""
+
+    _fields_ = [
+        ("uuid", c_char * 16),  # The UUID of the subcache file
+        ("cacheVMOffset", c_uint64),  # The offset of this subcache from the main cache base address
+    ]
+
+
+class DyldSubcacheEntry(Structure):
+    """An entry of the subcache array of a split dyld_shared_cache"""
+
+    _fields_ = [
+        ("uuid", c_char * 16),  # The UUID of the subcache file
+        ("cacheVMOffset", c_uint64),  # The offset of this subcache from the main cache base address
+        ("fileSuffix", c_char * 32),  # The file name suffix of the subcache file, e.g. ".25.data", ".03.development"
     ]
 
 
@@ -488,6 +556,9 @@ class HEADER_FLAGS(IntEnum):
     HAS_TLV_DESCRIPTORS = 0x800000
     NO_HEAP_EXECUTION = 0x1000000
     APP_EXTENSION_SAFE = 0x2000000
+    NLIST_OUTOFSYNC_WITH_DYLDINFO = 0x4000000
+    SIM_SUPPORT = 0x8000000
+    DYLIB_IN_CACHE = 0x80000000
 
 
 # Some of these can be found at
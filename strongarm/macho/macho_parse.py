@@ -1,15 +1,73 @@
 from ctypes import c_uint32, sizeof
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Union, cast, overload
 
 from strongarm.macho.macho_binary import MachoBinary
-from strongarm.macho.macho_definitions import MachArch, MachoFatArch, MachoFatHeader, StaticFilePointer, swap32
+from strongarm.macho.macho_definitions import (
+    CPU_TYPE,
+    MachArch,
+    MachoFatArch,
+    MachoFatHeader,
+    StaticFilePointer,
+    swap32,
+)
+from strongarm.macho.macho_source import MachoSource, MachoSourceBytes, MachoSourceObject
 
 
 class ArchitectureNotSupportedError(Exception):
     pass
 
 
+@dataclass
+class MachoSliceInfo:
+    """The location and architecture of a Mach-O slice, as described by the file's headers.
+    Reading this doesn't require parsing the slice itself.
+    """
+
+    cputype: int
+    cpusubtype: int
+    offset: StaticFilePointer
+    size: int
+
+
+class MachoSlices(Sequence[MachoBinary]):
+    """The Mach-O slices of a file, each of which is parsed the first time it's accessed.
+    This allows a client to pick a slice from a FAT without paying to parse the others.
+    """
+
+    def __init__(self, parser: "MachoParser", slice_infos: List[MachoSliceInfo]) -> None:
+        self._parser = parser
+        self.slice_infos = slice_infos
+        self._parsed_slices: Dict[int, MachoBinary] = {}
+
+    def __len__(self) -> int:
+        return len(self.slice_infos)
+
+    @overload
+    def __getitem__(self, index: int) -> MachoBinary: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[MachoBinary]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[MachoBinary, List[MachoBinary]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+
+        # Normalise negative indexes so each slice is only cached once
+        index = range(len(self))[index]
+        if index not in self._parsed_slices:
+            self._parsed_slices[index] = self._parser.parse_slice(self.slice_infos[index])
+        return self._parsed_slices[index]
+
+    def __iter__(self) -> Iterator[MachoBinary]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return f"<MachoSlices {[hex(info.cputype) for info in self.slice_infos]}>"
+
+
 class MachoParser:
     _FAT_MAGIC = [MachArch.FAT_MAGIC, MachArch.FAT_CIGAM]
     _MACHO_MAGIC = [MachArch.MH_MAGIC, MachArch.MH_CIGAM, MachArch.MH_MAGIC_64, MachArch.MH_CIGAM_64]
@@ -19,31 +77,68 @@ class MachoParser:
 
     SUPPORTED_MAG = _FAT_MAGIC + _SUPPORTED_SLICE_MAG
 
-    def __init__(self, path: Path) -> None:
-        self.path = path
+    _CPU_TYPES_TO_MACH_CPU_TYPES = {
+        CPU_TYPE.ARM64: MachArch.MH_CPU_TYPE_ARM64,
+        CPU_TYPE.ARMV7: MachArch.MH_CPU_TYPE_ARM,
+    }
+
+    def __init__(
+        self,
+        source: Optional[MachoSourceObject] = None,
+        arch: Optional[CPU_TYPE] = None,
+        quick_scan: bool = False,
+        name: Optional[Path] = None,
+        path: Optional[Path] = None,
+    ) -> None:
+        """Read the slice table of a Mach-O or FAT file. Slices are parsed when they're accessed through self.slices.
+
+        Args:
+            source: The file to parse. This is a path, an in-memory buffer (bytes, bytearray, memoryview or mmap),
+                a seekable binary file object, or a MachoSource. See MachoSource.from_object()
+            arch: If set, only the slice built for this architecture is made available, and
+                ArchitectureNotSupportedError is raised if the file doesn't contain one.
+            quick_scan: If set, slices only parse their header and load commands up front. See MachoBinary.__init__()
+            name: The path to give the slices parsed from a buffer or file object source
+            path: The path of the file to parse. This is accepted in place of `source`, for existing callers which
+                pass the path by keyword
+        """
+        if (source is None) == (path is None):
+            raise TypeError("MachoParser requires exactly one of source or path")
+        self.source = MachoSource.from_object(source if source is not None else cast(Path, path), name)
+        self.path = self.source.path
+        self.arch = arch
+        self.quick_scan = quick_scan
 
         self.header: Optional[MachoFatHeader] = None
         self.is_swapped: bool = False
-        self.slices: List[MachoBinary] = []
+        self._slice_infos: List[MachoSliceInfo] = []
 
         self.parse()
 
+        self.slices = MachoSlices(self, self._slice_infos)
+
+    @property
+    def slice_infos(self) -> List[MachoSliceInfo]:
+        """The architecture and location of each slice, which are available without parsing the slices."""
+        return self.slices.slice_infos
+
+    def get_slice_for_mach_cputype(self, cputype: int) -> Optional[MachoBinary]:
+        """Retrieve the parsed slice built for a Mach-O cputype. Only this slice is parsed."""
+        for i, slice_info in enumerate(self.slice_infos):
+            if slice_info.cputype == cputype:
+                return self.slices[i]
+        return None
+
     def get_arm64_slice(self) -> Optional[MachoBinary]:
         """Retrieve the parsed slice from the FAT built for ARM64."""
-        arm64_slices = [x for x in self.slices if x.header.cputype == MachArch.MH_CPU_TYPE_ARM64]
-        if len(arm64_slices):
-            return arm64_slices[0]
-        return None
+        return self.get_slice_for_mach_cputype(MachArch.MH_CPU_TYPE_ARM64)
 
     def get_armv7_slice(self) -> Optional[MachoBinary]:
         """Retrieve the parsed slice from the FAT built for ARMv7."""
-        armv7_slices = [x for x in self.slices if x.header.cputype == MachArch.MH_CPU_TYPE_ARM]
-        if len(armv7_slices):
-            return armv7_slices[0]
-        return None
+        return self.get_slice_for_mach_cputype(MachArch.MH_CPU_TYPE_ARM)
 
     def parse(self) -> None:
-        """Parse a Mach-O or FAT archive represented by file at a given path
+        """Parse the headers of a Mach-O or FAT archive represented by file at a given path
         This method will throw an exception if an binary is passed which is malformed or not a
         valid Mach-O or FAT archive
         """
@@ -55,32 +150,56 @@ class MachoParser:
         if self.is_fat:
             self.parse_fat_header()
         else:
-            file_size = self.path.stat().st_size
-            self.parse_thin_header(StaticFilePointer(0), file_size)
+            self.parse_thin_header(StaticFilePointer(0), self.get_file_size())
+
+        if self.arch is not None:
+            mach_cputype = self._CPU_TYPES_TO_MACH_CPU_TYPES.get(self.arch)
+            self._slice_infos = [x for x in self._slice_infos if x.cputype == mach_cputype][:1]
+            if not self._slice_infos:
+                raise ArchitectureNotSupportedError(f"{self.path.as_posix()} has no {self.arch.name} slice")
 
     def parse_thin_header(self, fileoff: StaticFilePointer, slice_size: int) -> None:
-        """Parse a known Mach-O header at a given file offset, and add it to self.slices
+        """Read the architecture of a known Mach-O header at a given file offset, and add it to self.slices
         This method will throw an Exception if the data at fileoff is not a valid Mach-O header
 
         Args:
             fileoff: byte index into file to interpret Mach-O header at
             slice_size: Byte-count of the Mach-O slice in the file
         """
+        # cputype and cpusubtype directly follow the magic in both the 32 and 64-bit Mach-O headers
+        header_bytes = self.get_bytes(fileoff, sizeof(c_uint32) * 3)
         # sanity check
-        if not self._check_is_macho_header(fileoff):
+        if len(header_bytes) < sizeof(c_uint32) * 3 or self._read_magic(header_bytes) not in MachoParser._MACHO_MAGIC:
             raise RuntimeError(f"Parsing error: data at file offset {hex(int(fileoff))} was not a valid Mach-O slice!")
 
-        slice_data = self.get_bytes(fileoff, slice_size)
-        attempt = MachoBinary(self.path, slice_data, file_offset=fileoff)
+        magic, cputype, cpusubtype = (c_uint32 * 3).from_buffer_copy(header_bytes)
+        if magic in MachoParser._BIG_ENDIAN_MAG:
+            cputype, cpusubtype = swap32(cputype), swap32(cpusubtype)
+        self._slice_infos.append(MachoSliceInfo(cputype, cpusubtype, fileoff, slice_size))
+
+    def parse_slice(self, slice_info: MachoSliceInfo) -> MachoBinary:
+        """Parse the Mach-O slice described by a MachoSliceInfo.
+        Clients should prefer self.slices, which only parses each slice once.
+        """
+        slice_data = self.get_bytes(slice_info.offset, slice_info.size)
+        # Locate the slice within the file at self.path, which may contain the source at an offset
+        file_offset = StaticFilePointer(self.source.file_offset + slice_info.offset)
+        attempt = MachoBinary(
+            self.path,
+            slice_data,
+            file_offset=file_offset,
+            quick_scan=self.quick_scan,
+            is_file_backed=self.source.is_file_backed,
+        )
 
         # if the MachoBinary does not have a header, there was a problem parsing it
         if not attempt.header:
             raise RuntimeError("parsed MachoBinary missing Mach-O header field")
-        self.slices.append(attempt)
+        return attempt
 
     def parse_fat_header(self) -> None:
         """Parse the FAT header implicitly found at the start of the file
-        This method will also parse all Mach-O slices that the FAT describes
+        This method will also read the location of each Mach-O slice that the FAT describes
         """
         # sanity check
         if self._check_is_macho_header(StaticFilePointer(0)):
@@ -100,6 +219,8 @@ class MachoParser:
         for i in range(self.header.nfat_arch):  # type: ignore
             arch_bytes = self.get_bytes(StaticFilePointer(read_off), sizeof(MachoFatArch))
             fat_arch = MachoFatArch.from_buffer(bytearray(arch_bytes))
+            # move to next fat_arch structure in file
+            read_off += sizeof(MachoFatArch)
 
             # do we need to byte swap?
             # TODO(pt): come up with more elegant mechanism for swapping byte order in every word of Structure
@@ -118,8 +239,6 @@ class MachoParser:
                 continue
 
             self.parse_thin_header(StaticFilePointer(fat_arch.offset), fat_arch.size)
-            # move to next fat_arch structure in file
-            read_off += sizeof(MachoFatArch)
 
     def _check_is_macho_header(self, offset: StaticFilePointer) -> bool:
         """Check if the data located at a file offset represents a valid Mach-O header, based on the magic
@@ -132,8 +251,15 @@ class MachoParser:
             False if the magic is anything else
 
         """
-        magic = c_uint32.from_buffer(bytearray(self.get_bytes(offset, sizeof(c_uint32)))).value
-        return magic in MachoParser._MACHO_MAGIC
+        if offset == 0:
+            return self.file_magic in MachoParser._MACHO_MAGIC
+        return self._read_magic(self.get_bytes(offset, sizeof(c_uint32))) in MachoParser._MACHO_MAGIC
+
+    @staticmethod
+    def _read_magic(data: MachoSourceBytes) -> Optional[int]:
+        if len(data) < sizeof(c_uint32):
+            return None
+        return c_uint32.from_buffer_copy(data[: sizeof(c_uint32)]).value
 
     def is_magic_supported(self) -> bool:
         """Check whether a magic number represents a file format which this class is capable of parsing
@@ -149,8 +275,8 @@ class MachoParser:
 
     @property
     def file_magic(self) -> int:
-        """Read file magic."""
-        return c_uint32.from_buffer(bytearray(self.get_bytes(StaticFilePointer(0), sizeof(c_uint32)))).value
+        """Read file magic. This is only read from the source once."""
+        return self.source.magic
 
     @property
     def is_fat(self) -> bool:
@@ -174,7 +300,11 @@ class MachoParser:
         # everything we touch currently is little endian, so let's not worry about it for now
         return self.file_magic in MachoParser._BIG_ENDIAN_MAG
 
-    def get_bytes(self, offset: StaticFilePointer, size: int) -> bytes:
+    def get_file_size(self) -> int:
+        """The size of the file, in bytes."""
+        return self.source.size
+
+    def get_bytes(self, offset: StaticFilePointer, size: int) -> MachoSourceBytes:
         """Read a byte list from binary file of a given size, starting from a given offset
 
         Args:
@@ -185,6 +315,4 @@ class MachoParser:
             Byte list representing contents of file at provided address
 
         """
-        with open(self.path, "rb") as binary_file:
-            binary_file.seek(offset)
-            return binary_file.read(size)
+        return self.source.read(offset, size)
@@ -0,0 +1,118 @@
+import mmap
+import os
+from abc import ABC, abstractmethod
+from ctypes import c_uint32, sizeof
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+from strongarm.macho.macho_definitions import StaticFilePointer
+
+# The in-memory buffers a Mach-O can be read from
+MachoBuffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+# The data read from a MachoSource. Buffer sources return views of the buffer rather than copies
+MachoSourceBytes = Union[bytes, bytearray, memoryview]
+
+# Anything MachoParser can read a Mach-O from. See MachoSource.from_object()
+MachoSourceObject = Union["MachoSource", Path, str, MachoBuffer, BinaryIO]
+
+
+class MachoSource(ABC):
+    """The file or buffer containing a Mach-O or FAT, which a MachoParser reads from.
+
+    `path` identifies the source, and becomes the path of each MachoBinary parsed from it. If `is_file_backed` is set,
+    the source's bytes are also on disk at `path`, starting at `file_offset`, so that each MachoBinary's path and
+    file_offset locate its slice on disk.
+    """
+
+    def __init__(self, path: Path, file_offset: int = 0, is_file_backed: bool = True) -> None:
+        self.path = path
+        self.file_offset = file_offset
+        self.is_file_backed = is_file_backed
+        self._magic: Optional[int] = None
+
+    @staticmethod
+    def from_object(source: MachoSourceObject, name: Optional[Path] = None) -> "MachoSource":
+        """Wrap a path, an in-memory buffer, or a seekable binary file object in a MachoSource.
+        `name` names a buffer or file object source. It defaults to the file object's name, if it has one.
+        """
+        if isinstance(source, MachoSource):
+            return source
+        if isinstance(source, (Path, str)):
+            return PathMachoSource(Path(source))
+        if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            return BufferMachoSource(source, name)
+        if hasattr(source, "read") and hasattr(source, "seek"):
+            return FileObjectMachoSource(source, name)
+        raise TypeError(f"Can't read a Mach-O from {type(source).__name__}")
+
+    @property
+    def magic(self) -> int:
+        """The magic at the start of the source. This is only read once."""
+        if self._magic is None:
+            magic_bytes = self.read(StaticFilePointer(0), sizeof(c_uint32))
+            # A source too small to have a magic isn't a supported file
+            self._magic = c_uint32.from_buffer_copy(magic_bytes).value if len(magic_bytes) == sizeof(c_uint32) else 0
+        return self._magic
+
+    @property
+    @abstractmethod
+    def size(self) -> int:
+        """The size of the source, in bytes."""
+
+    @abstractmethod
+    def read(self, offset: StaticFilePointer, size: int) -> MachoSourceBytes:
+        """Read up to `size` bytes from a given offset within the source."""
+
+
+class PathMachoSource(MachoSource):
+    """A Mach-O or FAT file on disk. Each read opens the file, so it isn't held open or mapped between reads."""
+
+    @property
+    def size(self) -> int:
+        return self.path.stat().st_size
+
+    def read(self, offset: StaticFilePointer, size: int) -> MachoSourceBytes:
+        with open(self.path, "rb") as binary_file:
+            binary_file.seek(offset)
+            return binary_file.read(size)
+
+
+class BufferMachoSource(MachoSource):
+    """A Mach-O or FAT which is already in memory, such as bytes fetched from object storage, or a mmap.
+    Reads return views of the buffer, so slices are parsed without copying it.
+    """
+
+    def __init__(self, data: MachoBuffer, name: Optional[Path] = None) -> None:
+        super().__init__(name or Path("<memory>"), is_file_backed=False)
+        self.data = memoryview(data).cast("B")
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def read(self, offset: StaticFilePointer, size: int) -> MachoSourceBytes:
+        return self.data[offset : offset + size]
+
+
+class FileObjectMachoSource(MachoSource):
+    """A seekable binary file object containing a Mach-O or FAT, such as an open file or a BytesIO.
+    The file object must stay open while slices are parsed from it.
+    An open file is file-backed by the path it was opened with, while an in-memory file object isn't.
+    """
+
+    def __init__(self, file: BinaryIO, name: Optional[Path] = None) -> None:
+        file_name = getattr(file, "name", None)
+        file_path = Path(file_name) if isinstance(file_name, (str, os.PathLike)) else None
+        # If the file is given another name, its slices can't be read from disk under that name
+        is_file_backed = file_path is not None and name in (None, file_path)
+        super().__init__(name or file_path or Path("<file>"), is_file_backed=is_file_backed)
+        self.file = file
+
+    @property
+    def size(self) -> int:
+        return self.file.seek(0, os.SEEK_END)
+
+    def read(self, offset: StaticFilePointer, size: int) -> MachoSourceBytes:
+        self.file.seek(offset)
+        return self.file.read(size)
@@ -1,5 +1,9 @@
+import mmap
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from ctypes import c_uint32, c_uint64, sizeof
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, TypeVar, Union, cast
 
 from strongarm.logger import strongarm_logger
 from strongarm.macho.arch_independent_structs import (
@@ -15,11 +19,13 @@ from strongarm.macho.arch_independent_structs import (
     ObjcProtocolRawStruct,
 )
 from strongarm.macho.macho_binary import MachoBinary
-from strongarm.macho.macho_definitions import VirtualMemoryPointer
-from strongarm.macho.utils import int8_from_value
+from strongarm.macho.macho_definitions import StaticFilePointer, VirtualMemoryPointer
+from strongarm.macho.utils import cached_property, int8_from_value
 
 logger = strongarm_logger.getChild(__file__)
 
+_T = TypeVar("_T")
+
 
 class ObjcSelref:
     __slots__ = ["source_address", "destination_address", "selector_literal"]
@@ -38,15 +44,18 @@ class ObjcSelref:
         )
 
 
-class ObjcSelector:
-    __slots__ = ["name", "selref", "implementation", "is_external_definition"]
+class ObjcSelector(NamedTuple):
+    """A selector implemented or referenced by the binary.
+    Selectors are immutable, as the same instance is shared by every class and protocol with the same method.
+    """
 
-    def __init__(self, name: str, selref: Optional[ObjcSelref], implementation: Optional[VirtualMemoryPointer]) -> None:
-        self.name = name
-        self.selref = selref
-        self.implementation = implementation
+    name: str
+    selref: Optional[ObjcSelref]
+    implementation: Optional[VirtualMemoryPointer]
 
-        self.is_external_definition = not self.implementation
+    @property
+    def is_external_definition(self) -> bool:
+        return not self.implementation
 
     def __str__(self) -> str:
         imp_addr = "NaN"
@@ -54,7 +63,8 @@ class ObjcSelector:
             imp_addr = hex(int(self.implementation))
         return f"<@selector({self.name}) at {imp_addr}>"
 
-    __repr__ = __str__
+    def __repr__(self) -> str:
+        return str(self)
 
 
 class ObjcIvar:
@@ -137,9 +147,28 @@ class ObjcCategory(ObjcClass):
         )
 
 
+# An entry in one of the ObjC runtime lists: the name of the list section, and the pointer within it
+_ObjcListEntry = Tuple[str, VirtualMemoryPointer]
+# The result of parsing an _ObjcListEntry: the entry, the parsed object, and the selectors it adds to the selref map
+_ParsedObjcListEntry = Tuple[str, VirtualMemoryPointer, Optional[ObjcClass], List[ObjcSelector]]
+
+
 class ObjcRuntimeDataParser:
-    def __init__(self, binary: MachoBinary) -> None:
+    def __init__(self, binary: MachoBinary, lazy: bool = False, parallel_workers: Optional[int] = None) -> None:
+        """Parse the Objective-C runtime data of a binary.
+
+        By default, every class, category and protocol is parsed upfront.
+        If `lazy` is set, only the __objc_classlist, __objc_catlist and __objc_protolist pointers are read upfront,
+        and each class or category is parsed the first time it's requested. APIs which need every class, such as
+        `classes` and `selector_for_selref()`, parse whatever hasn't been parsed yet.
+
+        If `parallel_workers` is set, parsing every class is split across a pool of this many processes, each of
+        which maps the binary from `binary.path`, or from a temporary copy if the binary isn't file-backed.
+        The results are identical to a sequential parse.
+        """
         self.binary = binary
+        self.is_lazy = lazy
+        self.parallel_workers = parallel_workers
         logger.debug(f"Parsing ObjC runtime info of {self.binary}...")
 
         logger.debug("Step 1: Parsing selrefs...")
@@ -150,14 +179,58 @@ class ObjcRuntimeDataParser:
         # Populates the mappings above
         self._parse_selrefs()
 
-        logger.debug("Step 2: Parsing classes, categories, and protocols...")
+        # Many classes conform to the same protocols, and many protocols declare the same selectors.
+        # Decode each protocol once, and share one ObjcSelector between each method with the same name and IMP.
+        # Since these objects are shared, they must not be modified after they've been parsed.
+        self._protocol_ptrs_to_protocols: Dict[
+            VirtualMemoryPointer, Tuple[Optional[ObjcProtocol], List[ObjcSelector]]
+        ] = {}
+        self._shared_selectors: Dict[Tuple[VirtualMemoryPointer, VirtualMemoryPointer], ObjcSelector] = {}
+        self._reused_protocol_count = 0
+        self._reused_selector_count = 0
+
+        logger.debug("Step 2: Reading class, category, and protocol lists...")
+        self._classlist_pointers = self._get_classlist_pointers()
+        self._classlist_pointer_set = set(self._classlist_pointers)
+        self._catlist_pointers = self._get_catlist_pointers()
+        self._protolist_pointers = self._get_protolist_pointers()
+
+        # The classes and categories parsed so far, keyed by their __objc_classlist or __objc_catlist pointer
         self._classrefs_to_objc_classes: Dict[VirtualMemoryPointer, ObjcClass] = {}
-        # This populates self._classrefs_to_objc_classes
-        self.classes = self._parse_class_and_category_info()
-        self.protocols = self._parse_global_protocol_info()
-
-        logger.debug("Step 3: Resolving symbol name to source dylib map...")
-        self._sym_to_dylib_path = self._parse_linked_dylib_symbols()
+        self._catlist_pointers_to_objc_categories: Dict[VirtualMemoryPointer, ObjcCategory] = {}
+        # The selectors which each parsed class, category, and the protocol list contribute to
+        # self._selref_ptr_to_selector_map. These are applied in list order once everything has been parsed,
+        # so the final map doesn't depend on the order in which classes were requested.
+        self._selector_map_updates: Dict[VirtualMemoryPointer, List[ObjcSelector]] = {}
+        self._protocol_selector_map_updates: List[ObjcSelector] = []
+        self._pending_selector_map_updates: Optional[List[ObjcSelector]] = None
+        # Maps the address of each class implemented in the binary to its name. Used to link superclasses.
+        self._class_pointers_to_names: Optional[Dict[VirtualMemoryPointer, str]] = None
+        self._struct_pointers_to_base_class_names: Dict[VirtualMemoryPointer, str] = {}
+
+        self._classes: Optional[List[ObjcClass]] = None
+        self._protocols: Optional[List[ObjcProtocol]] = None
+        if not lazy:
+            logger.debug("Step 3: Parsing classes, categories, and protocols...")
+            self._finish_parse()
+
+    @property
+    def classes(self) -> List[ObjcClass]:
+        """The classes and categories implemented within the binary, in __objc_classlist then __objc_catlist order."""
+        self._finish_parse()
+        return cast(List[ObjcClass], self._classes)
+
+    @property
+    def protocols(self) -> List[ObjcProtocol]:
+        """The protocols referenced by __objc_protolist."""
+        if self._protocols is None:
+            self._parse_global_protocol_info()
+        return cast(List[ObjcProtocol], self._protocols)
+
+    @cached_property
+    def _sym_to_dylib_path(self) -> Dict[str, str]:
+        logger.debug("Resolving symbol name to source dylib map...")
+        return self._parse_linked_dylib_symbols()
 
     def _parse_linked_dylib_symbols(self) -> Dict[str, str]:
         syms_to_dylib_path = {}
@@ -206,7 +279,7 @@ class ObjcRuntimeDataParser:
         All selrefs keys will have an ObjcSelector value, but none of the ObjcSelector objects
         will have their `implementation` field filled, because at this point in the parse we do not yet know the
         implementations of each selector. ObjcSelectors which we later find an implementation for are
-        updated in self.read_selectors_from_methlist_ptr().
+        updated in self._apply_selector_map_updates(), once every class has been parsed.
         """
         selref_pointers = self.binary.read_pointer_section("__objc_selrefs")
         for selref_ptr, selector_literal_ptr in selref_pointers.items():
@@ -216,6 +289,7 @@ class ObjcRuntimeDataParser:
                 # But all selectors should have a name
                 # TODO(PT): Is this an error?
                 continue
+            selector_string = sys.intern(selector_string)
             wrapped_selref = ObjcSelref(selref_ptr, selector_literal_ptr, selector_string)
 
             # Map the pointers to the wrapped-up selref object
@@ -227,6 +301,8 @@ class ObjcRuntimeDataParser:
             self._selref_ptr_to_selector_map[selref_ptr] = ObjcSelector(selector_string, wrapped_selref, None)
 
     def selector_for_selref(self, selref_addr: VirtualMemoryPointer) -> Optional[ObjcSelector]:
+        # The implementation of each selector is only known once every class has been parsed
+        self._finish_parse()
         # This map contains selectors implemented in the binary
         selector = self._selref_ptr_to_selector_map.get(selref_addr)
         if selector is not None:
@@ -250,131 +326,464 @@ class ObjcRuntimeDataParser:
             return None
 
     def selrefs_to_selectors(self) -> Dict[VirtualMemoryPointer, ObjcSelector]:
+        self._finish_parse()
         return self._selref_ptr_to_selector_map
 
+    @cached_property
+    def _selector_names_to_selrefs(self) -> Dict[str, List[VirtualMemoryPointer]]:
+        """Index each selref by the name of the selector it refers to, in selref-section order.
+        This doesn't need every class to be parsed, as parsing a class never changes the name a selref refers to.
+        """
+        selector_names_to_selrefs: Dict[str, List[VirtualMemoryPointer]] = {}
+        for selref, selector in self._selref_ptr_to_selector_map.items():
+            selector_names_to_selrefs.setdefault(selector.name, []).append(selref)
+        return selector_names_to_selrefs
+
+    @cached_property
+    def _selector_names_to_imps(self) -> Dict[str, List[VirtualMemoryPointer]]:
+        """Index the IMP of each implemented selector by its name, in class-list order."""
+        selector_names_to_imps: Dict[str, List[VirtualMemoryPointer]] = {}
+        for objc_class in self.classes:
+            for objc_sel in objc_class.selectors:
+                if objc_sel.implementation:
+                    selector_names_to_imps.setdefault(objc_sel.name, []).append(objc_sel.implementation)
+        return selector_names_to_imps
+
+    @cached_property
+    def _class_names_to_classes(self) -> Dict[str, List[ObjcClass]]:
+        class_names_to_classes: Dict[str, List[ObjcClass]] = {}
+        for objc_class in self.classes:
+            class_names_to_classes.setdefault(objc_class.name, []).append(objc_class)
+        return class_names_to_classes
+
+    @cached_property
+    def categories(self) -> List[ObjcCategory]:
+        """The categories implemented within the binary, in __objc_catlist order."""
+        return [c for c in self.classes if isinstance(c, ObjcCategory)]
+
+    @cached_property
+    def _base_class_names_to_categories(self) -> Dict[str, List[ObjcCategory]]:
+        base_class_names_to_categories: Dict[str, List[ObjcCategory]] = {}
+        for category in self.categories:
+            base_class_names_to_categories.setdefault(category.base_class, []).append(category)
+        return base_class_names_to_categories
+
     def selref_for_selector_name(self, selector_name: str) -> Optional[VirtualMemoryPointer]:
-        return next(
-            (selref for selref, selector in self._selref_ptr_to_selector_map.items() if selector.name == selector_name),
-            None,
-        )
+        selrefs = self._selector_names_to_selrefs.get(selector_name)
+        return selrefs[0] if selrefs else None
 
     def get_method_imp_addresses(self, selector: str) -> List[VirtualMemoryPointer]:
         """Given a selector, return a list of virtual addresses corresponding to the start of each IMP for that SEL."""
-        return [
-            objc_sel.implementation
-            for objc_class in self.classes
-            for objc_sel in objc_class.selectors
-            if objc_sel.name == selector and objc_sel.implementation
-        ]
+        return list(self._selector_names_to_imps.get(selector, []))
+
+    @cached_property
+    def _catlist_pointers_to_names(self) -> Dict[VirtualMemoryPointer, Tuple[str, str]]:
+        """Read the (base class name, category name) of each category, without parsing the rest of the category."""
+        class_pointers_to_names = self._get_class_pointers_to_names()
+        catlist_pointers_to_names: Dict[VirtualMemoryPointer, Tuple[str, str]] = {}
+        for ptr in self._catlist_pointers:
+            category_struct = self._get_objc_category_from_catlist_pointer(ptr)
+            category_name = self.binary.get_full_string_from_start_address(category_struct.name)
+            if not category_name:
+                continue
+            base_class_name = self._read_base_class_name(
+                VirtualMemoryPointer(category_struct.binary_offset), class_pointers_to_names, category_name
+            )
+            catlist_pointers_to_names[ptr] = (base_class_name, category_name)
+        return catlist_pointers_to_names
+
+    @cached_property
+    def _class_names_to_list_pointers(self) -> Dict[str, List[VirtualMemoryPointer]]:
+        """Index the __objc_classlist and __objc_catlist pointers by the name of the class or category they refer to."""
+        class_names_to_list_pointers: Dict[str, List[VirtualMemoryPointer]] = {}
+        for ptr, class_name in self._get_class_pointers_to_names().items():
+            class_names_to_list_pointers.setdefault(class_name, []).append(ptr)
+        for ptr, (base_class_name, category_name) in self._catlist_pointers_to_names.items():
+            class_names_to_list_pointers.setdefault(f"{base_class_name} ({category_name})", []).append(ptr)
+        return class_names_to_list_pointers
+
+    def classes_for_class_name(self, class_name: str) -> List[ObjcClass]:
+        """Return the classes and categories whose name matches the provided name, in class-list order.
+        Note that a category's name includes its base class, i.e. `NSObject (MyCategory)`.
+        """
+        if self._classes is not None:
+            return list(self._class_names_to_classes.get(class_name, []))
+
+        # Only parse the classes and categories with this name
+        classes: List[ObjcClass] = []
+        for ptr in self._class_names_to_list_pointers.get(class_name, []):
+            objc_class: Optional[ObjcClass]
+            if ptr in self._classlist_pointer_set:
+                objc_class = self._parse_objc_class(ptr)
+            else:
+                objc_class = self._parse_objc_category(ptr)
+            if objc_class:
+                classes.append(objc_class)
+        return classes
+
+    def categories_for_base_class(self, base_class_name: str) -> List[ObjcCategory]:
+        """Return the categories which extend the provided base class, in __objc_catlist order."""
+        if self._classes is not None:
+            return list(self._base_class_names_to_categories.get(base_class_name, []))
+
+        # Only parse the categories extending this class
+        categories: List[ObjcCategory] = []
+        for ptr, (category_base_class_name, _) in self._catlist_pointers_to_names.items():
+            if category_base_class_name == base_class_name:
+                category = self._parse_objc_category(ptr)
+                if category:
+                    categories.append(category)
+        return categories
 
     def objc_class_for_classlist_pointer(self, classlist_ptr: VirtualMemoryPointer) -> Optional[ObjcClass]:
-        return self._classrefs_to_objc_classes.get(classlist_ptr)
+        if classlist_ptr not in self._classlist_pointer_set:
+            return None
+        return self._parse_objc_class(classlist_ptr)
+
+    def _record_selector_map_updates(self, parse: Callable[[], _T]) -> Tuple[_T, List[ObjcSelector]]:
+        """Run a parse, and return the selectors it would store in the selref map instead of storing them."""
+        outer_updates = self._pending_selector_map_updates
+        self._pending_selector_map_updates = []
+        try:
+            result = parse()
+            return result, self._pending_selector_map_updates
+        finally:
+            self._pending_selector_map_updates = outer_updates
+
+    def _add_selector_map_updates(self, selectors: List[ObjcSelector]) -> None:
+        if self._pending_selector_map_updates is not None:
+            # Defer the update until every class has been parsed. See self._finish_parse()
+            self._pending_selector_map_updates += selectors
+        else:
+            self._apply_selector_map_updates(selectors)
+
+    def _apply_selector_map_updates(self, selectors: List[ObjcSelector]) -> None:
+        for selector in selectors:
+            selref = cast(ObjcSelref, selector.selref)
+            # if this selector is already in the map, check if we now know the implementation address
+            # we could have parsed the selector literal/selref pair in _parse_selrefs() but not have known the
+            # implementation, but do now. It's also possible the selref is an external method, and thus will not
+            # have a local implementation.
+            most_specific_selector = selector
+            if selref.source_address in self._selref_ptr_to_selector_map:
+                previously_parsed_selector = self._selref_ptr_to_selector_map[selref.source_address]
+                # Did we already parse this same selector but with more specific information?
+                # (Say, if we parse an ObjC class implementing a protocol before parsing the protocol itself)
+                if previously_parsed_selector.implementation:
+                    # Make sure we keep the most specific selector we've seen
+                    most_specific_selector = previously_parsed_selector
+            self._selref_ptr_to_selector_map[selref.source_address] = most_specific_selector
+
+    def _finish_parse(self) -> None:
+        """Parse every class, category and protocol which hasn't been parsed yet, and finalize the selref map."""
+        if self._classes is not None:
+            return
+
+        # Superclasses can only be linked once the names of all classes are known
+        unlinked_classes: List[ObjcClass] = []
+        if self.parallel_workers:
+            unlinked_classes += self._parse_lists_in_parallel(self.parallel_workers)
 
-    def _parse_objc_classes(self) -> List[ObjcClass]:
-        """Read Objective-C class data in __objc_classlist, __objc_data to get classes and selectors in binary."""
         logger.debug("Cross-referencing __objc_classlist, __objc_class, and __objc_data entries...")
-        parsed_objc_classes = []
-        classlist_pointers = self._get_classlist_pointers()
-        for ptr in classlist_pointers:
-            objc_class = self._get_objc_class_from_classlist_pointer(ptr)
+        classes: List[ObjcClass] = []
+        for ptr in self._classlist_pointers:
+            already_parsed = ptr in self._classrefs_to_objc_classes
+            objc_class = self._parse_objc_class(ptr, link_base_class=False)
             if objc_class:
-                parsed_class = None
-                # parse the instance method list
-                objc_data_struct = self._get_objc_data_from_objc_class(objc_class)
-                if objc_data_struct:
-                    # the class's associated struct __objc_data contains the method list
-                    parsed_class = self._parse_objc_data_entry(objc_class, objc_data_struct)
-
-                # parse the metaclass if it exists
-                # the class stores instance methods and the metaclass's method list contains class methods
-                # the metaclass has the same name as the actual class
-                metaclass = self._get_objc_class_from_classlist_pointer(VirtualMemoryPointer(objc_class.metaclass))
-                if metaclass:
-                    objc_data_struct = self._get_objc_data_from_objc_class(metaclass)
-                    if objc_data_struct:
-                        parsed_metaclass = self._parse_objc_data_entry(objc_class, objc_data_struct)
-                        if parsed_class:
-                            # add in selectors from the metaclass to the real class
-                            parsed_class.selectors += parsed_metaclass.selectors
-                        else:
-                            # no base class found, set the base class to the metaclass
-                            parsed_class = parsed_metaclass
-
-                # sanity check
-                # ensure we either found a class or metaclass
-                if not parsed_class:
-                    raise RuntimeError(f"Failed to parse classref {hex(ptr)}")
-                parsed_objc_classes.append(parsed_class)
-                self._classrefs_to_objc_classes[ptr] = parsed_class
-
-        return parsed_objc_classes
-
-    def _parse_objc_categories(self) -> List[ObjcCategory]:
+                classes.append(objc_class)
+                if not already_parsed:
+                    unlinked_classes.append(objc_class)
+
+        if self._class_pointers_to_names is None:
+            self._class_pointers_to_names = {VirtualMemoryPointer(x.raw_struct.binary_offset): x.name for x in classes}
+
         logger.debug("Cross referencing __objc_catlist, __objc_category, and __objc_data entries...")
-        parsed_categories = []
-        category_pointers = self._get_catlist_pointers()
-        for ptr in category_pointers:
-            objc_category_struct = self._get_objc_category_from_catlist_pointer(ptr)
-            if objc_category_struct:
-                parsed_category = self._parse_objc_category_entry(objc_category_struct)
-                parsed_categories.append(parsed_category)
-        return parsed_categories
-
-    def _parse_class_and_category_info(self) -> List[ObjcClass]:
-        """Parse classes and categories referenced by __objc_classlist and __objc_catlist."""
-        classes: List[ObjcClass] = []
-        classes += self._parse_objc_classes()
-        classes += self._parse_objc_categories()
-        # Link superclasses of classes and base-classes of categories
-        self._add_superclass_or_base_class_name_to_classes(classes)
-        return classes
+        for ptr in self._catlist_pointers:
+            already_parsed = ptr in self._catlist_pointers_to_objc_categories
+            category = self._parse_objc_category(ptr, link_base_class=False)
+            if category:
+                classes.append(category)
+                if not already_parsed:
+                    unlinked_classes.append(category)
+
+        for objc_class_or_category in unlinked_classes:
+            self._link_superclass_or_base_class(objc_class_or_category, self._class_pointers_to_names)
+
+        # Apply the selectors found in each list in the same order a sequential parse would encounter them
+        for ptr in self._classlist_pointers + self._catlist_pointers:
+            self._apply_selector_map_updates(self._selector_map_updates.get(ptr, []))
+        if self._protocols is None:
+            self._parse_global_protocol_info()
+        self._apply_selector_map_updates(self._protocol_selector_map_updates)
+
+        self._classes = classes
+        logger.debug(
+            f"Parsed {len(self._protocol_ptrs_to_protocols)} distinct protocols, reused {self._reused_protocol_count}."
+            f" Parsed {len(self._shared_selectors)} distinct selectors, reused {self._reused_selector_count}."
+        )
+        # Everything has been parsed, so the bookkeeping used during the parse is no longer needed
+        self._selector_map_updates = {}
+        self._protocol_selector_map_updates = []
+        self._protocol_ptrs_to_protocols = {}
+        self._shared_selectors = {}
+
+    def _parse_lists_in_parallel(self, worker_count: int) -> List[ObjcClass]:
+        """Parse every class, category and protocol which hasn't been parsed yet across a pool of processes.
+        Returns the classes and categories which were parsed, which still need their base classes to be linked.
+        """
+        entries: List[_ObjcListEntry] = []
+        entries += [
+            ("__objc_classlist", p) for p in self._classlist_pointers if p not in self._classrefs_to_objc_classes
+        ]
+        entries += [
+            ("__objc_catlist", p) for p in self._catlist_pointers if p not in self._catlist_pointers_to_objc_categories
+        ]
+        if self._protocols is None:
+            entries += [("__objc_protolist", p) for p in self._protolist_pointers]
+        if not entries:
+            return []
+
+        # Use a few shards per worker so that a shard of unusually large classes doesn't hold up the whole parse
+        shard_count = min(len(entries), worker_count * 4)
+        shard_size = -(-len(entries) // shard_count)
+        shards = [entries[i : i + shard_size] for i in range(0, len(entries), shard_size)]
+        logger.debug(f"Parsing {len(entries)} ObjC list entries in {len(shards)} shards across {worker_count} workers")
+
+        # Each worker maps the slice from disk
+        with self.binary.on_disk_slice() as (slice_path, slice_file_offset):
+            init_args = (slice_path, slice_file_offset, self.binary.slice_filesize)
+            with ProcessPoolExecutor(worker_count, initializer=_init_parse_worker, initargs=init_args) as executor:
+                # map() yields the results in the order the shards were submitted, so the merge is deterministic
+                shard_results = list(executor.map(_parse_objc_list_entries, shards))
+
+        parsed_classes: List[ObjcClass] = []
+        protocols: List[ObjcProtocol] = []
+        protocol_selector_map_updates: List[ObjcSelector] = []
+        # Maps each worker's selectors to the equivalent selector using our selrefs, so shared selectors stay shared
+        rebound_selectors: Dict[ObjcSelector, ObjcSelector] = {}
+        for section_name, ptr, parsed, selector_map_updates in (x for shard in shard_results for x in shard):
+            # Each worker parsed its own copy of the selrefs. Point the selectors back at our own ObjcSelref objects.
+            selector_map_updates = self._rebind_selectors(selector_map_updates, rebound_selectors)
+            if parsed:
+                parsed.selectors = self._rebind_selectors(parsed.selectors, rebound_selectors)
+                for protocol in parsed.protocols:
+                    protocol.selectors = self._rebind_selectors(protocol.selectors, rebound_selectors)
+
+            if section_name == "__objc_protolist":
+                if parsed:
+                    protocols.append(cast(ObjcProtocol, parsed))
+                protocol_selector_map_updates += selector_map_updates
+                continue
 
-    def _add_superclass_or_base_class_name_to_classes(self, classes: List[ObjcClass]) -> None:
-        """Iterate each ObjC class/category, and backfill its superclass/base_class name, respectively.
+            if not parsed:
+                continue
+            if section_name == "__objc_classlist":
+                self._classrefs_to_objc_classes[ptr] = parsed
+            else:
+                self._catlist_pointers_to_objc_categories[ptr] = cast(ObjcCategory, parsed)
+            self._selector_map_updates[ptr] = selector_map_updates
+            parsed_classes.append(parsed)
+
+        if self._protocols is None:
+            self._protocols = protocols
+            self._protocol_selector_map_updates = protocol_selector_map_updates
+        return parsed_classes
+
+    def _rebind_selectors(
+        self, selectors: List[ObjcSelector], rebound_selectors: Dict[ObjcSelector, ObjcSelector]
+    ) -> List[ObjcSelector]:
+        """Return the selectors, with each selref replaced by our own ObjcSelref at the same address."""
+        rebound = []
+        for selector in selectors:
+            if selector.selref is not None and selector not in rebound_selectors:
+                selref = self._selref_ptr_to_selref_map.get(selector.selref.source_address, selector.selref)
+                rebound_selectors[selector] = (
+                    selector if selref is selector.selref else selector._replace(selref=selref)
+                )
+            rebound.append(rebound_selectors.get(selector, selector))
+        return rebound
+
+    def _parse_objc_list_entry(self, section_name: str, ptr: VirtualMemoryPointer) -> _ParsedObjcListEntry:
+        """Parse an entry of an ObjC runtime list without caching it or linking its base class."""
+        parsed: Optional[ObjcClass]
+        if section_name == "__objc_classlist":
+            parsed, selector_map_updates = self._record_selector_map_updates(
+                lambda: self._parse_objc_classlist_entry(ptr)
+            )
+        elif section_name == "__objc_catlist":
+            parsed, selector_map_updates = self._record_selector_map_updates(
+                lambda: self._parse_objc_catlist_entry(ptr)
+            )
+        elif section_name == "__objc_protolist":
+            protocols, selector_map_updates = self._record_selector_map_updates(
+                lambda: self._parse_protocol_ptr_list([ptr])
+            )
+            parsed = protocols[0] if protocols else None
+        else:
+            raise ValueError(f"Unknown ObjC list section {section_name}")
+        return section_name, ptr, parsed, selector_map_updates
+
+    def _parse_objc_class(
+        self, classlist_ptr: VirtualMemoryPointer, link_base_class: bool = True
+    ) -> Optional[ObjcClass]:
+        """Return the class referred to by an __objc_classlist pointer, parsing it if this hasn't been done yet."""
+        if classlist_ptr in self._classrefs_to_objc_classes:
+            return self._classrefs_to_objc_classes[classlist_ptr]
+
+        parsed_class, selector_map_updates = self._record_selector_map_updates(
+            lambda: self._parse_objc_classlist_entry(classlist_ptr)
+        )
+        if not parsed_class:
+            return None
+        if link_base_class:
+            self._link_superclass_or_base_class(parsed_class, self._get_class_pointers_to_names())
+        self._classrefs_to_objc_classes[classlist_ptr] = parsed_class
+        self._selector_map_updates[classlist_ptr] = selector_map_updates
+        return parsed_class
+
+    def _parse_objc_category(
+        self, catlist_ptr: VirtualMemoryPointer, link_base_class: bool = True
+    ) -> Optional[ObjcCategory]:
+        """Return the category referred to by an __objc_catlist pointer, parsing it if this hasn't been done yet."""
+        if catlist_ptr in self._catlist_pointers_to_objc_categories:
+            return self._catlist_pointers_to_objc_categories[catlist_ptr]
+
+        parsed_category, selector_map_updates = self._record_selector_map_updates(
+            lambda: self._parse_objc_catlist_entry(catlist_ptr)
+        )
+        if not parsed_category:
+            return None
+        if link_base_class:
+            self._link_superclass_or_base_class(parsed_category, self._get_class_pointers_to_names())
+        self._catlist_pointers_to_objc_categories[catlist_ptr] = parsed_category
+        self._selector_map_updates[catlist_ptr] = selector_map_updates
+        return parsed_category
+
+    def _parse_objc_classlist_entry(self, ptr: VirtualMemoryPointer) -> Optional[ObjcClass]:
+        """Read Objective-C class data in __objc_classlist, __objc_data to get a class and its selectors."""
+        objc_class = self._get_objc_class_from_classlist_pointer(ptr)
+        if not objc_class:
+            return None
+
+        parsed_class = None
+        # parse the instance method list
+        objc_data_struct = self._get_objc_data_from_objc_class(objc_class)
+        if objc_data_struct:
+            # the class's associated struct __objc_data contains the method list
+            parsed_class = self._parse_objc_data_entry(objc_class, objc_data_struct)
+
+        # parse the metaclass if it exists
+        # the class stores instance methods and the metaclass's method list contains class methods
+        # the metaclass has the same name as the actual class
+        metaclass = self._get_objc_class_from_classlist_pointer(VirtualMemoryPointer(objc_class.metaclass))
+        if metaclass:
+            objc_data_struct = self._get_objc_data_from_objc_class(metaclass)
+            if objc_data_struct:
+                parsed_metaclass = self._parse_objc_data_entry(objc_class, objc_data_struct)
+                if parsed_class:
+                    # add in selectors from the metaclass to the real class
+                    parsed_class.selectors += parsed_metaclass.selectors
+                else:
+                    # no base class found, set the base class to the metaclass
+                    parsed_class = parsed_metaclass
+
+        # sanity check
+        # ensure we either found a class or metaclass
+        if not parsed_class:
+            raise RuntimeError(f"Failed to parse classref {hex(ptr)}")
+        return parsed_class
+
+    def _parse_objc_catlist_entry(self, ptr: VirtualMemoryPointer) -> Optional[ObjcCategory]:
+        objc_category_struct = self._get_objc_category_from_catlist_pointer(ptr)
+        if not objc_category_struct:
+            return None
+        return self._parse_objc_category_entry(objc_category_struct)
+
+    def _read_class_name(self, classlist_ptr: VirtualMemoryPointer) -> Optional[str]:
+        """Read the name of the class referred to by an __objc_classlist pointer, without parsing the whole class."""
+        if classlist_ptr in self._classrefs_to_objc_classes:
+            return self._classrefs_to_objc_classes[classlist_ptr].name
+
+        objc_class = self._get_objc_class_from_classlist_pointer(classlist_ptr)
+        objc_data_struct = self._get_objc_data_from_objc_class(objc_class)
+        if not objc_data_struct:
+            # Mirror _parse_objc_classlist_entry(), which falls back to the metaclass's name
+            metaclass = self._get_objc_class_from_classlist_pointer(VirtualMemoryPointer(objc_class.metaclass))
+            objc_data_struct = self._get_objc_data_from_objc_class(metaclass)
+            if not objc_data_struct:
+                return None
+        return self.binary.get_full_string_from_start_address(objc_data_struct.name)
+
+    def _get_class_pointers_to_names(self) -> Dict[VirtualMemoryPointer, str]:
+        if self._class_pointers_to_names is None:
+            class_pointers_to_names: Dict[VirtualMemoryPointer, str] = {}
+            for ptr in self._classlist_pointers:
+                class_name = self._read_class_name(ptr)
+                if class_name:
+                    class_pointers_to_names[ptr] = class_name
+            self._class_pointers_to_names = class_pointers_to_names
+        return self._class_pointers_to_names
+
+    def _read_base_class_name(
+        self,
+        struct_addr: VirtualMemoryPointer,
+        addr_to_class_names: Dict[VirtualMemoryPointer, str],
+        referrer: object,
+    ) -> str:
+        """Read the name of the superclass or base class of a class or category structure, respectively.
 
         Linking super/base_classes needs two data-sources, depending on whether the super/base_class is imported or not:
         - To retrieve the class names of imported super/base classes, this needs the map of bound dyld symbols
-        - To retrieve the class names of locally implemented classes, this needs the full list of ObjcClasses
+        - To retrieve the class names of locally implemented classes, this needs the names of all ObjcClasses
         """
-        # For efficiency, build a map of (struct address -> class name)
-        addr_to_class_names = {x.raw_struct.binary_offset: x.name for x in classes}
+        if struct_addr in self._struct_pointers_to_base_class_names:
+            return self._struct_pointers_to_base_class_names[struct_addr]
 
-        for objc_class_or_category in classes:
-            raw_struct = objc_class_or_category.raw_struct
-            # This method uses the fact that `struct __objc_data.superclass` and `struct __objc_category.base_class`
-            # have the same memory layout, being placed one 64-bit word after the start of the structure.
-            base_class_field_addr = VirtualMemoryPointer(raw_struct.binary_offset + sizeof(c_uint64))
+        # This method uses the fact that `struct __objc_data.superclass` and `struct __objc_category.base_class`
+        # have the same memory layout, being placed one 64-bit word after the start of the structure.
+        base_class_field_addr = VirtualMemoryPointer(struct_addr + sizeof(c_uint64))
 
-            # If the base class is an imported classref, the imported classref will be bound to its runtime load address
-            # by dyld. Look up whether we have an import-binding for the `base_class` field of this structure.
-            if base_class_field_addr in self.binary.dyld_bound_symbols:
-                imported_base_class_sym = self.binary.dyld_bound_symbols[base_class_field_addr]
-                base_class_name = imported_base_class_sym.name
+        # If the base class is an imported classref, the imported classref will be bound to its runtime load address
+        # by dyld. Look up whether we have an import-binding for the `base_class` field of this structure.
+        if base_class_field_addr in self.binary.dyld_bound_symbols:
+            imported_base_class_sym = self.binary.dyld_bound_symbols[base_class_field_addr]
+            base_class_name = imported_base_class_sym.name
 
+        else:
+            dereferenced_classref = VirtualMemoryPointer(self.binary.read_word(base_class_field_addr))
+            # The base class is implemented in this binary, and we should have a corresponding ObjcClass object.
+            if dereferenced_classref in addr_to_class_names:
+                base_class_name = addr_to_class_names[dereferenced_classref]
             else:
-                dereferenced_classref = VirtualMemoryPointer(self.binary.read_word(base_class_field_addr))
-                # The base class is implemented in this binary, and we should have a corresponding ObjcClass object.
-                if dereferenced_classref in addr_to_class_names:
-                    base_class_name = addr_to_class_names[dereferenced_classref]
-                else:
-                    logger.error(
-                        f"Failed to find a corresponding ObjC class for ref {dereferenced_classref} from "
-                        f"{objc_class_or_category}"
-                    )
-                    base_class_name = "$_Unknown_Class"
-
-            if isinstance(objc_class_or_category, ObjcCategory):
-                objc_class_or_category.base_class = base_class_name
-                # Update the name attribute to hold the parsed category name
-                objc_class_or_category.name = f"{base_class_name} ({objc_class_or_category.category_name})"
-            else:
-                objc_class_or_category.superclass_name = base_class_name
+                logger.error(
+                    f"Failed to find a corresponding ObjC class for ref {dereferenced_classref} from {referrer}"
+                )
+                base_class_name = "$_Unknown_Class"
 
-    def _parse_global_protocol_info(self) -> List[ObjcProtocol]:
+        self._struct_pointers_to_base_class_names[struct_addr] = base_class_name
+        return base_class_name
+
+    def _link_superclass_or_base_class(
+        self, objc_class_or_category: ObjcClass, addr_to_class_names: Dict[VirtualMemoryPointer, str]
+    ) -> None:
+        """Backfill the superclass/base_class name of an ObjC class/category, respectively."""
+        raw_struct = objc_class_or_category.raw_struct
+        base_class_name = self._read_base_class_name(
+            VirtualMemoryPointer(raw_struct.binary_offset), addr_to_class_names, objc_class_or_category
+        )
+        if isinstance(objc_class_or_category, ObjcCategory):
+            objc_class_or_category.base_class = base_class_name
+            # Update the name attribute to hold the parsed category name
+            objc_class_or_category.name = f"{base_class_name} ({objc_class_or_category.category_name})"
+        else:
+            objc_class_or_category.superclass_name = base_class_name
+
+    def _parse_global_protocol_info(self) -> None:
         """Parse protocols which code in the app conforms to, referenced by __objc_protolist."""
         logger.debug("Cross referencing __objc_protolist, __objc_protocol, and __objc_data entries...")
-        protocol_pointers = self._get_protolist_pointers()
-        return self._parse_protocol_ptr_list(protocol_pointers)
+        self._protocols, self._protocol_selector_map_updates = self._record_selector_map_updates(
+            lambda: self._parse_protocol_ptr_list(self._protolist_pointers)
+        )
 
     def read_ivars_from_ivarlist_ptr(self, ivarlist_ptr: VirtualMemoryPointer) -> List[ObjcIvar]:
         """Given the virtual address of an ivar list, return a List of each encoded ObjcIvar."""
@@ -417,30 +826,25 @@ class ObjcRuntimeDataParser:
             # Byte-align IMP, as the lower bits are used for flags
             method_ent.implementation &= ~0x3  # type: ignore
 
-            symbol_name = self.binary.get_full_string_from_start_address(method_ent.name)
-            if not symbol_name:
-                raise ValueError(f"Could not get symbol name for {method_ent.name}")
-            # attempt to find corresponding selref
-            selref = self._selector_literal_ptr_to_selref_map.get(method_ent.name)
-
-            selector = ObjcSelector(symbol_name, selref, VirtualMemoryPointer(method_ent.implementation))
+            implementation = VirtualMemoryPointer(method_ent.implementation)
+            # Methods with the same name literal and IMP, such as those declared by several protocols, share a selector
+            selector_key = (VirtualMemoryPointer(method_ent.name), implementation)
+            selector = self._shared_selectors.get(selector_key)
+            if selector is not None:
+                self._reused_selector_count += 1
+            else:
+                symbol_name = self.binary.get_full_string_from_start_address(method_ent.name)
+                if not symbol_name:
+                    raise ValueError(f"Could not get symbol name for {method_ent.name}")
+                # attempt to find corresponding selref
+                selref = self._selector_literal_ptr_to_selref_map.get(method_ent.name)
+                selector = ObjcSelector(sys.intern(symbol_name), selref, implementation)
+                self._shared_selectors[selector_key] = selector
             selectors.append(selector)
 
             # save this selector in the selref pointer -> selector map
-            if selref:
-                # if this selector is already in the map, check if we now know the implementation address
-                # we could have parsed the selector literal/selref pair in _parse_selrefs() but not have known the
-                # implementation, but do now. It's also possible the selref is an external method, and thus will not
-                # have a local implementation.
-                most_specific_selector = selector
-                if selref.source_address in self._selref_ptr_to_selector_map:
-                    previously_parsed_selector = self._selref_ptr_to_selector_map[selref.source_address]
-                    # Did we already parse this same selector but with more specific information?
-                    # (Say, if we parse an ObjC class implementing a protocol before parsing the protocol itself)
-                    if previously_parsed_selector.implementation:
-                        # Make sure we keep the most specific selector we've seen
-                        most_specific_selector = previously_parsed_selector
-                self._selref_ptr_to_selector_map[selref.source_address] = most_specific_selector
+            if selector.selref:
+                self._add_selector_map_updates([selector])
 
             method_entry_off += method_ent.sizeof
         return selectors
@@ -529,12 +933,31 @@ class ObjcRuntimeDataParser:
     def _parse_protocol_ptr_list(self, protocol_ptrs: List[VirtualMemoryPointer]) -> List[ObjcProtocol]:
         protocols = []
         for protocol_ptr in protocol_ptrs:
-            objc_protocol_struct = self._get_objc_protocol_from_pointer(protocol_ptr)
-            if objc_protocol_struct:
-                parsed_protocol = self._parse_objc_protocol_entry(objc_protocol_struct)
+            parsed_protocol = self._parse_protocol_ptr(protocol_ptr)
+            if parsed_protocol:
                 protocols.append(parsed_protocol)
         return protocols
 
+    def _parse_protocol_ptr(self, protocol_ptr: VirtualMemoryPointer) -> Optional[ObjcProtocol]:
+        """Return the protocol at the provided address, decoding it the first time it's requested."""
+        if protocol_ptr in self._protocol_ptrs_to_protocols:
+            self._reused_protocol_count += 1
+            parsed_protocol, selector_map_updates = self._protocol_ptrs_to_protocols[protocol_ptr]
+            # Contribute the protocol's selectors to the selref map just as if it had been decoded again
+            self._add_selector_map_updates(selector_map_updates)
+            return parsed_protocol
+
+        def parse() -> Optional[ObjcProtocol]:
+            objc_protocol_struct = self._get_objc_protocol_from_pointer(protocol_ptr)
+            if not objc_protocol_struct:
+                return None
+            return self._parse_objc_protocol_entry(objc_protocol_struct)
+
+        parsed_protocol, selector_map_updates = self._record_selector_map_updates(parse)
+        self._protocol_ptrs_to_protocols[protocol_ptr] = (parsed_protocol, selector_map_updates)
+        self._add_selector_map_updates(selector_map_updates)
+        return parsed_protocol
+
     def _get_catlist_pointers(self) -> List[VirtualMemoryPointer]:
         """Read pointers in __objc_catlist into list."""
         return list(self.binary.read_pointer_section("__objc_catlist").values())
@@ -592,3 +1015,22 @@ class ObjcRuntimeDataParser:
             )
             return None
         return data_entry
+
+
+# The parser used by each process of a parallel parse. See ObjcRuntimeDataParser._parse_lists_in_parallel()
+_worker_parser: Optional[ObjcRuntimeDataParser] = None
+
+
+def _init_parse_worker(path: Path, file_offset: int, slice_size: int) -> None:
+    global _worker_parser
+    with open(path, "rb") as binary_file:
+        mapping = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+    # MachoBinary only ever copies out slices of the data it's given, so it can read straight from the mapping
+    slice_data: Union[bytes, memoryview] = memoryview(mapping)[file_offset : file_offset + slice_size]
+    binary = MachoBinary(path, slice_data, file_offset=StaticFilePointer(file_offset))
+    _worker_parser = ObjcRuntimeDataParser(binary, lazy=True)
+
+
+def _parse_objc_list_entries(entries: List[_ObjcListEntry]) -> List[_ParsedObjcListEntry]:
+    parser = cast(ObjcRuntimeDataParser, _worker_parser)
+    return [parser._parse_objc_list_entry(section_name, ptr) for section_name, ptr in entries]
@@ -1,4 +1,5 @@
 from ctypes import c_int8, c_int32
+from typing import Any, Callable, Optional, Type
 
 
 def int8_from_value(value: int) -> int:
@@ -7,3 +8,28 @@ def int8_from_value(value: int) -> int:
 
 def int24_from_value(value: int) -> int:
     return c_int32(value & 0xFFFFFF).value
+
+
+class cached_property(object):
+    """A property whose value is computed only once.
+    Used as a < py3.8 alternative to @functools.cached_property
+    Avoiding @functools.lru_cache as they would keep-alive the MachoAnalyzer forever. See:
+    https://bugs.python.org/issue19859
+    Implementation copied from:
+    https://github.com/pallets/werkzeug/blob/0e1b8c4fe598725b343085c5a9a867e90b966db6/werkzeug/utils.py#L35-L73
+    """
+
+    def __init__(self, func: Callable) -> None:
+        self.__name__ = func.__name__
+        self.__module__ = func.__module__
+        self.__doc__ = func.__doc__
+        self.func = func
+
+    def __get__(self, obj: Any, _type: Optional[Type] = None) -> Any:
+        if obj is None:
+            return self
+        value = obj.__dict__.get(self.__name__, None)
+        if value is None:
+            value = self.func(obj)
+            obj.__dict__[self.__name__] = value
+        return value
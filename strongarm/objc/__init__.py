@@ -13,6 +13,7 @@ except ImportError as e:
         sys.exit(1)
     raise
 
+from .cpp_demangler import CppDemangler, demangle_cpp_symbol, demangle_cpp_symbols
 from .objc_analyzer import BasicBlock, ObjcFunctionAnalyzer, ObjcMethodInfo
 from .objc_instruction import (
     ObjcBranchInstruction,
@@ -20,14 +21,19 @@ from .objc_instruction import (
     ObjcInstruction,
     ObjcUnconditionalBranchInstruction,
 )
+from .register_contents_table import RegisterContentsTable
 
 __all__ = [
     "get_register_contents_at_instruction_fast",
     "BasicBlock",
+    "CppDemangler",
+    "demangle_cpp_symbol",
+    "demangle_cpp_symbols",
     "ObjcFunctionAnalyzer",
     "ObjcMethodInfo",
     "RegisterContents",
     "RegisterContentsType",
+    "RegisterContentsTable",
     "ObjcBranchInstruction",
     "ObjcConditionalBranchInstruction",
     "ObjcInstruction",
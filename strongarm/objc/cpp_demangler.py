@@ -0,0 +1,124 @@
+import atexit
+import os
+import threading
+from collections import OrderedDict
+from subprocess import PIPE, Popen
+from typing import Iterable, List, Optional
+
+
+def is_mangled_cpp_symbol(symbol_name: str) -> bool:
+    """Return whether a symbol name appears to be a mangled C++ symbol."""
+    return any(symbol_name.startswith(prefix) for prefix in ["_Z", "__Z", "___Z"])
+
+
+class CppDemangler:
+    """Demangles C++ symbol names through a single long-lived c++filt process.
+
+    c++filt demangles each line written to its stdin and writes the result to stdout, so one process can serve every
+    symbol instead of spawning c++filt per symbol. The process is started on first use and restarted if the current
+    process has forked since. Demangled names are kept in a bounded LRU cache.
+    """
+
+    DEFAULT_CACHE_SIZE = 16384
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._process: Optional[Popen] = None
+        self._process_owner_pid: Optional[int] = None
+        # The coprocess answers one line at a time, so requests from different threads must not interleave
+        self._lock = threading.Lock()
+
+    def _get_process(self) -> Popen:
+        # A forked child shares its parent's pipes, so it needs its own c++filt
+        if self._process is None or self._process_owner_pid != os.getpid() or self._process.poll() is not None:
+            self._process = Popen(["c++filt", "--no-strip-underscore"], stdin=PIPE, stdout=PIPE, text=True, bufsize=1)
+            self._process_owner_pid = os.getpid()
+        return self._process
+
+    def _run_cxxfilt(self, symbol: str) -> str:
+        process = self._get_process()
+        assert process.stdin and process.stdout
+        process.stdin.write(f"{symbol}\n")
+        process.stdin.flush()
+        demangled_symbol = process.stdout.readline()
+        if not demangled_symbol:
+            # If demangling fails, raise. This can alert us to scanner issues.
+            self._process = None
+            raise RuntimeError(f"c++filt exited while demangling {symbol}")
+        return demangled_symbol.strip()
+
+    def _demangle_uncached(self, cpp_symbol: str) -> str:
+        if not is_mangled_cpp_symbol(cpp_symbol):
+            return cpp_symbol
+
+        original_symbol = cpp_symbol
+
+        # Linux's c++filt doesn't like the clang-specific "_block_invoke" which is tacked onto ObjC++ blocks.
+        # Trim this off and add it back after demangling the symbol
+        is_block = False
+        block_index = ""
+        if "_block_invoke" in cpp_symbol:
+            is_block = True
+            cpp_symbol, block_index_str = cpp_symbol.split("_block_invoke")
+            # Some blocks have an index
+            if block_index_str.isnumeric():
+                block_index = f" {int(block_index_str)}"
+
+        # Mach-O symbols carry an extra leading underscore, and we observe that some symbols have a few more.
+        # Symbols with 2-4 leading underscores are demangled as the Itanium "_Z" form.
+        leading_underscores = len(cpp_symbol) - len(cpp_symbol.lstrip("_"))
+        if not 2 <= leading_underscores <= 4:
+            return original_symbol
+
+        itanium_symbol = cpp_symbol[leading_underscores - 1 :]
+        demangled_symbol = self._run_cxxfilt(itanium_symbol)
+        # Was the symbol demangled?
+        if demangled_symbol == itanium_symbol:
+            # Failed to demangle, return the original symbol name
+            return original_symbol
+
+        if is_block:
+            demangled_symbol = f"block{block_index} in {demangled_symbol}"
+        return demangled_symbol
+
+    def demangle(self, cpp_symbol: str) -> str:
+        """Demangle a C++ symbol name. Names which aren't mangled C++ symbols are returned unmodified."""
+        with self._lock:
+            demangled_symbol = self._cache.get(cpp_symbol)
+            if demangled_symbol is not None:
+                self._cache.move_to_end(cpp_symbol)
+                return demangled_symbol
+
+            demangled_symbol = self._demangle_uncached(cpp_symbol)
+            self._cache[cpp_symbol] = demangled_symbol
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return demangled_symbol
+
+    def demangle_many(self, cpp_symbols: Iterable[str]) -> List[str]:
+        """Demangle each of the provided symbol names, returning the results in the same order."""
+        return [self.demangle(cpp_symbol) for cpp_symbol in cpp_symbols]
+
+    def close(self) -> None:
+        """Stop the c++filt process. It's restarted if another symbol is demangled."""
+        with self._lock:
+            if self._process is not None and self._process_owner_pid == os.getpid():
+                assert self._process.stdin
+                self._process.stdin.close()
+                self._process.wait()
+            self._process = None
+
+
+_shared_demangler = CppDemangler()
+atexit.register(_shared_demangler.close)
+
+
+def demangle_cpp_symbol(cpp_symbol: str) -> str:
+    """Demangle a C++ symbol name using the process-wide CppDemangler."""
+    return _shared_demangler.demangle(cpp_symbol)
+
+
+def demangle_cpp_symbols(cpp_symbols: Iterable[str]) -> List[str]:
+    """Demangle a list of C++ symbol names using the process-wide CppDemangler."""
+    return _shared_demangler.demangle_many(cpp_symbols)
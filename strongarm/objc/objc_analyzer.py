@@ -1,62 +1,20 @@
-import functools
-import shlex
 from itertools import starmap
-from subprocess import check_output
-from typing import List, Optional
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
 
 from capstone import CsInsn
-from strongarm_dataflow.dataflow import get_register_contents_at_instruction_fast
 from strongarm_dataflow.register_contents import RegisterContents, RegisterContentsType
 
 from strongarm.logger import strongarm_logger
-from strongarm.macho import MachoBinary, ObjcClass, ObjcSelector, VirtualMemoryPointer
+from strongarm.macho import ControlFlowGraph, MachoBinary, ObjcClass, ObjcSelector, VirtualMemoryPointer
 
+from .cpp_demangler import demangle_cpp_symbol
 from .objc_instruction import ObjcBranchInstruction, ObjcInstruction, ObjcUnconditionalBranchInstruction
+from .register_contents_table import RegisterContentsTable
 
-logger = strongarm_logger.getChild(__file__)
-
-
-def _is_mangled_cpp_symbol(symbol_name: str) -> bool:
-    """Return whether a symbol name appears to be a mangled C++ symbol."""
-    return any(symbol_name.startswith(prefix) for prefix in ["_Z", "__Z", "___Z"])
-
-
-def _demangle_cpp_symbol(cpp_symbol: str) -> str:
-    """Call into c++filt to demangle the provided mangled C++ symbol name."""
-    if not _is_mangled_cpp_symbol(cpp_symbol):
-        return cpp_symbol
-
-    original_symbol = cpp_symbol
-
-    # Linux's c++filt doesn't like the clang-specific "_block_invoke" which is tacked onto ObjC++ blocks.
-    # Trim this off and add it back after demangling the symbol
-    is_block = False
-    block_index = ""
-    if "_block_invoke" in cpp_symbol:
-        is_block = True
-        cpp_symbol, block_index_str = cpp_symbol.split("_block_invoke")
-        # Some blocks have an index
-        if block_index_str.isnumeric():
-            block_index = f" {int(block_index_str)}"
-
-    # XXX(PT): We observe that c++filt doesn't work if there are too many leading underscores
-    # Try demangling multiple times, trimming a leading underscore each time until success (up to 3 times)
-    for _ in range(3):
-        # If demangling fails, allow the exception to propagate up. This can alert us to scanner issues.
-        demangled_symbol = check_output(["c++filt", "-_", shlex.quote(cpp_symbol)]).decode().strip()
-        # Was the symbol demangled?
-        if demangled_symbol != cpp_symbol:
-            if is_block:
-                demangled_symbol = f"block{block_index} in {demangled_symbol}"
-            return demangled_symbol
-        else:
-            # Trim an underscore and try again if possible
-            if not cpp_symbol.startswith("_"):
-                break
-            cpp_symbol = cpp_symbol[1:]
+if TYPE_CHECKING:
+    from strongarm.macho import MachoAnalyzer
 
-    # Failed to demangle, return the original symbol name
-    return original_symbol
+logger = strongarm_logger.getChild(__file__)
 
 
 class ObjcMethodInfo:
@@ -91,7 +49,11 @@ class ObjcFunctionAnalyzer:
     """
 
     def __init__(
-        self, binary: MachoBinary, instructions: List[CsInsn], method_info: Optional[ObjcMethodInfo] = None
+        self,
+        binary: MachoBinary,
+        instructions: List[CsInsn],
+        method_info: Optional[ObjcMethodInfo] = None,
+        macho_analyzer: Optional["MachoAnalyzer"] = None,
     ) -> None:
         from strongarm.macho import MachoAnalyzer
 
@@ -106,12 +68,17 @@ class ObjcFunctionAnalyzer:
             self.end_address = VirtualMemoryPointer(0)
 
         self.binary = binary
-        self.macho_analyzer = MachoAnalyzer.get_analyzer(binary)
+        # Callers which already hold the binary's analyzer can pass it to skip the lookup in the analyzer cache
+        self.macho_analyzer = macho_analyzer or MachoAnalyzer.get_analyzer(binary)
         self.instructions = instructions
         self.method_info = method_info
 
         self._call_targets: Optional[List[ObjcBranchInstruction]] = None
 
+        # Computed on the first register query
+        self._register_contents_table: Optional[RegisterContentsTable] = None
+        self._control_flow_graph: Optional[ControlFlowGraph] = None
+
         # Find basic-block-boundaries upfront
         self.basic_blocks = self._find_basic_blocks()
 
@@ -168,10 +135,7 @@ class ObjcFunctionAnalyzer:
 
             if strtbl_sym_name:
                 # Demangle C++ symbols when applicable
-                if _is_mangled_cpp_symbol(strtbl_sym_name):
-                    strtbl_sym_name = _demangle_cpp_symbol(strtbl_sym_name)
-
-                return strtbl_sym_name
+                return demangle_cpp_symbol(strtbl_sym_name)
 
         # Fallback
         # We don't want to format the procedure as sub_<address>, because we use the output of this method to
@@ -183,8 +147,10 @@ class ObjcFunctionAnalyzer:
         """Get the shared analyzer for the function at start_address in the binary.
 
         This method uses a cached MachoAnalyzer if available, which is more efficient than analyzing the
-        same binary over and over. Therefore, this method should be used when an ObjcFunctionAnalyzer is needed,
-        instead of constructing it yourself.
+        same binary over and over. The function analyzer itself is cached by the MachoAnalyzer, so its lazily
+        computed results are shared with other callers. See MachoAnalyzer.get_function_analyzer().
+        Therefore, this method should be used when an ObjcFunctionAnalyzer is needed, instead of constructing it
+        yourself.
 
         Args:
             binary: The MachoBinary containing a function at start_address
@@ -196,8 +162,7 @@ class ObjcFunctionAnalyzer:
         from strongarm.macho.macho_analyzer import MachoAnalyzer
 
         analyzer = MachoAnalyzer.get_analyzer(binary)
-        instructions = analyzer.get_function_instructions(start_address)
-        return ObjcFunctionAnalyzer(binary, instructions)
+        return analyzer.get_function_analyzer(start_address)
 
     @classmethod
     def get_function_analyzer_for_method(
@@ -223,8 +188,7 @@ class ObjcFunctionAnalyzer:
         from strongarm.macho.macho_analyzer import MachoAnalyzer
 
         analyzer = MachoAnalyzer.get_analyzer(binary)
-        instructions = analyzer.get_function_instructions(method_info.imp_addr)
-        return ObjcFunctionAnalyzer(binary, instructions, method_info=method_info)
+        return analyzer.get_function_analyzer(method_info.imp_addr, method_info=method_info)
 
     @classmethod
     def get_function_analyzer_for_signature(
@@ -233,14 +197,10 @@ class ObjcFunctionAnalyzer:
         from strongarm.macho.macho_analyzer import MachoAnalyzer
 
         analyzer = MachoAnalyzer.get_analyzer(binary)
-        for objc_cls in analyzer.objc_classes():
-            if objc_cls.name == class_name:
-                for sel in objc_cls.selectors:
-                    if sel.name == sel_name:
-                        # XXX(PT): where are the method info's normally stored? Can we grab it from there?
-                        method_info = ObjcMethodInfo(objc_cls, sel, sel.implementation)
-                        return ObjcFunctionAnalyzer.get_function_analyzer_for_method(binary, method_info)
-        raise RuntimeError(f"No found function analyzer for -[{class_name} {sel_name}]")
+        method_info = analyzer.method_info_for_signature(class_name, sel_name)
+        if method_info is None:
+            raise RuntimeError(f"No found function analyzer for -[{class_name} {sel_name}]")
+        return ObjcFunctionAnalyzer.get_function_analyzer_for_method(binary, method_info)
 
     @property
     def call_targets(self) -> List[ObjcBranchInstruction]:
@@ -282,7 +242,7 @@ class ObjcFunctionAnalyzer:
             # might be objc_msgSend to object of class defined outside binary
             if target.is_external_objc_call:
                 continue
-            call_targets.append(ObjcFunctionAnalyzer.get_function_analyzer(self.binary, target.destination_address))
+            call_targets.append(self.macho_analyzer.get_function_analyzer(target.destination_address))
         return call_targets
 
     def get_local_branches(self) -> List[ObjcBranchInstruction]:
@@ -326,29 +286,34 @@ class ObjcFunctionAnalyzer:
             raise RuntimeError(f"could not determine selref ptr, origates in function arg (type {contents.type.name})")
         return VirtualMemoryPointer(contents.value)
 
-    @functools.lru_cache(maxsize=100)
+    @property
+    def register_contents_table(self) -> RegisterContentsTable:
+        """Return the table of known register contents at each instruction in the source function."""
+        if self._register_contents_table is None:
+            self._register_contents_table = RegisterContentsTable(
+                self.instructions, [bb.start_address for bb in self.basic_blocks]
+            )
+        return self._register_contents_table
+
+    @property
+    def control_flow_graph(self) -> ControlFlowGraph:
+        """Return the graph of control-flow edges between the basic blocks of the source function."""
+        if self._control_flow_graph is None:
+            self._control_flow_graph = self.macho_analyzer.get_control_flow_graph(self.start_address)
+        return self._control_flow_graph
+
     def get_register_contents_at_instruction(self, register: str, instruction: ObjcInstruction) -> RegisterContents:
-        # If basic-block analysis has been done, reduce the dataflow analysis space to the instruction's basic-block
-        # Otherwise, use the entire source function as the search space
-        for bb in self.basic_blocks:
-            if bb.start_address <= instruction.address < bb.end_address:
-                # Found the basic block containing the instruction; reduce dataflow analysis space to its head
-                dataflow_space_start = bb.start_address
-                dataflow_space_end = bb.end_address
-                break
-        else:
-            # We are in the process of computing basic blocks, so we can't query them. Use the whole function for DFA
-            dataflow_space_start = self.start_address
-            dataflow_space_end = self.end_address
-
-        # To try and save a bit of work, don't include bytecode past the end of this basic block,
-        # as we only need the bytecode up to the provided instruction
-        function_bytecode = self.binary.get_content_from_virtual_address(
-            self.start_address, dataflow_space_end - self.start_address
-        )
-        return get_register_contents_at_instruction_fast(
-            register, self.start_address, function_bytecode, dataflow_space_start, instruction.address
-        )
+        return self.register_contents_table.get_register_contents(register, instruction.address)
+
+    def get_register_contents_at_instructions(
+        self, queries: Iterable[Tuple[str, ObjcInstruction]]
+    ) -> List[RegisterContents]:
+        """Find the contents of each register at its paired instruction, in the order the queries were provided."""
+        register_contents_table = self.register_contents_table
+        return [
+            register_contents_table.get_register_contents(register, instruction.address)
+            for register, instruction in queries
+        ]
 
     def _find_basic_blocks(self) -> List["BasicBlock"]:
         """Locate the basic-block-boundaries within the source function.
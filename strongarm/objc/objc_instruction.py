@@ -3,7 +3,6 @@ from typing import TYPE_CHECKING, Optional, Tuple, Union
 from capstone import CsInsn
 from capstone.arm64 import ARM64_OP_IMM, ARM64_OP_MEM, ARM64_OP_REG, Arm64Op
 
-from strongarm.macho.macho_analyzer import MachoAnalyzer
 from strongarm.macho.macho_definitions import VirtualMemoryPointer
 from strongarm.macho.objc_runtime_data_parser import ObjcSelector, ObjcSelref
 
@@ -146,7 +145,7 @@ class ObjcUnconditionalBranchInstruction(ObjcBranchInstruction):
         self.selref: Optional[ObjcSelref] = None
         self.selector: Optional[ObjcSelector] = None
 
-        analyzer = MachoAnalyzer.get_analyzer(function_analyzer.binary)
+        analyzer = function_analyzer.macho_analyzer
 
         if container_function_boundary:
             if self.destination_address >= container_function_boundary[0]:
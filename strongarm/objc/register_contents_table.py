@@ -0,0 +1,269 @@
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from capstone import CsInsn
+from capstone.arm64 import (
+    ARM64_OP_IMM,
+    ARM64_OP_MEM,
+    ARM64_OP_REG,
+    ARM64_REG_W0,
+    ARM64_REG_WZR,
+    ARM64_REG_X0,
+    ARM64_REG_X29,
+    ARM64_REG_X30,
+    ARM64_REG_XZR,
+    ARM64_SFT_LSL,
+    Arm64Op,
+)
+from strongarm_dataflow.register_contents import RegisterContents, RegisterContentsType
+
+from strongarm.macho import MachoBinary, VirtualMemoryPointer
+
+# The register file tracked by the pass: x0-x30
+_REGISTER_COUNT = 31
+# Registers which a callee is free to clobber, per the AArch64 procedure call standard
+_CALLER_SAVED_REGISTERS = tuple(range(19)) + (30,)
+_CALL_MNEMONICS = {"bl", "blr", "blraa", "blraaz", "blrab", "blrabz"}
+# Instructions which never write a general-purpose register, and so can be skipped without being decoded further
+_NON_WRITING_MNEMONICS = {
+    "nop",
+    "b",
+    "br",
+    "ret",
+    "cbz",
+    "cbnz",
+    "tbz",
+    "tbnz",
+    "cmp",
+    "cmn",
+    "tst",
+    "ccmp",
+    "ccmn",
+    "fcmp",
+    "fccmp",
+}
+
+_UNKNOWN_STATE: Tuple[Optional[int], ...] = (None,) * _REGISTER_COUNT
+
+
+def _build_register_indexes() -> Dict[int, Tuple[int, bool]]:
+    """Map capstone register IDs to (index in the register file, is 32-bit view)"""
+    # x0-x28 and w0-w30 are numbered contiguously by capstone, but x29 and x30 are aliased to fp and lr
+    register_indexes = {ARM64_REG_X0 + i: (i, False) for i in range(29)}
+    register_indexes.update({ARM64_REG_X29: (29, False), ARM64_REG_X30: (30, False)})
+    register_indexes.update({ARM64_REG_W0 + i: (i, True) for i in range(31)})
+    return register_indexes
+
+
+def _build_register_name_indexes() -> Dict[str, int]:
+    register_name_indexes = {}
+    for i in range(_REGISTER_COUNT):
+        register_name_indexes[f"x{i}"] = i
+        register_name_indexes[f"w{i}"] = i
+    register_name_indexes.update({"fp": 29, "lr": 30})
+    return register_name_indexes
+
+
+_REGISTER_INDEXES = _build_register_indexes()
+_REGISTER_NAME_INDEXES = _build_register_name_indexes()
+
+
+class RegisterContentsTable:
+    """The known-constant contents of the general-purpose registers at every instruction of a function.
+
+    The contents are computed by a forward constant-propagation pass which tracks values materialized by
+    ADRP/ADR/ADD/SUB/MOV/ORR and LDR. As elsewhere in strongarm, a load resolves to the address it reads from,
+    which is what's needed to find the selref or string a register points to. Register contents don't flow between
+    basic blocks, so each register is unknown at the start of a basic block.
+
+    Each basic block is propagated the first time one of its instructions is queried, and every query after that
+    is a lookup. The table only needs the function's instructions and basic block boundaries, so it can be shared by
+    anything which walks a function's code.
+    """
+
+    def __init__(self, instructions: Sequence[CsInsn], basic_block_start_addresses: Iterable[int]) -> None:
+        self.instructions = instructions
+        self.start_address = VirtualMemoryPointer(instructions[0].address) if instructions else VirtualMemoryPointer(0)
+
+        # The index of the first instruction of each basic block, sorted
+        block_start_indexes = {0}
+        for address in basic_block_start_addresses:
+            index = self._index_of_address(address)
+            if index is not None:
+                block_start_indexes.add(index)
+        self._block_start_indexes = sorted(block_start_indexes)
+        self._propagated_block_start_indexes: Set[int] = set()
+
+        # Register file snapshots, and the index of the snapshot describing the registers at each instruction.
+        # A snapshot is only created when an instruction changes a register's contents, so runs of instructions which
+        # don't touch a tracked register share one.
+        self._states: List[Tuple[Optional[int], ...]] = [_UNKNOWN_STATE]
+        self._state_indexes = array("I", [0]) * len(instructions)
+
+    def _index_of_address(self, address: int) -> Optional[int]:
+        offset = address - self.start_address
+        if offset < 0 or offset % MachoBinary.BYTES_PER_INSTRUCTION:
+            return None
+        index = offset // MachoBinary.BYTES_PER_INSTRUCTION
+        if index >= len(self.instructions):
+            return None
+        return index
+
+    def _block_bounds_containing(self, index: int) -> Tuple[int, int]:
+        """Return the [start, end) instruction indexes of the basic block containing the provided instruction index."""
+        block_index = bisect_right(self._block_start_indexes, index) - 1
+        start = self._block_start_indexes[block_index]
+        if block_index + 1 < len(self._block_start_indexes):
+            return start, self._block_start_indexes[block_index + 1]
+        return start, len(self.instructions)
+
+    @staticmethod
+    def _shifted_immediate(operand: Arm64Op) -> int:
+        value = operand.imm
+        if operand.shift.type == ARM64_SFT_LSL:
+            value <<= operand.shift.value
+        return value
+
+    def _propagate_instruction(  # noqa: C901
+        self, instruction: CsInsn, mnemonic: str, state: List[Optional[int]]
+    ) -> List[Tuple[int, Optional[int]]]:
+        """Return the (register index, new contents) pairs written by an instruction, given the current contents."""
+        if mnemonic in _NON_WRITING_MNEMONICS or mnemonic.startswith("b."):
+            return []
+        if mnemonic.startswith("st") and "x" not in mnemonic and not instruction.writeback:
+            # A store only writes a register when it updates its base register, or when it's an exclusive store which
+            # writes its status to a register
+            return []
+
+        operands = instruction.operands
+        destination = _REGISTER_INDEXES.get(operands[0].reg) if operands and operands[0].type == ARM64_OP_REG else None
+
+        value: Optional[int] = None
+        handled = False
+        if destination is not None and len(operands) >= 2:
+            dest_index, is_32_bit = destination
+            source = operands[1]
+            if mnemonic in ("adrp", "adr"):
+                value = source.imm
+                handled = True
+
+            elif mnemonic in ("mov", "movz", "movn", "movk", "orr"):
+                if source.type == ARM64_OP_IMM and mnemonic != "orr":
+                    immediate = self._shifted_immediate(source)
+                    if mnemonic == "movn":
+                        value = ~immediate
+                    elif mnemonic == "movk":
+                        # movk replaces a 16-bit lane of the existing value
+                        existing = state[dest_index]
+                        if existing is not None:
+                            lane_mask = 0xFFFF << source.shift.value
+                            value = (existing & ~lane_mask) | immediate
+                    else:
+                        value = immediate
+                    handled = True
+                elif source.type == ARM64_OP_REG and len(operands) == 2:
+                    # Register-to-register move
+                    if source.reg in (ARM64_REG_XZR, ARM64_REG_WZR):
+                        value = 0
+                    else:
+                        source_register = _REGISTER_INDEXES.get(source.reg)
+                        value = state[source_register[0]] if source_register else None
+                    handled = True
+                elif (
+                    mnemonic == "orr"
+                    and len(operands) == 3
+                    and source.type == ARM64_OP_REG
+                    and source.reg in (ARM64_REG_XZR, ARM64_REG_WZR)
+                    and operands[2].type == ARM64_OP_IMM
+                ):
+                    # orr xN, xzr, #imm is how a bitmask immediate is moved into a register
+                    value = operands[2].imm
+                    handled = True
+
+            elif mnemonic in ("add", "sub") and len(operands) == 3 and operands[2].type == ARM64_OP_IMM:
+                source_register = _REGISTER_INDEXES.get(source.reg) if source.type == ARM64_OP_REG else None
+                base = state[source_register[0]] if source_register else None
+                if base is not None:
+                    immediate = self._shifted_immediate(operands[2])
+                    value = base + immediate if mnemonic == "add" else base - immediate
+                handled = True
+
+            elif mnemonic.startswith(("ldr", "ldur")) and len(operands) == 2 and not instruction.writeback:
+                if source.type == ARM64_OP_IMM:
+                    # PC-relative literal load
+                    value = source.imm
+                elif source.type == ARM64_OP_MEM and not source.mem.index:
+                    base_register = _REGISTER_INDEXES.get(source.mem.base)
+                    base = state[base_register[0]] if base_register else None
+                    if base is not None:
+                        value = base + source.mem.disp
+                # The address is tracked rather than the loaded value, so the destination's width doesn't apply
+                return [(dest_index, value)]
+
+            if handled:
+                if value is not None:
+                    value &= 0xFFFFFFFF if is_32_bit else 0xFFFFFFFFFFFFFFFF
+                return [(dest_index, value)]
+
+        # Any other instruction which writes a register leaves it with unknown contents
+        _, registers_written = instruction.regs_access()
+        return [
+            (_REGISTER_INDEXES[register][0], None) for register in registers_written if register in _REGISTER_INDEXES
+        ]
+
+    def _propagate_block(self, start: int, end: int) -> None:
+        states = self._states
+        state_indexes = self._state_indexes
+        state = list(_UNKNOWN_STATE)
+        state_index = 0
+        clobber_before_next = False
+
+        for index in range(start, end):
+            instruction = self.instructions[index]
+            mnemonic = instruction.mnemonic
+            changed = False
+
+            if clobber_before_next:
+                # The previous instruction was a call, which may have overwritten any caller-saved register
+                for register in _CALLER_SAVED_REGISTERS:
+                    if state[register] is not None:
+                        state[register] = None
+                        changed = True
+                clobber_before_next = False
+
+            if mnemonic in _CALL_MNEMONICS:
+                # The arguments are visible at the call instruction itself
+                clobber_before_next = True
+            else:
+                for register, contents in self._propagate_instruction(instruction, mnemonic, state):
+                    if state[register] != contents:
+                        state[register] = contents
+                        changed = True
+
+            if changed:
+                states.append(tuple(state))
+                state_index = len(states) - 1
+            state_indexes[index] = state_index
+
+        self._propagated_block_start_indexes.add(start)
+
+    def get_register_contents(self, register: str, address: int) -> RegisterContents:
+        """Return the contents of a register after the instruction at the provided address has executed.
+        For a branch, this is the contents of the register as the branch is taken.
+        """
+        register_index = _REGISTER_NAME_INDEXES.get(register)
+        index = self._index_of_address(address)
+        if register_index is None or index is None:
+            return RegisterContents(RegisterContentsType.UNKNOWN, 0)
+
+        start, end = self._block_bounds_containing(index)
+        if start not in self._propagated_block_start_indexes:
+            self._propagate_block(start, end)
+
+        value = self._states[self._state_indexes[index]][register_index]
+        if value is None:
+            return RegisterContents(RegisterContentsType.UNKNOWN, 0)
+        if register.startswith("w"):
+            value &= 0xFFFFFFFF
+        return RegisterContents(RegisterContentsType.IMMEDIATE, value)
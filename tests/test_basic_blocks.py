@@ -1,5 +1,7 @@
 import pathlib
+from array import array
 
+from strongarm.macho import CFGEdgeKind, ControlFlowGraph, NaturalLoop
 from strongarm.macho.macho_analyzer import MachoAnalyzer, VirtualMemoryPointer
 from strongarm.macho.macho_parse import MachoParser
 from strongarm.objc.objc_analyzer import ObjcFunctionAnalyzer
@@ -178,3 +180,80 @@ class TestBasicBlocks:
             # Then the basic-block boundaries are correctly identified
             correct_basic_blocks = [(0x100007F94, 0x100007FA0), (0x100007FA0, 0x100007FA4), (0x100007FA4, 0x100007FB4)]
             assert basic_blocks == [(VirtualMemoryPointer(a), VirtualMemoryPointer(b)) for a, b in correct_basic_blocks]
+
+    def test_control_flow_graph_1(self) -> None:
+        # Given a method implementation containing a switch statement which is compiled to a jump table
+        function_analyzer = self.analyzer.get_imps_for_sel("switchControlFlow")[0]
+
+        # If I query the control-flow graph of the method
+        cfg = function_analyzer.control_flow_graph
+
+        # Then the edges between each basic block are correctly identified
+        # The jump table isn't resolved, so the br may target any block which isn't otherwise reachable
+        correct_edges = [
+            (0x10000675C, 0x1000067B4, CFGEdgeKind.CONDITIONAL),
+            (0x10000675C, 0x100006794, CFGEdgeKind.FALL_THROUGH),
+            (0x100006794, 0x1000067A8, CFGEdgeKind.INDIRECT),
+            (0x100006794, 0x1000067C0, CFGEdgeKind.INDIRECT),
+            (0x100006794, 0x1000067CC, CFGEdgeKind.INDIRECT),
+            (0x100006794, 0x1000067D8, CFGEdgeKind.INDIRECT),
+            (0x1000067A8, 0x1000067E0, CFGEdgeKind.UNCONDITIONAL),
+            (0x1000067B4, 0x1000067E0, CFGEdgeKind.UNCONDITIONAL),
+            (0x1000067C0, 0x1000067E0, CFGEdgeKind.UNCONDITIONAL),
+            (0x1000067CC, 0x1000067E0, CFGEdgeKind.UNCONDITIONAL),
+            (0x1000067D8, 0x1000067E0, CFGEdgeKind.FALL_THROUGH),
+        ]
+        assert cfg.edges == [(VirtualMemoryPointer(a), VirtualMemoryPointer(b), kind) for a, b, kind in correct_edges]
+        assert cfg.predecessors(VirtualMemoryPointer(0x1000067B4)) == [VirtualMemoryPointer(0x10000675C)]
+
+        # And the block after the switch is only dominated by the entry block
+        assert cfg.dominators(VirtualMemoryPointer(0x1000067E0)) == [
+            VirtualMemoryPointer(0x1000067E0),
+            VirtualMemoryPointer(0x10000675C),
+        ]
+        assert cfg.immediate_dominator(VirtualMemoryPointer(0x1000067C0)) == VirtualMemoryPointer(0x100006794)
+        assert cfg.immediate_dominator(VirtualMemoryPointer(0x10000675C)) is None
+        # And the method contains no loops
+        assert cfg.loops == []
+
+    def test_control_flow_graph_2(self) -> None:
+        # Given I provide a method implementation with a backwards local jump
+        function_analyzer = self.analyzer.get_imps_for_sel("forControlFlow")[0]
+
+        # If I query the control-flow graph of the method
+        cfg = function_analyzer.control_flow_graph
+
+        # Then the loop is found
+        loop_block = VirtualMemoryPointer(0x100006820)
+        assert cfg.successors(loop_block) == [
+            (loop_block, CFGEdgeKind.CONDITIONAL),
+            (VirtualMemoryPointer(0x100006838), CFGEdgeKind.FALL_THROUGH),
+        ]
+        assert cfg.loops == [NaturalLoop(loop_block, frozenset([loop_block]), frozenset([loop_block]))]
+        assert cfg.block_containing(VirtualMemoryPointer(0x10000682C)) == loop_block
+
+    def test_control_flow_graph_loops(self) -> None:
+        # Given a control-flow graph with nested loops, and a block which isn't reachable from the entry block
+        #   0 -> 1 -> 2 -> 3 -> 4 -> 5
+        #        ^    ^----|    |
+        #        |--------------|
+        #   6 -> 2
+        blocks = [(VirtualMemoryPointer(0x1000 + i * 0x10), VirtualMemoryPointer(0x1010 + i * 0x10)) for i in range(7)]
+        starts = [start for start, _ in blocks]
+        edges = [(0, 1), (1, 2), (2, 3), (3, 2), (3, 4), (4, 1), (4, 5), (6, 2)]
+        cfg = ControlFlowGraph(
+            starts[0], blocks, array("I", [x for a, b in edges for x in (a, b, CFGEdgeKind.UNCONDITIONAL)])
+        )
+
+        # Then each loop is found, with its body and back edges
+        assert cfg.loops == [
+            NaturalLoop(starts[1], frozenset(starts[1:5]), frozenset([starts[4]])),
+            NaturalLoop(starts[2], frozenset(starts[2:4]), frozenset([starts[3]])),
+        ]
+        # And dominators are computed
+        assert cfg.immediate_dominator(starts[5]) == starts[4]
+        assert cfg.dominates(starts[1], starts[3])
+        assert cfg.immediate_dominator(starts[4]) == starts[3]
+        assert not cfg.dominates(starts[4], starts[3])
+        # And the unreachable block has no dominators
+        assert cfg.dominators(starts[6]) == []
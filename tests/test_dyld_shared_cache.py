@@ -1,11 +1,32 @@
-"""These tests cannot run in CI as they require a dyld_shared_cache image, which is > 1GB
-"""
+"""These tests cannot run in CI as they require a dyld_shared_cache image, which is > 1GB"""
+
+import csv
 import os
+from ctypes import sizeof
 from pathlib import Path
+from typing import Tuple
 
 import pytest
 
-from strongarm.macho import DyldSharedCacheParser, MachoAnalyzer, VirtualMemoryPointer
+from strongarm.macho import (
+    DyldSharedCacheHeader,
+    DyldSharedCacheImageInfo,
+    DyldSharedCacheParser,
+    DyldSharedCacheSymbolIndex,
+    DyldSharedFileMapping,
+    MachoAnalyzer,
+    MachoBinary,
+    MachoParser,
+    StaticFilePointer,
+    VirtualMemoryPointer,
+    exported_symbols_for_image,
+    extract_dyld_shared_cache,
+    iter_dyld_shared_cache_symbols,
+    write_dyld_shared_cache_symbol_map,
+)
+from strongarm.macho.macho_definitions import NLIST_NTYPE, NTYPE_VALUES, VMProtFlags
+
+from .utils import binary_with_name, write_dyld_shared_cache
 
 # XXX(PT): This test suite expects to run on a mounted IPSW of iOS 12.1.1 iPad 6 WiFi
 _FIRMWARE_ROOT = Path("/") / "Volumes" / "PeaceC16C50.J71bJ72bJ71sJ72sJ71tJ72tOS"
@@ -77,3 +98,476 @@ class TestDyldSharedCache:
             "_mach_init_routine": 0x1B7C574B0,
         }
         assert analyzer.exported_symbol_names_to_pointers == expected_exports
+
+
+class TestDyldSharedCacheIndexes:
+    """These tests run against a synthetic DSC containing only a header, the mappings, and an image list"""
+
+    _IMAGES = [
+        (Path("/usr/lib/libA.dylib"), 0x180000000),
+        (Path("/usr/lib/libB.dylib"), 0x180004000),
+        (Path("/usr/lib/libC.dylib"), 0x180010000),
+    ]
+
+    @pytest.fixture
+    def dyld_shared_cache(self, tmp_path: Path) -> DyldSharedCacheParser:
+        mappings = [
+            (0x180000000, 0x20000, 0x0, VMProtFlags.VM_PROT_READ | VMProtFlags.VM_PROT_EXECUTE),
+            (0x190000000, 0x4000, 0x20000, VMProtFlags.VM_PROT_READ | VMProtFlags.VM_PROT_WRITE),
+            (0x1A0000000, 0x4000, 0x24000, VMProtFlags.VM_PROT_READ),
+        ]
+        mapping_offset = sizeof(DyldSharedCacheHeader)
+        images_offset = mapping_offset + sizeof(DyldSharedFileMapping) * len(mappings)
+        paths_offset = images_offset + sizeof(DyldSharedCacheImageInfo) * len(self._IMAGES)
+
+        header = DyldSharedCacheHeader(
+            magic=b"dyld_v1   arm64",
+            mappingOffset=mapping_offset,
+            mappingCount=len(mappings),
+            imagesOffset=images_offset,
+            imagesCount=len(self._IMAGES),
+        )
+        data = bytearray(bytes(header))
+        for address, size, file_offset, prot in mappings:
+            data += bytes(
+                DyldSharedFileMapping(
+                    address=address, size=size, file_offset=file_offset, max_prot=prot, init_prot=prot
+                )
+            )
+        path_strings = bytearray()
+        for path, address in self._IMAGES:
+            data += bytes(DyldSharedCacheImageInfo(address=address, pathFileOffset=paths_offset + len(path_strings)))
+            path_strings += str(path).encode() + b"\x00"
+        data += path_strings
+        data += bytes(0x28000 - len(data))
+
+        dsc_path = tmp_path / "dyld_shared_cache_arm64"
+        dsc_path.write_bytes(data)
+        return DyldSharedCacheParser(dsc_path)
+
+    def test_parses_images(self, dyld_shared_cache: DyldSharedCacheParser) -> None:
+        assert dyld_shared_cache.file_magic == 0x646C7964
+        assert dyld_shared_cache.embedded_binary_info == {
+            Path("/usr/lib/libA.dylib"): (VirtualMemoryPointer(0x180000000), VirtualMemoryPointer(0x180004000)),
+            Path("/usr/lib/libB.dylib"): (VirtualMemoryPointer(0x180004000), VirtualMemoryPointer(0x180010000)),
+            Path("/usr/lib/libC.dylib"): (VirtualMemoryPointer(0x180010000), VirtualMemoryPointer(0x180020000)),
+        }
+
+    def test_find_image_for_text_address(self, dyld_shared_cache: DyldSharedCacheParser) -> None:
+        # Given addresses at the start, middle, and end of each image
+        for path, (text_vm_start, text_vm_end) in dyld_shared_cache.embedded_binary_info.items():
+            for address in [text_vm_start, text_vm_start + 0x100, text_vm_end - 4]:
+                # When I ask which image contains them
+                # Then the correct image is returned
+                assert dyld_shared_cache.image_for_text_address(VirtualMemoryPointer(address)) == path
+
+        # And addresses outside every image are rejected
+        for outside_address in [0x17FFFFFFC, 0x180020000, 0x190000000]:
+            with pytest.raises(ValueError):
+                dyld_shared_cache.image_for_text_address(VirtualMemoryPointer(outside_address))
+
+    def test_translate_virtual_address_to_static(self, dyld_shared_cache: DyldSharedCacheParser) -> None:
+        # Given addresses within each mapping
+        # When I translate them to file offsets
+        # Then they're translated relative to the start of the mapping
+        assert dyld_shared_cache.translate_virtual_address_to_static(VirtualMemoryPointer(0x180000010)) == 0x10
+        assert dyld_shared_cache.translate_virtual_address_to_static(VirtualMemoryPointer(0x190000010)) == 0x20010
+        assert dyld_shared_cache.translate_virtual_address_to_static(VirtualMemoryPointer(0x1A0003FFF)) == 0x27FFF
+
+        # And addresses between or outside the mappings are rejected
+        for address in [0x17FFFFFFF, 0x180020000, 0x1A0004000]:
+            with pytest.raises(ValueError):
+                dyld_shared_cache.translate_virtual_address_to_static(VirtualMemoryPointer(address))
+
+    def test_get_bytes_is_a_view(self, dyld_shared_cache: DyldSharedCacheParser) -> None:
+        # Given I read from the DSC
+        contents = dyld_shared_cache.get_bytes(StaticFilePointer(0), 16)
+        # Then the bytes are a view of the file, rather than a copy
+        assert isinstance(contents, memoryview)
+        assert contents.readonly
+        assert bytes(contents) == b"dyld_v1   arm64\x00"
+
+
+# The images embedded in the synthetic DSC, and the test binaries they're copied from
+_SYNTHETIC_DSC_IMAGES = {
+    Path("/usr/lib/libMultipleConstSections.dylib"): "MultipleConstSections",
+    Path("/usr/lib/libTestBinary5.dylib"): "TestBinary5",
+    Path("/usr/lib/libClasslistDataConst.dylib"): "ClasslistDataConst",
+    Path("/usr/lib/libXcode14_objc_stubs.dylib"): "Xcode14_objc_stubs",
+    Path("/usr/lib/libiOS15_chained_fixup_pointers.dylib"): "iOS15_chained_fixup_pointers",
+}
+
+
+@pytest.fixture
+def dyld_shared_cache_path(tmp_path: Path) -> Path:
+    dsc_path = tmp_path / "dyld_shared_cache_arm64"
+    images = [(path, binary_with_name(name)) for path, name in _SYNTHETIC_DSC_IMAGES.items()]
+    write_dyld_shared_cache(dsc_path, images)
+    return dsc_path
+
+
+class TestDyldSharedCacheImage:
+    def test_parses_load_commands(self, dyld_shared_cache_path: Path) -> None:
+        dyld_shared_cache = DyldSharedCacheParser(dyld_shared_cache_path)
+        for path in _SYNTHETIC_DSC_IMAGES:
+            # Given I create a lightweight view of an image
+            image = dyld_shared_cache.get_embedded_image(path)
+            # Then its load commands match those parsed by a full DyldSharedCacheBinary
+            binary = dyld_shared_cache.get_embedded_binary(path)
+            assert image.file_type == binary.file_type
+            assert [segment.segname.decode() for segment in image.segments] == [x.name for x in binary.segments]
+            assert image.get_virtual_base() == binary.get_virtual_base()
+            assert image.linked_dylibs == [dylib.name for dylib in binary.linked_dylibs]
+            assert image.id_dylib == (binary.id_dylib.name if binary.id_dylib else None)
+
+        image = dyld_shared_cache.get_embedded_image(Path("/usr/lib/libMultipleConstSections.dylib"))
+        assert image.id_dylib == "@rpath/BroadSoftDialpadFramework.framework/BroadSoftDialpadFramework"
+        assert "/usr/lib/libobjc.A.dylib" in image.linked_dylibs
+
+    def test_defined_symbols(self, dyld_shared_cache_path: Path) -> None:
+        dyld_shared_cache = DyldSharedCacheParser(dyld_shared_cache_path)
+        for path in _SYNTHETIC_DSC_IMAGES:
+            # Given I read the symbols an image defines
+            symbols = dyld_shared_cache.get_embedded_image(path).defined_symbols()
+            # Then they match the exported symbols MachoAnalyzer reports, in the same order
+            analyzer = MachoAnalyzer.get_analyzer(dyld_shared_cache.get_embedded_binary(path))
+            assert symbols == [(address, name) for name, address in analyzer.exported_symbol_names_to_pointers.items()]
+            MachoAnalyzer.clear_cache()
+
+    def test_exported_symbols(self, dyld_shared_cache_path: Path) -> None:
+        dyld_shared_cache = DyldSharedCacheParser(dyld_shared_cache_path)
+        for path in _SYNTHETIC_DSC_IMAGES:
+            # Given I read an image's export trie
+            image = dyld_shared_cache.get_embedded_image(path)
+            exports = image.exported_symbols()
+            # Then it contains exactly the external symbols defined in the symbol table
+            string_table_helper = MachoAnalyzer.get_analyzer(
+                dyld_shared_cache.get_embedded_binary(path)
+            ).crossref_helper
+            external_symbols = {}
+            for string_table_index, symbol_type, _, _, value in image.symtab_entries():
+                if symbol_type & NLIST_NTYPE.N_TYPE == NTYPE_VALUES.N_SECT and symbol_type & NLIST_NTYPE.N_EXT:
+                    entry = string_table_helper.string_table_entry_for_strtab_index(string_table_index)
+                    assert entry
+                    external_symbols[entry.full_string] = value
+            assert exports == external_symbols
+            MachoAnalyzer.clear_cache()
+
+        # And the trie is read from both LC_DYLD_INFO and LC_DYLD_EXPORTS_TRIE
+        image = dyld_shared_cache.get_embedded_image(Path("/usr/lib/libTestBinary5.dylib"))
+        assert len(image.exported_symbols()) == 41
+        image = dyld_shared_cache.get_embedded_image(Path("/usr/lib/libiOS15_chained_fixup_pointers.dylib"))
+        assert image.exported_symbols() == {"__mh_execute_header": VirtualMemoryPointer(0x100000000)}
+
+
+class TestSplitDyldSharedCache:
+    @pytest.fixture
+    def split_dyld_shared_cache_path(self, tmp_path: Path) -> Path:
+        dsc_path = tmp_path / "dyld_shared_cache_arm64e"
+        images = [(path, binary_with_name(name)) for path, name in _SYNTHETIC_DSC_IMAGES.items()]
+        write_dyld_shared_cache(dsc_path, images, subcache_count=2)
+        return dsc_path
+
+    def test_parses_subcaches(self, split_dyld_shared_cache_path: Path) -> None:
+        # Given a cache split across a main file and two subcaches
+        dyld_shared_cache = DyldSharedCacheParser(split_dyld_shared_cache_path)
+        # Then the subcaches are found
+        assert dyld_shared_cache.subcache_paths == [
+            split_dyld_shared_cache_path.with_name("dyld_shared_cache_arm64e.01"),
+            split_dyld_shared_cache_path.with_name("dyld_shared_cache_arm64e.02"),
+        ]
+        assert dyld_shared_cache.symbols_cache_path == split_dyld_shared_cache_path.with_name(
+            "dyld_shared_cache_arm64e.symbols"
+        )
+        # And the mappings of every file are parsed
+        assert len(dyld_shared_cache.segment_mappings) == 5
+        # And every image is found, including those in subcaches
+        assert list(dyld_shared_cache.embedded_binary_info) == list(_SYNTHETIC_DSC_IMAGES)
+        # And the last image in the main file ends with the main file's mapping, rather than at the next image, which
+        # is in a subcache
+        _, text_end = dyld_shared_cache.embedded_binary_info[Path("/usr/lib/libTestBinary5.dylib")]
+        assert text_end == dyld_shared_cache.segment_mappings[0].address + dyld_shared_cache.segment_mappings[0].size
+
+    def test_maps_subcaches_lazily(self, split_dyld_shared_cache_path: Path) -> None:
+        # Given I open a split cache
+        dyld_shared_cache = DyldSharedCacheParser(split_dyld_shared_cache_path)
+        # Then only the main file is mapped
+        assert [mapping is not None for mapping in dyld_shared_cache._cache_file_mmaps] == [True, False, False]
+
+        # When I read an address within the last subcache
+        last_subcache_mapping = dyld_shared_cache.segment_mappings[-1]
+        file_offset = dyld_shared_cache.translate_virtual_address_to_static(
+            VirtualMemoryPointer(last_subcache_mapping.address)
+        )
+        # Then the read is served from the subcache
+        assert bytes(dyld_shared_cache.get_bytes(file_offset, 16)) == b"dyld_v1   arm64\x00"
+        # And only that subcache has been mapped
+        assert [mapping is not None for mapping in dyld_shared_cache._cache_file_mmaps] == [True, False, True]
+
+    def test_images_match_unsplit_cache(self, split_dyld_shared_cache_path: Path, dyld_shared_cache_path: Path) -> None:
+        # Given the same images in a split and an unsplit cache
+        split_dyld_shared_cache = DyldSharedCacheParser(split_dyld_shared_cache_path)
+        dyld_shared_cache = DyldSharedCacheParser(dyld_shared_cache_path)
+        for image_path in _SYNTHETIC_DSC_IMAGES:
+            # Then each image is parsed identically
+            split_image = split_dyld_shared_cache.get_embedded_image(image_path)
+            image = dyld_shared_cache.get_embedded_image(image_path)
+            assert split_image.linked_dylibs == image.linked_dylibs
+            assert split_image.defined_symbols() == image.defined_symbols()
+
+            split_binary = split_dyld_shared_cache.get_embedded_binary(image_path)
+            binary = dyld_shared_cache.get_embedded_binary(image_path)
+            assert split_binary.get_functions() == binary.get_functions()
+
+    def test_translates_load_command_offsets(self, split_dyld_shared_cache_path: Path) -> None:
+        # Given a segment within the last subcache, such as an image's __LINKEDIT
+        dyld_shared_cache = DyldSharedCacheParser(split_dyld_shared_cache_path)
+        subcache_mapping = dyld_shared_cache.segment_mappings[-1]
+        segment = (subcache_mapping.address + 0x4000, 0x4000, 0x1000)
+        # When I translate an offset which a load command reports within the segment
+        file_offset = dyld_shared_cache._translate_load_command_offset([segment], 0x4010, 0x10)
+        # Then it's translated to the same offset within the subcache
+        assert dyld_shared_cache._split_file_offset(file_offset) == (2, 0x4010)
+        # And offsets outside every segment are unchanged
+        assert dyld_shared_cache._translate_load_command_offset([segment], 0x8000, 0x10) == 0x8000
+
+    def test_rejects_mismatched_subcache(self, split_dyld_shared_cache_path: Path) -> None:
+        # Given a subcache which was replaced by one from another cache
+        subcache_path = split_dyld_shared_cache_path.with_name("dyld_shared_cache_arm64e.01")
+        subcache = bytearray(subcache_path.read_bytes())
+        uuid_offset = DyldSharedCacheHeader.uuid.offset
+        subcache[uuid_offset : uuid_offset + 16] = b"\xaa" * 16
+        subcache_path.write_bytes(subcache)
+        # Then the cache can't be opened
+        with pytest.raises(ValueError):
+            DyldSharedCacheParser(split_dyld_shared_cache_path)
+
+
+class TestDyldSharedCacheExtraction:
+    @staticmethod
+    def _write_dyld_shared_cache(tmp_path: Path, binary_name: str) -> Tuple[MachoBinary, Path]:
+        # The synthetic DSC doesn't rebase its images, so place the binary at its own base address. This way, the
+        # virtual addresses in its load commands are valid within the DSC
+        binary = binary_with_name(binary_name)
+        dsc_path = tmp_path / "dyld_shared_cache_arm64"
+        write_dyld_shared_cache(
+            dsc_path, [(Path(f"/usr/lib/{binary_name}"), binary)], first_image_address=binary.get_virtual_base()
+        )
+        return binary, dsc_path
+
+    @pytest.mark.parametrize(
+        "binary_name", ["TestBinary5", "ClasslistDataConst", "Xcode14_objc_stubs", "iOS15_chained_fixup_pointers"]
+    )
+    def test_extracted_image_matches_original(self, tmp_path: Path, binary_name: str) -> None:
+        # Given a DSC containing a binary
+        binary, dsc_path = self._write_dyld_shared_cache(tmp_path, binary_name)
+        # When I extract it
+        output_directory = tmp_path / "extracted"
+        extracted = list(extract_dyld_shared_cache(dsc_path, output_directory))
+        # Then it's written beneath the output directory, at its install path
+        output_path = output_directory / "usr" / "lib" / binary_name
+        assert extracted == [(Path(f"/usr/lib/{binary_name}"), output_path)]
+
+        # And the extracted image has the same segments and section contents as the original binary
+        extracted_binary = MachoParser(output_path).get_arm64_slice()
+        assert extracted_binary is not None
+        assert [(s.name, s.vmaddr, s.vmsize) for s in extracted_binary.segments if s.name != "__LINKEDIT"] == [
+            (s.name, s.vmaddr, s.vmsize) for s in binary.segments if s.name != "__LINKEDIT"
+        ]
+        for section, extracted_section in zip(binary.sections, extracted_binary.sections):
+            assert (extracted_section.name, extracted_section.address) == (section.name, section.address)
+            if section.offset:
+                assert extracted_binary.get_bytes(extracted_section.offset, section.size) == binary.get_bytes(
+                    section.offset, section.size
+                )
+
+        # And its rebuilt __LINKEDIT describes the same symbols
+        analyzer = MachoAnalyzer.get_analyzer(binary)
+        extracted_analyzer = MachoAnalyzer.get_analyzer(extracted_binary)
+        assert extracted_analyzer.exported_symbol_names_to_pointers == analyzer.exported_symbol_names_to_pointers
+        assert extracted_analyzer.imported_symbols_to_symbol_names == analyzer.imported_symbols_to_symbol_names
+        assert [(stub.address, stub.destination) for stub in extracted_analyzer.imp_stubs] == [
+            (stub.address, stub.destination) for stub in analyzer.imp_stubs
+        ]
+        assert extracted_binary.get_functions() == binary.get_functions()
+        assert [dylib.name for dylib in extracted_binary.linked_dylibs] == [
+            dylib.name for dylib in binary.linked_dylibs
+        ]
+
+    def test_parallel_extraction(self, tmp_path: Path) -> None:
+        # Given a DSC containing a binary
+        _, dsc_path = self._write_dyld_shared_cache(tmp_path, "TestBinary5")
+        # When I extract it across several workers
+        [(_, parallel_output_path)] = extract_dyld_shared_cache(dsc_path, tmp_path / "parallel", parallel_workers=2)
+        # Then the image is identical to one extracted sequentially
+        [(_, output_path)] = extract_dyld_shared_cache(dsc_path, tmp_path / "sequential")
+        assert parallel_output_path and output_path
+        assert parallel_output_path.read_bytes() == output_path.read_bytes()
+
+    def test_failed_extraction(self, tmp_path: Path, dyld_shared_cache_path: Path) -> None:
+        # Given a DSC whose images' data segments aren't mapped at the addresses their load commands report
+        image_paths = list(_SYNTHETIC_DSC_IMAGES)[:2]
+        # When I extract some of its images
+        output_directory = tmp_path / "extracted"
+        extracted = list(extract_dyld_shared_cache(dyld_shared_cache_path, output_directory, image_paths=image_paths))
+        # Then the failures are reported, and nothing is left behind
+        assert extracted == [(image_path, None) for image_path in image_paths]
+        assert not list(output_directory.rglob("*.dylib"))
+
+
+class TestDyldSharedCacheSymbolMap:
+    @staticmethod
+    def _expected_rows(dyld_shared_cache_path: Path) -> list:
+        dyld_shared_cache = DyldSharedCacheParser(dyld_shared_cache_path)
+        rows = []
+        for path in dyld_shared_cache.embedded_binary_info:
+            analyzer = MachoAnalyzer.get_analyzer(dyld_shared_cache.get_embedded_binary(path))
+            rows += [
+                [str(VirtualMemoryPointer(address)), name, str(path)]
+                for name, address in analyzer.exported_symbol_names_to_pointers.items()
+            ]
+            MachoAnalyzer.clear_cache()
+        return rows
+
+    @pytest.mark.parametrize("parallel_workers", [None, 2])
+    def test_write_symbol_map_ordered(
+        self, tmp_path: Path, dyld_shared_cache_path: Path, parallel_workers: int
+    ) -> None:
+        # Given I write an ordered symbol map
+        output_path = tmp_path / "symbols.csv"
+        write_dyld_shared_cache_symbol_map(dyld_shared_cache_path, output_path, parallel_workers, ordered=True)
+        # Then every symbol is written in image order
+        with open(output_path, newline="") as output_csv:
+            assert list(csv.reader(output_csv)) == self._expected_rows(dyld_shared_cache_path)
+        # And the progress file is removed once the map is complete
+        assert not (tmp_path / "symbols.csv.progress").exists()
+
+    def test_write_symbol_map_unordered(self, tmp_path: Path, dyld_shared_cache_path: Path) -> None:
+        # Given I write a symbol map across several workers, without requesting an order
+        output_path = tmp_path / "symbols.csv"
+        write_dyld_shared_cache_symbol_map(dyld_shared_cache_path, output_path, parallel_workers=2)
+        # Then every image's rows are written together
+        with open(output_path, newline="") as output_csv:
+            rows = list(csv.reader(output_csv))
+        image_order = list(dict.fromkeys(row[2] for row in rows))
+        assert sorted(image_order) == sorted(str(path) for path in _SYNTHETIC_DSC_IMAGES)
+        # And the rows are the same as a sequential map, once grouped by image
+        expected_rows = self._expected_rows(dyld_shared_cache_path)
+        assert rows == sorted(expected_rows, key=lambda row: image_order.index(row[2]))
+
+    def test_resume_symbol_map(self, tmp_path: Path, dyld_shared_cache_path: Path) -> None:
+        # Given a symbol map which was interrupted after the first image, and partway through the second
+        output_path = tmp_path / "symbols.csv"
+        progress_path = tmp_path / "symbols.csv.progress"
+        first_image, first_image_symbols = next(iter_dyld_shared_cache_symbols(dyld_shared_cache_path))
+        assert first_image_symbols
+        with open(output_path, "w", newline="") as output_csv:
+            csv.writer(output_csv).writerows((address, name, first_image) for address, name in first_image_symbols)
+        progress_path.write_text(f"{output_path.stat().st_size}\t{first_image}\n")
+        with open(output_path, "a") as output_csv:
+            output_csv.write("0x1234,_partially_written")
+
+        # When I resume the map
+        write_dyld_shared_cache_symbol_map(dyld_shared_cache_path, output_path, ordered=True, resume=True)
+
+        # Then the partially written rows are discarded, and the map is the same as an uninterrupted one
+        uninterrupted_path = tmp_path / "uninterrupted.csv"
+        write_dyld_shared_cache_symbol_map(dyld_shared_cache_path, uninterrupted_path, ordered=True)
+        assert output_path.read_bytes() == uninterrupted_path.read_bytes()
+        assert not progress_path.exists()
+
+    def test_skip_images(self, dyld_shared_cache_path: Path) -> None:
+        # Given I skip some images
+        skipped = list(_SYNTHETIC_DSC_IMAGES)[:2]
+        # When I iterate the DSC's symbols
+        symbolicated = [path for path, _ in iter_dyld_shared_cache_symbols(dyld_shared_cache_path, skip_images=skipped)]
+        # Then only the remaining images are symbolicated
+        assert symbolicated == list(_SYNTHETIC_DSC_IMAGES)[2:]
+
+
+class TestDyldSharedCacheSymbolIndex:
+    _IMAGE = Path("/usr/lib/libTestBinary5.dylib")
+
+    @pytest.fixture
+    def dyld_shared_cache(self, tmp_path: Path) -> DyldSharedCacheParser:
+        # The synthetic DSC doesn't rebase its images, so use a single executable placed at its own base address,
+        # so that its symbols fall within its __TEXT
+        dsc_path = tmp_path / "dyld_shared_cache_arm64"
+        write_dyld_shared_cache(
+            dsc_path, [(self._IMAGE, binary_with_name("TestBinary5"))], first_image_address=0x100000000
+        )
+        return DyldSharedCacheParser(dsc_path)
+
+    @staticmethod
+    def _sorted_symbols(dyld_shared_cache: DyldSharedCacheParser) -> list:
+        image_symbols = exported_symbols_for_image(dyld_shared_cache, TestDyldSharedCacheSymbolIndex._IMAGE)
+        return sorted(dict((address, name) for address, name in reversed(image_symbols)).items())
+
+    def test_saved_next_to_cache(self, dyld_shared_cache: DyldSharedCacheParser) -> None:
+        # Given I request the index for a DSC which hasn't been indexed
+        index_path = dyld_shared_cache.path.with_name(f"{dyld_shared_cache.path.name}.strongarm-symbols")
+        assert not index_path.exists()
+        index = DyldSharedCacheSymbolIndex.for_dyld_shared_cache(dyld_shared_cache)
+        # Then the index is built and saved next to the DSC
+        assert index_path.exists()
+        assert len(index) == len(self._sorted_symbols(dyld_shared_cache))
+        assert index.image_paths == [self._IMAGE]
+
+        # And subsequent requests map the saved index
+        loaded_index = DyldSharedCacheSymbolIndex.for_dyld_shared_cache(dyld_shared_cache)
+        assert isinstance(loaded_index._symbol_addresses, memoryview)
+        assert len(loaded_index) == len(index)
+        addresses = [address for address, _ in self._sorted_symbols(dyld_shared_cache)]
+        assert loaded_index.symbolicate(addresses) == index.symbolicate(addresses)
+
+    def test_rebuilds_stale_index(self, dyld_shared_cache: DyldSharedCacheParser) -> None:
+        # Given a saved index that was built from a different DSC
+        index_path = dyld_shared_cache.path.with_name(f"{dyld_shared_cache.path.name}.strongarm-symbols")
+        DyldSharedCacheSymbolIndex.for_dyld_shared_cache(dyld_shared_cache)
+        stale_index = DyldSharedCacheSymbolIndex.load(index_path)
+        stale_index.dyld_shared_cache_size += 1
+        stale_index.save(index_path)
+        # Then the index is rebuilt
+        index = DyldSharedCacheSymbolIndex.for_dyld_shared_cache(dyld_shared_cache)
+        assert index.dyld_shared_cache_size == dyld_shared_cache.path.stat().st_size
+        assert DyldSharedCacheSymbolIndex.load(index_path).dyld_shared_cache_size == index.dyld_shared_cache_size
+
+        # And a truncated index is rebuilt too
+        index_path.write_bytes(index_path.read_bytes()[:100])
+        with pytest.raises(ValueError):
+            DyldSharedCacheSymbolIndex.load(index_path)
+        assert len(DyldSharedCacheSymbolIndex.for_dyld_shared_cache(dyld_shared_cache)) == len(index)
+
+    def test_symbolicate(self, dyld_shared_cache: DyldSharedCacheParser) -> None:
+        index = DyldSharedCacheSymbolIndex.for_dyld_shared_cache(dyld_shared_cache)
+        symbols = self._sorted_symbols(dyld_shared_cache)
+        text_start, text_end = dyld_shared_cache.embedded_binary_info[self._IMAGE]
+        (first_address, first_name), (second_address, second_name) = symbols[:2]
+
+        # Given addresses of symbols, addresses between symbols, and addresses outside every image
+        addresses = [first_address, second_address - 1, second_address, second_address + 4, text_end, text_start - 1]
+        # When I symbolicate them, repeating some of the addresses
+        results = index.symbolicate(addresses + addresses[:3])
+        # Then each address is attributed to the closest symbol before it
+        assert results == [
+            (self._IMAGE, first_name, 0),
+            (self._IMAGE, first_name, second_address - 1 - first_address),
+            (self._IMAGE, second_name, 0),
+            (self._IMAGE, second_name, 4),
+            None,
+            None,
+            (self._IMAGE, first_name, 0),
+            (self._IMAGE, first_name, second_address - 1 - first_address),
+            (self._IMAGE, second_name, 0),
+        ]
+
+    def test_symbolicate_matches_linear_search(self, dyld_shared_cache: DyldSharedCacheParser) -> None:
+        index = DyldSharedCacheSymbolIndex.for_dyld_shared_cache(dyld_shared_cache)
+        symbols = self._sorted_symbols(dyld_shared_cache)
+        text_start, text_end = dyld_shared_cache.embedded_binary_info[self._IMAGE]
+        # Given addresses spread across the image's __TEXT
+        addresses = list(range(text_start, text_end, 0x1F3))
+        # Then the index finds the same symbols as a linear search
+        for address, result in zip(addresses, index.symbolicate(addresses)):
+            symbol_address, name = [(a, n) for a, n in symbols if a <= address][-1]
+            assert result == (self._IMAGE, name, address - symbol_address)
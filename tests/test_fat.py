@@ -1,6 +1,23 @@
+import io
+import mmap
 import pathlib
+from ctypes import c_uint32, sizeof
+from typing import Any, Dict, List, Tuple, Type
 
-from strongarm.macho.macho_parse import MachoParser
+import pytest
+
+from strongarm.cli.utils import pick_macho_slice
+from strongarm.macho import (
+    CPU_TYPE,
+    BufferMachoSource,
+    MachArch,
+    MachoAnalyzer,
+    MachoBinary,
+    StaticFilePointer,
+    VirtualMemoryPointer,
+)
+from strongarm.macho.macho_parse import ArchitectureNotSupportedError, MachoParser, MachoSliceInfo
+from strongarm.macho.macho_source import MachoSourceBytes
 
 
 class TestFatMachO:
@@ -27,3 +44,184 @@ class TestFatMachO:
         for slice in self.fat_parser.slices:
             magic = slice.header.magic
             assert magic in MachoParser.SUPPORTED_MAG
+
+
+ARMV7_PATH = pathlib.Path(__file__).parent / "bin" / "Protocol32Bit"
+ARM64_PATH = pathlib.Path(__file__).parent / "bin" / "StrongarmTarget"
+
+
+@pytest.fixture
+def fat_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    """An armv7/arm64 FAT"""
+    armv7_binary = MachoParser(ARMV7_PATH).get_armv7_slice()
+    arm64_binary = MachoParser(ARM64_PATH).get_arm64_slice()
+    assert armv7_binary and arm64_binary
+    path = tmp_path / "fat"
+    MachoBinary.write_fat([armv7_binary, arm64_binary], path)
+    return path
+
+
+class TestLazyFatSlices:
+
+    @staticmethod
+    def _count_parsed_slices(monkeypatch: pytest.MonkeyPatch) -> List[MachoSliceInfo]:
+        parsed_slices: List[MachoSliceInfo] = []
+        parse_slice = MachoParser.parse_slice
+
+        def recording_parse_slice(parser: MachoParser, slice_info: MachoSliceInfo) -> MachoBinary:
+            parsed_slices.append(slice_info)
+            return parse_slice(parser, slice_info)
+
+        monkeypatch.setattr(MachoParser, "parse_slice", recording_parse_slice)
+        return parsed_slices
+
+    def test_slice_table_read_without_parsing(self, fat_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        parsed_slices = self._count_parsed_slices(monkeypatch)
+        # Given a FAT parser
+        parser = MachoParser(fat_path)
+        # Then each slice's architecture is available
+        assert [info.cputype for info in parser.slice_infos] == [MachArch.MH_CPU_TYPE_ARM, MachArch.MH_CPU_TYPE_ARM64]
+        assert len(parser.slices) == 2
+        # And no slice has been parsed
+        assert parsed_slices == []
+
+        # When I ask for the arm64 slice
+        arm64_binary = parser.get_arm64_slice()
+        # Then only the arm64 slice is parsed
+        assert arm64_binary and arm64_binary.cpu_type == CPU_TYPE.ARM64
+        assert [info.cputype for info in parsed_slices] == [MachArch.MH_CPU_TYPE_ARM64]
+        # And it's only parsed once
+        assert parser.slices[-1] is arm64_binary
+        assert pick_macho_slice(parser) is arm64_binary
+        assert len(parsed_slices) == 1
+
+        # And iterating the slices parses the rest
+        assert [binary.cpu_type for binary in parser.slices] == [CPU_TYPE.ARMV7, CPU_TYPE.ARM64]
+        assert len(parsed_slices) == 2
+
+    def test_requested_arch(self, fat_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        parsed_slices = self._count_parsed_slices(monkeypatch)
+        # Given a FAT parser restricted to armv7
+        parser = MachoParser(fat_path, arch=CPU_TYPE.ARMV7)
+        # Then only the armv7 slice is available
+        assert len(parser.slices) == 1
+        assert parser.slices[0].cpu_type == CPU_TYPE.ARMV7
+        assert parser.get_arm64_slice() is None
+        assert [info.cputype for info in parsed_slices] == [MachArch.MH_CPU_TYPE_ARM]
+
+        # And a thin binary without the requested architecture is rejected
+        with pytest.raises(ArchitectureNotSupportedError):
+            MachoParser(ARM64_PATH, arch=CPU_TYPE.ARMV7)
+
+
+class _CountingMachoSource(BufferMachoSource):
+    """Records each read from the source"""
+
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.reads: List[Tuple[int, int]] = []
+
+    def read(self, offset: StaticFilePointer, size: int) -> MachoSourceBytes:
+        self.reads.append((offset, size))
+        return super().read(offset, size)
+
+
+class TestMachoParserSources:
+    @pytest.mark.parametrize("source_type", [bytes, bytearray, memoryview, mmap.mmap, io.BytesIO, open])
+    def test_parse_from_source(self, fat_path: pathlib.Path, source_type: Type[Any]) -> None:
+        expected_parser = MachoParser(fat_path)
+        # Given a FAT provided as a buffer or file object, rather than a path
+        with open(fat_path, "rb") as fat_file:
+            source: Any
+            if source_type is mmap.mmap:
+                source = mmap.mmap(fat_file.fileno(), 0, access=mmap.ACCESS_READ)
+            elif source_type is open:
+                source = fat_file
+            else:
+                source = source_type(fat_file.read())
+            parser = MachoParser(source, name=pathlib.Path("App"))
+
+            # Then the slices are identical to those parsed from the path
+            assert parser.is_fat
+            assert parser.slice_infos == expected_parser.slice_infos
+            for binary, expected_binary in zip(parser.slices, expected_parser.slices):
+                assert binary.path == pathlib.Path("App")
+                assert binary.file_offset == expected_binary.file_offset
+                assert binary.cpu_type == expected_binary.cpu_type
+                assert binary.get_bytes(StaticFilePointer(0), binary.slice_filesize) == expected_binary.get_bytes(
+                    StaticFilePointer(0), expected_binary.slice_filesize
+                )
+                assert [dylib.name for dylib in binary.linked_dylibs] == [
+                    dylib.name for dylib in expected_binary.linked_dylibs
+                ]
+
+    def test_path_keyword(self, fat_path: pathlib.Path) -> None:
+        # Given a path passed by keyword, as MachoParser accepted before it took other sources
+        parser = MachoParser(path=fat_path)
+        # Then the file at the path is parsed
+        assert parser.path == fat_path
+        assert parser.slice_infos == MachoParser(fat_path).slice_infos
+        # And a parser must be given exactly one of a source or path
+        with pytest.raises(TypeError):
+            MachoParser()
+        with pytest.raises(TypeError):
+            MachoParser(fat_path, path=fat_path)
+
+    def test_file_object_name(self, fat_path: pathlib.Path) -> None:
+        # Given an open file, the parsed slices take its path
+        with open(fat_path, "rb") as fat_file:
+            binary = MachoParser(fat_file).slices[0]
+        assert binary.path == fat_path
+        assert binary.is_file_backed
+        # Unless the file is given a different name
+        with open(fat_path, "rb") as fat_file:
+            assert not MachoParser(fat_file, name=pathlib.Path("App")).slices[0].is_file_backed
+        # And an unnamed buffer gets a placeholder path
+        assert MachoParser(ARM64_PATH.read_bytes()).path == pathlib.Path("<memory>")
+
+    def test_reads(self, fat_path: pathlib.Path) -> None:
+        # Given a FAT source which records its reads
+        source = _CountingMachoSource(fat_path.read_bytes())
+        parser = MachoParser(source)
+        # Then the magic is only read once
+        assert source.reads.count((0, sizeof(c_uint32))) == 1
+
+        # And each slice is read once, when it's parsed
+        assert not [read for read in source.reads if read[1] > 0x1000]
+        for binary in [parser.get_arm64_slice(), parser.get_arm64_slice(), *parser.slices]:
+            assert binary
+        slice_reads = [read for read in source.reads if read[1] > 0x1000]
+        assert sorted(slice_reads) == sorted((info.offset, info.size) for info in parser.slice_infos)
+
+    def test_unsupported_source(self) -> None:
+        with pytest.raises(TypeError):
+            MachoParser(1234)  # type: ignore
+        # A source too small to contain a magic is rejected
+        with pytest.raises(ArchitectureNotSupportedError):
+            MachoParser(b"\xcf")
+
+    @staticmethod
+    def _analysis_results(binary: MachoBinary) -> Tuple[List[str], Dict[str, Any], Dict[VirtualMemoryPointer, Any]]:
+        analyzer = MachoAnalyzer.get_analyzer(binary)
+        class_names = [objc_class.name for objc_class in analyzer.objc_classes()]
+        string_xrefs = {string: analyzer.string_xrefs_to(string) for string in analyzer.strings()}
+        calls = {stub: analyzer.calls_to(stub) for stub in analyzer.imp_stubs_to_symbol_names}
+        return class_names, string_xrefs, calls
+
+    @pytest.mark.parametrize("source_type", [bytes, io.BytesIO])
+    def test_analyze_from_source(self, source_type: Type[Any]) -> None:
+        try:
+            expected_binary = MachoParser(ARM64_PATH).get_arm64_slice()
+            assert expected_binary
+            expected_results = self._analysis_results(expected_binary)
+            # Sanity-check that there's something to compare
+            assert all(expected_results)
+
+            # Given a binary parsed from memory, which can't be read back from its path
+            binary = MachoParser(source_type(ARM64_PATH.read_bytes())).get_arm64_slice()
+            assert binary
+            assert not binary.is_file_backed
+            # Then it's analyzed identically to the binary parsed from disk
+            assert self._analysis_results(binary) == expected_results
+        finally:
+            MachoAnalyzer.clear_cache()
@@ -1,4 +1,5 @@
 import pathlib
+from typing import Optional
 from unittest import mock
 
 import pytest
@@ -11,7 +12,7 @@ from strongarm.objc import (
     ObjcUnconditionalBranchInstruction,
     RegisterContentsType,
 )
-from strongarm.objc.objc_analyzer import _demangle_cpp_symbol, _is_mangled_cpp_symbol
+from strongarm.objc.cpp_demangler import CppDemangler, demangle_cpp_symbol, demangle_cpp_symbols, is_mangled_cpp_symbol
 
 
 class TestFunctionAnalyzer:
@@ -110,6 +111,68 @@ class TestFunctionAnalyzer:
         assert contents.type == RegisterContentsType.IMMEDIATE
         assert contents.value == 0x100115060
 
+    def test_get_register_contents_at_instructions(self) -> None:
+        # Given a few register queries within a function
+        first_instr = ObjcInstruction(self.function_analyzer.get_instruction_at_index(0))
+        another_instr = ObjcInstruction(self.function_analyzer.get_instruction_at_index(16))
+        queries = [("x4", first_instr), ("x1", another_instr), ("x0", another_instr)]
+
+        # When I ask for the contents of every register in one batch
+        batch_contents = self.function_analyzer.get_register_contents_at_instructions(queries)
+
+        # Then the results are returned in the order of the queries
+        assert batch_contents[0].type == RegisterContentsType.UNKNOWN
+        assert batch_contents[1].type == RegisterContentsType.IMMEDIATE
+        assert batch_contents[1].value == 0x1000090C0
+
+        # And they match the results of querying each register independently on a fresh analyzer
+        fresh_analyzer = ObjcFunctionAnalyzer(self.binary, self.instructions)
+        for (register, instruction), contents in zip(queries, batch_contents):
+            single_contents = fresh_analyzer.get_register_contents_at_instruction(register, instruction)
+            assert (single_contents.type, single_contents.value) == (contents.type, contents.value)
+
+        # And every query is served from the same table of register contents
+        assert self.function_analyzer.register_contents_table is self.function_analyzer.register_contents_table
+
+    def test_register_contents_across_calls(self) -> None:
+        # Given a function which passes constants to several calls
+        # 0x000000010004f840    ldr        x0, #0x100114a50
+        # 0x000000010004f848    ldr        x19, #0x1001112e8
+        # 0x000000010004f84c    mov        x1, x19
+        # 0x000000010004f850    bl         0x1000a7db4
+        # 0x000000010004f858    ldr        x1, #0x100111378
+        # 0x000000010004f85c    bl         0x1000a7db4
+        # 0x000000010004f868    ldr        x1, #0x1001123c0
+        # 0x000000010004f86c    orr        w2, wzr, #3
+        # 0x000000010004f870    bl         0x1000a7db4
+        binary = MachoParser(TestFunctionAnalyzer.TEST_BINARY_PATH).get_arm64_slice()
+        assert binary
+        function_analyzer = ObjcFunctionAnalyzer.get_function_analyzer(binary, VirtualMemoryPointer(0x10004F830))
+        table = function_analyzer.register_contents_table
+
+        def contents(register: str, address: int) -> Optional[int]:
+            register_contents = table.get_register_contents(register, address)
+            if register_contents.type == RegisterContentsType.UNKNOWN:
+                return None
+            return register_contents.value
+
+        # When I ask for the arguments of the first call
+        # Then the values loaded before the call are reported, including those copied from another register
+        assert contents("x0", 0x10004F850) == 0x100114A50
+        assert contents("x1", 0x10004F850) == 0x1001112E8
+
+        # And after the call, the caller-saved registers are unknown while the callee-saved registers are preserved
+        assert contents("x0", 0x10004F85C) is None
+        assert contents("x1", 0x10004F85C) == 0x100111378
+        assert contents("x19", 0x10004F85C) == 0x1001112E8
+
+        # And an immediate moved via ORR with the zero register is tracked
+        assert contents("x2", 0x10004F870) == 3
+        assert contents("w2", 0x10004F870) == 3
+
+        # And addresses outside the function have unknown contents
+        assert contents("x0", 0x10004F82C) is None
+
     def test_get_selref(self) -> None:
         objc_msgSendInstr = ObjcInstruction.parse_instruction(self.function_analyzer, self.instructions[16])
         assert isinstance(objc_msgSendInstr, ObjcUnconditionalBranchInstruction)
@@ -235,16 +298,16 @@ class TestFunctionAnalyzer:
 
     def test_identify_mangled_cpp_symbol(self) -> None:
         # Check identification of C++ mangled symbols
-        assert _is_mangled_cpp_symbol(
+        assert is_mangled_cpp_symbol(
             "__ZNK3MapI10StringName3RefI8GDScriptE10ComparatorIS0_" "E16DefaultAllocatorE3hasERKS0_"
         )
-        assert _is_mangled_cpp_symbol("___Z5test1v_block_invoke")
-        assert not _is_mangled_cpp_symbol("_strlen")
+        assert is_mangled_cpp_symbol("___Z5test1v_block_invoke")
+        assert not is_mangled_cpp_symbol("_strlen")
 
     def test_demangle_cpp_symbol(self) -> None:
         # Check expected demangling of mangled C++ symbols
         assert (
-            _demangle_cpp_symbol(
+            demangle_cpp_symbol(
                 "__ZNK3MapI10StringName3RefI8GDScriptE10ComparatorIS0_" "E16DefaultAllocatorE3hasERKS0_"
             )
             == "Map<StringName, Ref<GDScript>, Comparator<StringName>, "
@@ -277,3 +340,30 @@ class TestFunctionAnalyzer:
         ):
             # Then the code location is reported as the original symbol name
             assert self.function_analyzer.get_symbol_name() == "__ZappBrannigan"
+
+    def test_demangle_cpp_symbols(self) -> None:
+        # Given a list of symbols, including a repeated symbol, a block, and a non-C++ symbol
+        symbols = ["__Z5test1v", "___Z5test1v_block_invoke2", "_strlen", "__Z5test1v", "__ZappBrannigan"]
+        # When I demangle them in bulk
+        demangled_symbols = demangle_cpp_symbols(symbols)
+        # Then each symbol is demangled in the order it was provided
+        assert demangled_symbols == ["test1()", "block 2 in test1()", "_strlen", "test1()", "__ZappBrannigan"]
+
+    def test_demangler_cache_is_bounded(self) -> None:
+        # Given a demangler with a small cache
+        demangler = CppDemangler(cache_size=2)
+        try:
+            # When I demangle more distinct symbols than fit in the cache
+            assert demangler.demangle_many(["__Z5test1v", "__Z5test2v", "__Z5test3v"]) == [
+                "test1()",
+                "test2()",
+                "test3()",
+            ]
+            # Then only the most recently used symbols are retained
+            assert list(demangler._cache.keys()) == ["__Z5test2v", "__Z5test3v"]
+            # And every symbol is served by the same c++filt process
+            process = demangler._process
+            assert demangler.demangle("__Z5test1v") == "test1()"
+            assert demangler._process is process
+        finally:
+            demangler.close()
@@ -376,6 +376,36 @@ class TestMachoBinary:
         assert binary
         assert binary.dylib_id() == expected_dylib_id
 
+    @pytest.mark.parametrize(
+        "binary_name",
+        # A binary with dyld info, and a binary with chained fixups
+        ["MultipleConstSections", "iOS15_chained_fixup_pointers"],
+    )
+    def test_quick_scan(self, binary_name: str) -> None:
+        path = pathlib.Path(__file__).parent / "bin" / binary_name
+        full_binary = MachoParser(path).slices[0]
+        # Given a binary constructed in quick-scan mode
+        binary = MachoParser(path, quick_scan=True).slices[0]
+        # Then the symbol table and fixups haven't been parsed
+        assert binary._symtab_contents is None
+        assert binary._dyld_bound_symbols is None
+        assert binary._dyld_rebased_pointers is None
+
+        # And the header-level information is available
+        assert binary.header_flags == full_binary.header_flags
+        assert [dylib.name for dylib in binary.linked_dylibs] == [dylib.name for dylib in full_binary.linked_dylibs]
+        assert binary.get_minimum_deployment_target() == full_binary.get_minimum_deployment_target()
+        assert binary.is_encrypted() == full_binary.is_encrypted()
+        assert vars(binary.code_signature_cmd) == vars(full_binary.code_signature_cmd)
+        assert binary._symtab_contents is None
+
+        # And the rest is parsed on first access, matching a full parse
+        assert {addr: sym.name for addr, sym in binary.dyld_bound_symbols.items()} == {
+            addr: sym.name for addr, sym in full_binary.dyld_bound_symbols.items()
+        }
+        assert binary.dyld_rebased_pointers == full_binary.dyld_rebased_pointers
+        assert len(binary.symtab_contents) == len(full_binary.symtab_contents)
+
     def test_read_string_xcode_14(self) -> None:
         # Given a binary with a CFString, compiled with Xcode 14
         with binary_containing_code(
@@ -1,12 +1,19 @@
 import pathlib
+from array import array
 from contextlib import contextmanager
 from textwrap import dedent
 from typing import Generator, List, Tuple
 
 import pytest
 
-from strongarm.macho import MachoBinary, ObjcCategory
-from strongarm.macho.macho_analyzer import CallerXRef, MachoAnalyzer, ObjcMsgSendXref, VirtualMemoryPointer
+from strongarm.macho import CallGraph, DataXRef, MachoBinary, ObjcCategory
+from strongarm.macho.macho_analyzer import (
+    AnalyzerStage,
+    CallerXRef,
+    MachoAnalyzer,
+    ObjcMsgSendXref,
+    VirtualMemoryPointer,
+)
 from strongarm.macho.macho_parse import MachoParser
 from strongarm.objc import ObjcFunctionAnalyzer
 from tests.utils import binary_containing_code, binary_with_name
@@ -95,6 +102,60 @@ class TestMachoAnalyzer:
         end_address = self.analyzer.get_function_end_address(start_addr)
         assert end_address == correct_end_addr
 
+    def test_function_containing(self) -> None:
+        # Given the boundaries of a function
+        start_addr = VirtualMemoryPointer(0x100006420)
+        end_addr = VirtualMemoryPointer(0x100006534)
+
+        # Then addresses within the function are mapped to its entry point
+        assert self.analyzer.function_containing(start_addr) == start_addr
+        assert self.analyzer.function_containing(VirtualMemoryPointer(0x100006500)) == start_addr
+        # And the end address belongs to the following function
+        assert self.analyzer.function_containing(end_addr) == end_addr
+        # And addresses outside any function aren't mapped
+        assert self.analyzer.function_containing(VirtualMemoryPointer(0x100006000)) is None
+        assert self.analyzer.function_containing(VirtualMemoryPointer(0x100006730)) is None
+
+        # And the batch API returns the same results, in the order the addresses were provided
+        addresses = [VirtualMemoryPointer(x) for x in [0x100006730, 0x100006500, 0x100006000, 0x100006534]]
+        assert self.analyzer.function_containing_many(addresses) == [None, start_addr, None, end_addr]
+
+        # And the function boundaries aren't rebuilt on each call
+        assert self.analyzer.get_function_boundaries() is self.analyzer.get_function_boundaries()
+
+    def test_function_containing_many_large_table(self) -> None:
+        class CountingArray(array):
+            """Records each index read from the array"""
+
+            reads = 0
+
+            def __getitem__(self, index):  # type: ignore
+                CountingArray.reads += 1
+                return super().__getitem__(index)
+
+        # Given a binary with a very large number of functions
+        self.analyzer.get_function_boundaries()
+        original_boundaries = self.analyzer._function_entry_points, self.analyzer._function_end_addresses
+        entry_points = range(0x100000000, 0x100000000 + 300_000 * 0x10, 0x10)
+        self.analyzer._function_entry_points = CountingArray("Q", entry_points)
+        self.analyzer._function_end_addresses = CountingArray("Q", (entry_point + 0x8 for entry_point in entry_points))
+        try:
+            # When I look up a small batch of addresses
+            addresses = [VirtualMemoryPointer(x) for x in [0x100123454, 0x100000004, 0x10012345C, 0x100000000 - 1]]
+            containing_functions = self.analyzer.function_containing_many(addresses)
+            # Then only a logarithmic number of the function boundaries are read
+            assert CountingArray.reads < 4 * 2 * len(entry_points).bit_length()
+            # And the results match the scalar lookup
+            assert containing_functions == [
+                VirtualMemoryPointer(0x100123450),
+                VirtualMemoryPointer(0x100000000),
+                None,
+                None,
+            ]
+            assert containing_functions == [self.analyzer.function_containing(address) for address in addresses]
+        finally:
+            self.analyzer._function_entry_points, self.analyzer._function_end_addresses = original_boundaries
+
     def test_find_imported_symbols(self) -> None:
         correct_imported_symbols = [
             "_NSClassFromString",
@@ -337,6 +398,22 @@ class TestMachoAnalyzer:
         # Then no named symbol is returned
         assert symbol is None
 
+    def test_find_symbol_preceding_address(self) -> None:
+        # Given I provide an address within the _objc_msgSend stub
+        # If I ask for the closest preceding symbol
+        symbol = self.analyzer.callable_symbol_preceding_address(VirtualMemoryPointer(0x1000067AC))
+        # Then the stub's symbol is returned
+        assert symbol
+        assert symbol.is_imported is True
+        assert symbol.symbol_name == "_objc_msgSend"
+        # And it's the same symbol as the one found at the start of the stub
+        assert symbol == self.analyzer.callable_symbol_for_address(VirtualMemoryPointer(0x1000067A8))
+
+        # Given I provide an address before every symbol in the binary
+        symbol = self.analyzer.callable_symbol_preceding_address(VirtualMemoryPointer(0x1000))
+        # Then no symbol is returned
+        assert symbol is None
+
     def test_strings(self) -> None:
         source_code = """
         @interface Class1 : NSObject
@@ -419,6 +496,254 @@ class TestMachoAnalyzer:
         # Then the class names are successfully parsed
         assert class_names == list(expected_classref_to_class_names.values())
 
+    def test_disassembly_cache(self) -> None:
+        # Given a function within the binary
+        entry_point = VirtualMemoryPointer(0x100006420)
+        cache = self.analyzer.disassembly_cache
+        cache.clear()
+
+        # When I disassemble it twice
+        first_instructions = self.analyzer.get_function_instructions(entry_point)
+        hits = cache.hits
+        second_instructions = self.analyzer.get_function_instructions(entry_point)
+
+        # Then the second request is served from the cache, and shares the decoded instructions
+        assert cache.hits == hits + 1
+        assert second_instructions is not first_instructions
+        assert all(a is b for a, b in zip(first_instructions, second_instructions))
+        assert cache.cached_instruction_count == len(first_instructions)
+
+        # And when the cache can't hold another function
+        cache.max_instructions = len(first_instructions)
+        other_instructions = self.analyzer.get_function_instructions(VirtualMemoryPointer(0x100006228))
+        # Then the least recently used function is evicted
+        assert cache.cached_instruction_count == len(other_instructions)
+        misses = cache.misses
+        self.analyzer.get_function_instructions(entry_point)
+        assert cache.misses == misses + 1
+        cache.max_instructions = cache.DEFAULT_MAX_INSTRUCTIONS
+
+    def test_function_analyzer_cache(self) -> None:
+        analyzer = MachoAnalyzer(binary_with_name("StrongarmTarget"))
+        # Given an ObjC method implemented in the binary
+        method_info = analyzer.get_objc_methods()[0]
+        assert method_info.imp_addr is not None
+
+        # When I request an analyzer for its entry point twice
+        function_analyzer = analyzer.get_function_analyzer(method_info.imp_addr)
+        # Then the same analyzer is returned each time
+        assert analyzer.get_function_analyzer(method_info.imp_addr) is function_analyzer
+        assert ObjcFunctionAnalyzer.get_function_analyzer(analyzer.binary, method_info.imp_addr) is function_analyzer
+        # And requesting it by method doesn't change the analyzer which was already handed out
+        symbol_name = function_analyzer.get_symbol_name()
+        method_analyzer = ObjcFunctionAnalyzer.get_function_analyzer_for_method(analyzer.binary, method_info)
+        assert method_analyzer is not function_analyzer
+        assert function_analyzer.method_info is None
+        assert function_analyzer.get_symbol_name() == symbol_name
+        # But returns an analyzer describing the method, which shares the instructions and replaces it in the cache
+        assert method_analyzer.method_info is method_info
+        assert method_analyzer.instructions == function_analyzer.instructions
+        assert ObjcFunctionAnalyzer.get_function_analyzer_for_method(analyzer.binary, method_info) is method_analyzer
+        assert analyzer.get_function_analyzer(method_info.imp_addr) is method_analyzer
+        function_analyzer = method_analyzer
+
+        # And when the cache can't hold another function
+        other_entry_point = next(
+            method.imp_addr
+            for method in analyzer.get_objc_methods()
+            if method.imp_addr and method.imp_addr != method_info.imp_addr
+        )
+        cache = analyzer.disassembly_cache
+        other_end_address = analyzer.get_function_end_address(other_entry_point)
+        assert other_end_address
+        # Each arm64 instruction is 4 bytes
+        other_instruction_count = (other_end_address - other_entry_point) // 4
+        cache.max_instructions = len(function_analyzer.instructions) + other_instruction_count - 1
+        other_analyzer = analyzer.get_function_analyzer(other_entry_point)
+        # Then the least recently used analyzer is evicted along with its instructions
+        assert analyzer.get_function_analyzer(other_entry_point) is other_analyzer
+        assert cache.cached_instruction_count == len(other_analyzer.instructions)
+        assert analyzer.get_function_analyzer(method_info.imp_addr) is not function_analyzer
+
+        # And the cached analyzers never hold more instructions than the disassembly cache
+        assert sum(len(x.instructions) for x in analyzer._function_analyzers.values()) <= cache.cached_instruction_count
+        cache.clear()
+        assert not analyzer._function_analyzers
+
+    def test_call_graph_queries(self) -> None:
+        # Given a call graph containing a cycle (A -> B -> C -> A), and a longer path from A to D
+        a, b, c, d, e = [VirtualMemoryPointer(x) for x in range(0x1000, 0x1005)]
+        call_graph = CallGraph([(a, b), (b, c), (c, a), (b, d), (a, e), (e, d), (a, b)], entry_points=[a, b, c, d, e])
+        # Then duplicate edges are collapsed
+        assert len(call_graph) == 5
+        assert call_graph.edge_count == 6
+        assert call_graph.callees(a) == [b, e]
+        assert call_graph.callers(d) == [b, e]
+
+        # And reachability follows chains of calls
+        assert call_graph.is_reachable(c, d)
+        assert not call_graph.is_reachable(d, a)
+        assert call_graph.is_reachable(d, d)
+        assert call_graph.reachable_from(e) == {e, d}
+        assert not call_graph.is_reachable(a, VirtualMemoryPointer(0x2000))
+
+        # And the shortest path is found
+        assert call_graph.shortest_path(c, d) == [c, a, b, d]
+        assert call_graph.shortest_path(d, a) is None
+
+        # And callers are found within a number of hops
+        assert call_graph.callers_within(d, 1) == {b: 1, e: 1}
+        assert call_graph.callers_within(d, 2) == {b: 1, e: 1, a: 2}
+        assert call_graph.callers_within(d, 10) == {b: 1, e: 1, a: 2, c: 3}
+
+    def test_call_graph(self) -> None:
+        analyzer = MachoAnalyzer(binary_with_name("StrongarmTarget"))
+        call_graph = analyzer.call_graph
+        # Given -[DTLabel initWithFrame:], which messages self with -configureLabel
+        init_with_frame = analyzer.method_info_for_signature("DTLabel", "initWithFrame:")
+        configure_label = analyzer.method_info_for_signature("DTLabel", "configureLabel")
+        assert init_with_frame and init_with_frame.imp_addr
+        assert configure_label and configure_label.imp_addr
+
+        # Then the call graph contains an edge to the local implementation of the selector
+        assert configure_label.imp_addr in call_graph.callees(init_with_frame.imp_addr)
+        assert call_graph.callers(configure_label.imp_addr) == [init_with_frame.imp_addr]
+        # And edges to the imported functions each function calls
+        nslog = analyzer.callable_symbol_for_symbol_name("_NSLog")
+        assert nslog
+        nslog_callers = {VirtualMemoryPointer(x) for x in [0x100006308, 0x100006534, 0x100006590, 0x1000065EC]}
+        assert set(call_graph.callers(nslog.address)) == nslog_callers
+        assert call_graph.callers_within(nslog.address, 1) == {caller: 1 for caller in nslog_callers}
+
+        # And the call tree from a function can be searched for calls to a destination
+        log_label = analyzer.method_info_for_signature("DTLabel", "logLabel")
+        assert log_label and log_label.imp_addr
+        call_sites = analyzer.search_call_tree(log_label.imp_addr, nslog.address)
+        assert call_sites == [
+            xref for xref in analyzer.calls_to(nslog.address) if xref.caller_func_start_address == log_label.imp_addr
+        ]
+        assert len(call_sites) > 0
+        assert analyzer.search_call_tree(configure_label.imp_addr, nslog.address) == []
+
+    def test_data_xrefs(self) -> None:
+        analyzer = MachoAnalyzer(binary_with_name("StrongarmTarget"))
+        # Given a selref and a classref which are each loaded by one method
+        selref = analyzer.selref_for_selector_name("configureLabel")
+        classref = analyzer.classref_for_class_name("_OBJC_CLASS_$_UIFont")
+        assert selref and classref
+
+        # When I look up the code which materializes each address
+        selref_xrefs = analyzer.data_xrefs_to(selref)
+        classref_xrefs = analyzer.data_xrefs_to(classref)
+        # And only the data xrefs are computed, not the call and string xrefs
+        assert AnalyzerStage.DATA_XREFS in analyzer.stage_timings
+        assert AnalyzerStage.XREFS not in analyzer.stage_timings
+
+        # Then the instruction which completes each load is found, along with the section it points into
+        assert selref_xrefs == [
+            DataXRef(
+                selref, "__DATA", "__objc_selrefs", VirtualMemoryPointer(0x100006264), VirtualMemoryPointer(0x100006228)
+            )
+        ]
+        assert classref_xrefs == [
+            DataXRef(
+                classref,
+                "__DATA",
+                "__objc_classrefs",
+                VirtualMemoryPointer(0x1000062AC),
+                VirtualMemoryPointer(0x100006284),
+            )
+        ]
+        # And the code which loads a CFString is found, just like the string xrefs
+        cfstring = VirtualMemoryPointer(0x1000080B8)
+        cfstring_xrefs = analyzer.data_xrefs_to(cfstring)
+        assert [x.section_name for x in cfstring_xrefs] == ["__cfstring"]
+        assert [(x.accessor_func_start_address, x.accessor_addr) for x in cfstring_xrefs] == (
+            analyzer.string_xrefs_to("My label")
+        )
+
+        # And the batch API returns the same results
+        unreferenced_address = VirtualMemoryPointer(0x1234)
+        assert analyzer.data_xrefs_to_many([selref, classref, unreferenced_address]) == {
+            selref: selref_xrefs,
+            classref: classref_xrefs,
+            unreferenced_address: [],
+        }
+
+    def test_indexed_objc_lookups(self) -> None:
+        analyzer = MachoAnalyzer(binary_with_name("StrongarmTarget"))
+        # Given every ObjC method implemented in the binary
+        methods = analyzer.get_objc_methods()
+        assert len(methods) > 0
+        for method in methods:
+            assert method.imp_addr is not None
+            # Then the method can be looked up by its entry point
+            method_info = analyzer.method_info_for_entry_point(method.imp_addr)
+            assert method_info is not None
+            assert method_info.imp_addr == method.imp_addr
+            # And by its signature
+            method_info = analyzer.method_info_for_signature(method.objc_class.name, method.objc_sel.name)
+            assert method_info is not None
+            assert (method_info.objc_class.name, method_info.objc_sel.name) == (
+                method.objc_class.name,
+                method.objc_sel.name,
+            )
+        assert analyzer.method_info_for_entry_point(VirtualMemoryPointer(0)) is None
+        assert analyzer.method_info_for_signature("NotARealClass", "notARealSelector") is None
+
+        # And the classref of each class matches the one found by scanning __objc_classrefs
+        classrefs = analyzer.binary.read_pointer_section("__objc_classrefs")
+        for objc_class in analyzer.objc_classes():
+            expected_classref = next(
+                (k for k, v in classrefs.items() if v == objc_class.raw_struct.binary_offset), None
+            )
+            assert analyzer.classref_for_class_name(objc_class.name) == expected_classref
+        assert analyzer.classref_for_class_name("_OBJC_CLASS_$_UIFont") == VirtualMemoryPointer(0x1000090F0)
+        assert analyzer.classref_for_class_name("NotARealClass") is None
+
+    def test_analysis_stages_run_lazily(self) -> None:
+        # Given a freshly parsed binary
+        analyzer = MachoAnalyzer(binary_with_name("StrongarmTarget"))
+        # When I only ask for the exported symbols
+        assert analyzer.exported_symbol_names_to_pointers == {"__mh_execute_header": 4294967296}
+        # Then only the string table was parsed
+        assert set(analyzer.stage_timings.keys()) == {AnalyzerStage.STRING_TABLE}
+
+        # And when I ask for a function's boundaries
+        assert analyzer.get_function_end_address(VirtualMemoryPointer(0x100006420)) == 0x100006534
+        # Then only the stages needed to compute function boundaries have been run
+        assert set(analyzer.stage_timings.keys()) == {
+            AnalyzerStage.STRING_TABLE,
+            AnalyzerStage.DATABASE,
+            AnalyzerStage.FUNCTION_BOUNDARIES,
+        }
+
+        # And when I ask for the calls to a function
+        analyzer.calls_to(VirtualMemoryPointer(0x100006420))
+        # Then the data xrefs aren't computed
+        assert AnalyzerStage.XREFS in analyzer.stage_timings
+        assert AnalyzerStage.DATA_XREFS not in analyzer.stage_timings
+
+    def test_warm_analysis_stages(self) -> None:
+        # Given a freshly parsed binary
+        analyzer = MachoAnalyzer(binary_with_name("StrongarmTarget"))
+        # When I eagerly request a stage
+        analyzer.warm([AnalyzerStage.CALLABLE_SYMBOLS])
+        # Then the stage and all its dependencies have been run, and each is timed
+        assert set(analyzer.stage_timings.keys()) == {
+            AnalyzerStage.DATABASE,
+            AnalyzerStage.DISASSEMBLER,
+            AnalyzerStage.STRING_TABLE,
+            AnalyzerStage.IMP_STUBS,
+            AnalyzerStage.CALLABLE_SYMBOLS,
+        }
+        assert all(timing >= 0 for timing in analyzer.stage_timings.values())
+
+        # And when I warm every stage
+        analyzer.warm()
+        # Then every stage has been run
+        assert set(analyzer.stage_timings.keys()) == set(AnalyzerStage)
+
 
 class TestMachoAnalyzerDynStaticChecks:
     FAT_PATH = pathlib.Path(__file__).parent / "bin" / "DynStaticChecks"
@@ -0,0 +1,108 @@
+import mmap
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from strongarm.macho import (
+    CPU_TYPE,
+    MachoAnalyzer,
+    MachoBinary,
+    MachoParser,
+    StaticFilePointer,
+    iter_archive_macho_binaries,
+)
+
+
+class TestMachoArchive:
+    THIN_PATH = Path(__file__).parent / "bin" / "StrongarmTarget"
+    ARMV7_PATH = Path(__file__).parent / "bin" / "Protocol32Bit"
+
+    @pytest.fixture
+    def ipa_path(self, tmp_path: Path) -> Path:
+        armv7_binary = MachoParser(self.ARMV7_PATH).get_armv7_slice()
+        arm64_binary = MachoParser(self.THIN_PATH).get_arm64_slice()
+        assert armv7_binary and arm64_binary
+        fat_path = tmp_path / "fat"
+        MachoBinary.write_fat([armv7_binary, arm64_binary], fat_path)
+
+        ipa_path = tmp_path / "App.ipa"
+        with zipfile.ZipFile(ipa_path, "w") as ipa:
+            ipa.writestr("Payload/App.app/", b"")
+            ipa.writestr("Payload/App.app/Info.plist", b"<plist></plist>", compress_type=zipfile.ZIP_DEFLATED)
+            ipa.write(self.THIN_PATH, "Payload/App.app/App", compress_type=zipfile.ZIP_STORED)
+            ipa.write(self.THIN_PATH, "Payload/App.app/Frameworks/Deflated", compress_type=zipfile.ZIP_DEFLATED)
+            ipa.write(fat_path, "Payload/App.app/Frameworks/Fat", compress_type=zipfile.ZIP_DEFLATED)
+            # A member that has a Mach-O magic, but isn't a valid Mach-O
+            ipa.writestr(
+                "Payload/App.app/Truncated", self.THIN_PATH.read_bytes()[:64], compress_type=zipfile.ZIP_STORED
+            )
+        return ipa_path
+
+    def test_iter_archive_macho_binaries(self, ipa_path: Path) -> None:
+        # Given an IPA containing stored, deflated and FAT Mach-Os
+        binaries = list(iter_archive_macho_binaries(ipa_path))
+        # Then each Mach-O slice is found by its magic, and the invalid Mach-O is skipped
+        assert [(member_path, binary.cpu_type) for member_path, binary in binaries] == [
+            ("Payload/App.app/App", CPU_TYPE.ARM64),
+            ("Payload/App.app/Frameworks/Deflated", CPU_TYPE.ARM64),
+            ("Payload/App.app/Frameworks/Fat", CPU_TYPE.ARMV7),
+            ("Payload/App.app/Frameworks/Fat", CPU_TYPE.ARM64),
+        ]
+
+        # And each slice matches the binary parsed from disk
+        expected_binary = MachoParser(self.THIN_PATH).slices[0]
+        for _, binary in binaries[:2] + binaries[3:]:
+            assert binary.slice_filesize == expected_binary.slice_filesize
+            assert binary.get_bytes(StaticFilePointer(0), binary.slice_filesize) == expected_binary.get_bytes(
+                StaticFilePointer(0), expected_binary.slice_filesize
+            )
+            assert [dylib.name for dylib in binary.linked_dylibs] == [
+                dylib.name for dylib in expected_binary.linked_dylibs
+            ]
+            assert len(binary.symtab_contents) == len(expected_binary.symtab_contents)
+
+    def test_stored_member_is_not_copied(self, ipa_path: Path) -> None:
+        # Given a Mach-O stored in an IPA
+        member_path, binary = next(iter_archive_macho_binaries(ipa_path))
+        assert member_path == "Payload/App.app/App"
+        # Then the binary's data is a view of the mapped archive
+        assert isinstance(binary._cached_binary, memoryview)
+        assert isinstance(binary._cached_binary.obj, mmap.mmap)
+        # And its path and file offset locate the slice within the archive
+        assert binary.path == ipa_path
+        assert binary.is_file_backed
+        with open(ipa_path, "rb") as ipa_file:
+            ipa_file.seek(binary.file_offset)
+            assert ipa_file.read(binary.slice_filesize) == self.THIN_PATH.read_bytes()
+
+    def test_requested_arch(self, ipa_path: Path) -> None:
+        # When I ask for the armv7 slices in an IPA
+        binaries = list(iter_archive_macho_binaries(ipa_path, arch=CPU_TYPE.ARMV7, quick_scan=True))
+        # Then only the armv7 slice of the FAT is parsed
+        assert [(member_path, binary.cpu_type) for member_path, binary in binaries] == [
+            ("Payload/App.app/Frameworks/Fat", CPU_TYPE.ARMV7)
+        ]
+        assert binaries[0][1].quick_scan
+
+    def test_analyze_deflated_member(self, ipa_path: Path) -> None:
+        try:
+            expected_analyzer = MachoAnalyzer.get_analyzer(MachoParser(self.THIN_PATH).slices[0])
+            # Given a Mach-O deflated in an IPA, which isn't on disk at its path
+            member_path, binary = list(iter_archive_macho_binaries(ipa_path))[1]
+            assert member_path == "Payload/App.app/Frameworks/Deflated"
+            assert binary.path == ipa_path / member_path
+            assert not binary.is_file_backed
+
+            # Then it's analyzed identically to the binary parsed from disk
+            analyzer = MachoAnalyzer.get_analyzer(binary)
+            assert [objc_class.name for objc_class in analyzer.objc_classes()] == [
+                objc_class.name for objc_class in expected_analyzer.objc_classes()
+            ]
+            assert expected_analyzer.imp_stubs_to_symbol_names
+            for stub in expected_analyzer.imp_stubs_to_symbol_names:
+                assert analyzer.calls_to(stub) == expected_analyzer.calls_to(stub)
+            for string in expected_analyzer.strings():
+                assert analyzer.string_xrefs_to(string) == expected_analyzer.string_xrefs_to(string)
+        finally:
+            MachoAnalyzer.clear_cache()
@@ -1,8 +1,11 @@
 import pathlib
+import sys
 from distutils.version import LooseVersion
 from typing import List
 from unittest.mock import MagicMock
 
+import pytest
+
 from strongarm.macho import MachoParser, ObjcCategory, ObjcMethodStruct, ObjcRuntimeDataParser, ObjcSelector
 from strongarm.macho.macho_definitions import (
     MachoBuildTool,
@@ -111,6 +114,171 @@ class TestObjcRuntimeDataParser:
         assert selector.name == "allowsAnyHTTPSCertificateForHost:"
         assert selector.implementation == 0x100005028
 
+    def test_categories_for_base_class(self) -> None:
+        parser = MachoParser(TestObjcRuntimeDataParser.CATEGORY_PATH)
+        binary = parser.slices[0]
+        objc_parser = ObjcRuntimeDataParser(binary)
+
+        # Given I look up the categories extending a base class
+        categories = objc_parser.categories_for_base_class("_OBJC_CLASS_$_NSURLRequest")
+        # Then the category extending that class is found
+        assert [c.category_name for c in categories] == ["DataController"]
+        # And the indexed list of categories matches those found in the class list
+        assert objc_parser.categories == [x for x in objc_parser.classes if isinstance(x, ObjcCategory)]
+        assert objc_parser.categories_for_base_class("_OBJC_CLASS_$_NotARealClass") == []
+
+    def test_indexed_selector_lookups(self) -> None:
+        parser = MachoParser(TestObjcRuntimeDataParser.CATEGORY_PATH)
+        binary = parser.slices[0]
+        objc_parser = ObjcRuntimeDataParser(binary)
+
+        # Given every selector name referenced or implemented by the binary
+        selector_names = {sel.name for sel in objc_parser.selrefs_to_selectors().values()}
+        selector_names |= {sel.name for objc_class in objc_parser.classes for sel in objc_class.selectors}
+        assert len(selector_names) > 0
+
+        for selector_name in selector_names:
+            # Then the indexed selref lookup returns the first selref in the section referring to the selector
+            expected_selref = next(
+                (k for k, v in objc_parser.selrefs_to_selectors().items() if v.name == selector_name), None
+            )
+            assert objc_parser.selref_for_selector_name(selector_name) == expected_selref
+            # And the indexed IMP lookup returns every implementation, in class-list order
+            expected_imps = [
+                sel.implementation
+                for objc_class in objc_parser.classes
+                for sel in objc_class.selectors
+                if sel.name == selector_name and sel.implementation
+            ]
+            assert objc_parser.get_method_imp_addresses(selector_name) == expected_imps
+
+        assert objc_parser.selref_for_selector_name("notARealSelector:") is None
+        assert objc_parser.get_method_imp_addresses("notARealSelector:") == []
+
+    def test_lazy_parse_matches_eager_parse(self) -> None:
+        for binary_path in [
+            TestObjcRuntimeDataParser.CATEGORY_PATH,
+            TestObjcRuntimeDataParser.IOS14_RELATIVE_METHOD_LIST_BIN_PATH,
+            TestObjcRuntimeDataParser.IOS15_CHAINED_FIXUP_POINTERS_BIN_PATH,
+        ]:
+            binary = MachoParser(binary_path).slices[0]
+            eager_parser = ObjcRuntimeDataParser(binary)
+            lazy_parser = ObjcRuntimeDataParser(binary, lazy=True)
+
+            # Given a lazy parser which hasn't parsed any classes yet
+            assert lazy_parser._classrefs_to_objc_classes == {}
+            # When I look up the last class in the binary by name
+            last_class = [x for x in eager_parser.classes if not isinstance(x, ObjcCategory)][-1]
+            lazy_classes = lazy_parser.classes_for_class_name(last_class.name)
+            # Then only that class is parsed
+            assert [x.name for x in lazy_classes] == [last_class.name]
+            assert len(lazy_parser._classrefs_to_objc_classes) == 1
+            assert lazy_classes[0].superclass_name == last_class.superclass_name
+
+            # And once every class is parsed, the lazy parse produces the same classes and selectors as the eager one
+            def describe_classes(classes: List) -> List:
+                return [
+                    (x.name, x.superclass_name, [(sel.name, sel.implementation) for sel in x.selectors])
+                    for x in classes
+                ]
+
+            assert describe_classes(lazy_parser.classes) == describe_classes(eager_parser.classes)
+            assert describe_classes(lazy_parser.protocols) == describe_classes(eager_parser.protocols)
+            # And the class parsed on-demand is the same object exposed by the class list
+            assert lazy_classes[0] in lazy_parser.classes
+            # And the selref map is identical, despite classes having been parsed out of order
+            assert {
+                selref: (sel.name, sel.implementation) for selref, sel in lazy_parser.selrefs_to_selectors().items()
+            } == {selref: (sel.name, sel.implementation) for selref, sel in eager_parser.selrefs_to_selectors().items()}
+
+    @pytest.mark.parametrize("from_memory", [False, True])
+    def test_parallel_parse_matches_sequential_parse(self, from_memory: bool) -> None:
+        # A binary parsed from memory isn't file-backed, so the workers can't map it from its path
+        path = TestObjcRuntimeDataParser.CATEGORY_PATH
+        binary = MachoParser(path.read_bytes() if from_memory else path).slices[0]
+        assert binary.is_file_backed is not from_memory
+        # Given a binary parsed sequentially and across a pool of processes
+        sequential_parser = ObjcRuntimeDataParser(binary)
+        parallel_parser = ObjcRuntimeDataParser(binary, parallel_workers=2)
+
+        def describe_classes(classes: List) -> List:
+            return [
+                (
+                    x.name,
+                    x.superclass_name,
+                    [(sel.name, sel.implementation) for sel in x.selectors],
+                    [protocol.name for protocol in x.protocols],
+                    [ivar.name for ivar in x.ivars],
+                )
+                for x in classes
+            ]
+
+        # Then the parallel parse produces the same classes and protocols, in the same order
+        assert describe_classes(parallel_parser.classes) == describe_classes(sequential_parser.classes)
+        assert describe_classes(parallel_parser.protocols) == describe_classes(sequential_parser.protocols)
+        # And the selref map is identical
+        assert {
+            selref: (sel.name, sel.implementation) for selref, sel in parallel_parser.selrefs_to_selectors().items()
+        } == {
+            selref: (sel.name, sel.implementation) for selref, sel in sequential_parser.selrefs_to_selectors().items()
+        }
+        # And the selectors parsed by the workers refer to the parser's own selrefs
+        selector = parallel_parser.selector_for_selref(VirtualMemoryPointer(0x1001112F8))
+        assert selector is not None and selector.selref is not None
+        assert selector.implementation == VirtualMemoryPointer(0x1000643C0)
+        assert selector.selref is parallel_parser._selref_ptr_to_selref_map[selector.selref.source_address]
+
+    def test_shares_protocols_and_selectors(self) -> None:
+        binary = MachoParser(TestObjcRuntimeDataParser.CATEGORY_PATH).slices[0]
+        objc_parser = ObjcRuntimeDataParser(binary)
+
+        # Given several classes which conform to the same protocol
+        conforming_classes = [
+            objc_class
+            for objc_class in objc_parser.classes
+            if any(protocol.name == "UIWebViewDelegate" for protocol in objc_class.protocols)
+        ]
+        assert len(conforming_classes) == 5
+        # Then the protocol is only decoded once, and shared between the classes
+        protocols = [
+            protocol
+            for objc_class in conforming_classes
+            for protocol in objc_class.protocols
+            if protocol.name == "UIWebViewDelegate"
+        ]
+        assert all(protocol is protocols[0] for protocol in protocols)
+        assert len(protocols[0].selectors) == 4
+
+        # And selector names are interned
+        selector_names = [sel.name for objc_class in objc_parser.classes for sel in objc_class.selectors]
+        assert all(name is sys.intern(name) for name in selector_names)
+
+        # And the shared selectors can't be modified through one of the classes sharing them
+        shared_selector = protocols[0].selectors[0]
+        with pytest.raises(AttributeError):
+            shared_selector.selref = None  # type: ignore
+        with pytest.raises(AttributeError):
+            shared_selector.implementation = VirtualMemoryPointer(0)  # type: ignore
+
+    def test_parallel_parse_keeps_selectors_shared(self) -> None:
+        binary = MachoParser(TestObjcRuntimeDataParser.CATEGORY_PATH).slices[0]
+        # Given a binary parsed across a pool of processes
+        objc_parser = ObjcRuntimeDataParser(binary, parallel_workers=2)
+        selectors = [
+            selector
+            for objc_class in objc_parser.classes
+            for protocol in objc_class.protocols
+            if protocol.name == "UIWebViewDelegate"
+            for selector in protocol.selectors
+        ]
+        assert selectors
+        # Then each selector refers to the parser's own selrefs
+        for selector in selectors:
+            if selector.selref:
+                assert selector.selref is objc_parser._selref_ptr_to_selref_map[selector.selref.source_address]
+        # And the selectors which were shared within a worker are still shared after the merge
+        assert len({id(selector) for selector in selectors}) < len(selectors)
+
     def test_parse_ivars(self) -> None:
         parser = MachoParser(TestObjcRuntimeDataParser.CATEGORY_PATH)
         binary = parser.get_arm64_slice()
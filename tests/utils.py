@@ -4,10 +4,21 @@ import shlex
 import shutil
 import subprocess
 from contextlib import contextmanager
+from ctypes import sizeof
 from tempfile import TemporaryDirectory
-from typing import Generator, Tuple
+from typing import Generator, List, Optional, Tuple
 
-from strongarm.macho import MachoAnalyzer, MachoBinary, MachoParser
+from strongarm.macho import (
+    DyldSharedCacheHeader,
+    DyldSharedCacheImageInfo,
+    DyldSharedFileMapping,
+    DyldSubcacheEntry,
+    MachoAnalyzer,
+    MachoBinary,
+    MachoParser,
+    StaticFilePointer,
+)
+from strongarm.macho.macho_definitions import VMProtFlags
 from strongarm.objc import ObjcFunctionAnalyzer
 
 
@@ -171,3 +182,132 @@ def binary_with_name(name: str) -> MachoBinary:
     if not binary:
         raise ValueError(f"No arm64 slice found in {bin_path}")
     return binary
+
+
+def write_dyld_shared_cache(
+    output_path: pathlib.Path,
+    images: List[Tuple[pathlib.Path, MachoBinary]],
+    first_image_address: Optional[int] = None,
+    subcache_count: int = 0,
+) -> None:
+    """Write a minimal dyld_shared_cache which embeds the provided binaries under the provided install paths.
+    Each binary is copied whole into the executable mapping, so the binary's own file offsets stay valid relative to
+    the start of its image. The binaries' virtual addresses aren't rewritten to match the cache's.
+    If first_image_address is provided, the cache is placed so that the first image is mapped at this address.
+    If subcache_count is provided, the images are split between the main file and this many subcache files, named
+    like those of iOS 16 caches (.01, .02, ...). Each subcache has its own executable mapping. A .symbols file is
+    written alongside them.
+    """
+    page_size = 0x4000
+    # The distance between the executable mappings of each file
+    subcache_stride = 0x4000000
+
+    def page_align(offset: int) -> int:
+        return (offset + page_size - 1) & ~(page_size - 1)
+
+    file_count = subcache_count + 1
+    images_per_file = -(-len(images) // file_count)
+    file_images = [images[index * images_per_file : (index + 1) * images_per_file] for index in range(file_count)]
+    is_split = subcache_count > 0
+    file_uuids = [bytes([index + 1]) * 16 if is_split else bytes(16) for index in range(file_count)]
+    symbols_file_uuid = b"\xff" * 16 if is_split else bytes(16)
+
+    mappings_offset = sizeof(DyldSharedCacheHeader)
+    subcaches_offset = mappings_offset + sizeof(DyldSharedFileMapping) * 3
+    images_offset = subcaches_offset + sizeof(DyldSubcacheEntry) * subcache_count
+    paths_offset = images_offset + sizeof(DyldSharedCacheImageInfo) * len(images)
+    path_strings = b"".join(str(path).encode() + b"\x00" for path, _ in images)
+
+    # The offset of each image within the file which contains it, and the size of each file's executable mapping
+    image_file_offsets = []
+    text_mapping_sizes = []
+    for file_index, images_in_file in enumerate(file_images):
+        if file_index == 0:
+            image_file_offset = page_align(paths_offset + len(path_strings))
+        else:
+            image_file_offset = page_align(mappings_offset + sizeof(DyldSharedFileMapping))
+        for _, binary in images_in_file:
+            image_file_offsets.append(image_file_offset)
+            image_file_offset = page_align(image_file_offset + binary.slice_filesize)
+        assert image_file_offset <= subcache_stride
+        text_mapping_sizes.append(image_file_offset)
+
+    base_address = 0x180000000 if first_image_address is None else first_image_address - image_file_offsets[0]
+    text_mapping_size = text_mapping_sizes[0]
+    mappings = [
+        (base_address, text_mapping_size, 0, VMProtFlags.VM_PROT_READ | VMProtFlags.VM_PROT_EXECUTE),
+        (base_address + 0x10000000, page_size, text_mapping_size, VMProtFlags.VM_PROT_READ | VMProtFlags.VM_PROT_WRITE),
+        (base_address + 0x20000000, page_size, text_mapping_size + page_size, VMProtFlags.VM_PROT_READ),
+    ]
+
+    def mapping_bytes(address: int, size: int, file_offset: int, prot: int) -> bytes:
+        return bytes(
+            DyldSharedFileMapping(address=address, size=size, file_offset=file_offset, max_prot=prot, init_prot=prot)
+        )
+
+    cache = bytearray(text_mapping_size + page_size * 2)
+    header = DyldSharedCacheHeader(
+        magic=b"dyld_v1   arm64",
+        mappingOffset=mappings_offset,
+        mappingCount=len(mappings),
+        imagesOffset=images_offset,
+        imagesCount=len(images),
+        uuid=file_uuids[0],
+        subCacheArrayOffset=subcaches_offset,
+        subCacheArrayCount=subcache_count,
+        symbolFileUUID=symbols_file_uuid,
+    )
+    cache[: sizeof(header)] = bytes(header)
+
+    mapping_structs = b"".join(mapping_bytes(*mapping) for mapping in mappings)
+    cache[mappings_offset : mappings_offset + len(mapping_structs)] = mapping_structs
+
+    for subcache_index in range(subcache_count):
+        entry = bytes(
+            DyldSubcacheEntry(
+                uuid=file_uuids[subcache_index + 1],
+                cacheVMOffset=subcache_stride * (subcache_index + 1),
+                fileSuffix=f".{subcache_index + 1:02}".encode(),
+            )
+        )
+        entry_offset = subcaches_offset + subcache_index * len(entry)
+        cache[entry_offset : entry_offset + len(entry)] = entry
+
+    file_contents = [cache] + [bytearray(text_mapping_sizes[index]) for index in range(1, file_count)]
+    for subcache_index in range(1, file_count):
+        subcache_header = DyldSharedCacheHeader(
+            magic=b"dyld_v1   arm64", mappingOffset=mappings_offset, mappingCount=1, uuid=file_uuids[subcache_index]
+        )
+        subcache_mapping = mapping_bytes(
+            base_address + subcache_stride * subcache_index,
+            text_mapping_sizes[subcache_index],
+            0,
+            VMProtFlags.VM_PROT_READ | VMProtFlags.VM_PROT_EXECUTE,
+        )
+        file_contents[subcache_index][: sizeof(subcache_header)] = bytes(subcache_header)
+        file_contents[subcache_index][mappings_offset : mappings_offset + len(subcache_mapping)] = subcache_mapping
+
+    path_offset = paths_offset
+    image_index = 0
+    for file_index, images_in_file in enumerate(file_images):
+        for path, binary in images_in_file:
+            file_offset = image_file_offsets[image_index]
+            image_address = base_address + subcache_stride * file_index + file_offset
+            image_info = bytes(DyldSharedCacheImageInfo(address=image_address, pathFileOffset=path_offset))
+            image_info_offset = images_offset + image_index * len(image_info)
+            cache[image_info_offset : image_info_offset + len(image_info)] = image_info
+            path_offset += len(str(path)) + 1
+            file_contents[file_index][file_offset : file_offset + binary.slice_filesize] = binary.get_bytes(
+                StaticFilePointer(0), binary.slice_filesize
+            )
+            image_index += 1
+    cache[paths_offset : paths_offset + len(path_strings)] = path_strings
+
+    output_path.write_bytes(cache)
+    for subcache_index in range(1, file_count):
+        output_path.with_name(f"{output_path.name}.{subcache_index:02}").write_bytes(file_contents[subcache_index])
+    if is_split:
+        symbols_header = DyldSharedCacheHeader(
+            magic=b"dyld_v1   arm64", mappingOffset=sizeof(DyldSharedCacheHeader), uuid=symbols_file_uuid
+        )
+        output_path.with_name(f"{output_path.name}.symbols").write_bytes(bytes(symbols_header))